@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 import sys
 
-from bento.cli import cli
-from bento.error import BentoException
-from bento.util import echo_error
+from bento.daemon_client import run_in_daemon
 
 
 def main() -> None:
+    # Hand off to a running daemon before paying for Bento's imports
+    exit_code = run_in_daemon(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from bento.cli import cli
+    from bento.error import BentoException
+    from bento.util import echo_error
+
     try:
         cli(auto_envvar_prefix="BENTO")
     # Catch custom exceptions, output the right message and exit.
@@ -8,7 +8,7 @@ import yaml
 
 import bento.constants as constants
 import bento.git
-from bento.run_cache import RunCache
+from bento.run_cache import RunCache, open_cache
 
 
 def _clean_path(path: Union[str, Path]) -> Path:
@@ -48,7 +48,7 @@ class BaseContext:
 
         repo_root = None
         repo_root_obj = bento.git.repo()
-        if repo_root_obj is not None:
+        if repo_root_obj is not None and repo_root_obj.working_tree_dir:
             repo_root = Path(repo_root_obj.working_tree_dir)
 
         for base_path in [cwd, *cwd.parents]:
@@ -113,13 +113,106 @@ class BaseContext:
         """
         return self.config.get("autorun", {}).get("block", False)
 
+    @property
+    def runner_jobs(self) -> int:
+        """
+        Returns the number of worker processes in which to run tools (0 runs tools in this process)
+        """
+        return int(self.config.get(constants.RUNNER, {}).get(constants.RUNNER_JOBS, 0))
+
+    @property
+    def runner_concurrency(self) -> int:
+        """
+        Returns the maximum number of tool processes to run at once (0 for one per CPU)
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return int(runner.get(constants.RUNNER_CONCURRENCY, 0))
+
+    @property
+    def runner_memory_budget(self) -> int:
+        """
+        Returns the memory, in megabytes, tool processes may use at once (0 for no limit)
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return int(runner.get(constants.RUNNER_MEMORY_BUDGET, 0))
+
+    @property
+    def runner_walk_threads(self) -> int:
+        """
+        Returns the number of threads that list directories while finding files
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return int(runner.get(constants.RUNNER_WALK_THREADS, 1))
+
+    @property
+    def runner_file_source(self) -> str:
+        """
+        Returns how to find files to check: by walking directories, or from git
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return str(runner.get(constants.RUNNER_FILE_SOURCE, constants.FILE_SOURCE_WALK))
+
+    @property
+    def runner_untracked(self) -> bool:
+        """
+        Returns whether files listed from git include untracked files
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return bool(runner.get(constants.RUNNER_UNTRACKED, False))
+
+    @property
+    def runner_staged_mode(self) -> str:
+        """
+        Returns how staged files are checked: in the working tree, or in a snapshot
+        of git state
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return str(
+            runner.get(constants.RUNNER_STAGED_MODE, constants.STAGED_MODE_WORKTREE)
+        )
+
+    @property
+    def runner_new_findings(self) -> str:
+        """
+        Returns how staged checks decide which findings are new: by analyzing HEAD,
+        or by whether findings are on lines that staged changes modify
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return str(
+            runner.get(constants.RUNNER_NEW_FINDINGS, constants.NEW_FINDINGS_HEAD)
+        )
+
+    @property
+    def runner_concurrent_baseline(self) -> bool:
+        """
+        Returns whether staged checks analyze HEAD at the same time as staged files
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return bool(runner.get(constants.RUNNER_CONCURRENT_BASELINE, False))
+
+    @property
+    def runner_share_engines(self) -> bool:
+        """
+        Returns whether tools that are front ends to the same analysis program share
+        its runs
+        """
+        runner = self.config.get(constants.RUNNER, {})
+        return bool(runner.get(constants.RUNNER_SHARE_ENGINES, True))
+
     @property
     def cache(self) -> RunCache:
         if self._cache is None:
             cp = self.cache_path or (self.resource_path / constants.CACHE_PATH)
-            self._cache = RunCache(cache_dir=cp)
+            self._cache = open_cache(cp)
         return self._cache
 
+    @property
+    def walk_index_path(self) -> Path:
+        """
+        Returns where listings of walked directories are persisted between runs
+        """
+        return self.cache.cache_dir / constants.WALK_INDEX_FILE
+
     def _open_config(self) -> Dict[str, Any]:
         """
         Opens this project's configuration file
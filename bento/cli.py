@@ -11,7 +11,17 @@ from packaging.version import InvalidVersion, Version
 
 import bento.constants as constants
 import bento.network
-from bento.commands import archive, check, disable, enable, init, register
+from bento.commands import (
+    archive,
+    check,
+    daemon,
+    disable,
+    enable,
+    init,
+    record_head,
+    register,
+    watch,
+)
 from bento.context import Context
 from bento.error import InvalidRegistrationException, OutdatedPythonException
 
@@ -186,6 +196,9 @@ def cli(
 
 cli.add_command(archive.archive)
 cli.add_command(check.check)
+cli.add_command(daemon.daemon)
 cli.add_command(init.init)
+cli.add_command(record_head.record_head)
 cli.add_command(enable.enable)
 cli.add_command(disable.disable)
+cli.add_command(watch.watch)
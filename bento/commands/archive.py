@@ -73,9 +73,19 @@ def archive(context: Context, all_: bool, paths: Tuple[Path, ...]) -> None:
 
     new_baseline: Dict[str, Dict[str, Dict[str, Any]]] = {}
     tools = context.tools.values()
+    # Staged archives skip tool setup; otherwise set up tools while finding files
+    setup = bento.orchestrator.start_setup(tools) if all_ else None
 
     target_file_manager = TargetFileManager(
-        context.base_path, path_list, not all_, context.ignore_file_path
+        context.base_path,
+        path_list,
+        not all_,
+        context.ignore_file_path,
+        walk_threads=context.runner_walk_threads,
+        file_source=context.runner_file_source,
+        untracked=context.runner_untracked,
+        walk_index_path=context.walk_index_path,
+        staged_mode=context.runner_staged_mode,
     )
 
     baseline: Baseline = {}
@@ -85,7 +95,7 @@ def archive(context: Context, all_: bool, paths: Tuple[Path, ...]) -> None:
             baseline = bento.result.json_to_violation_hashes(json_file)
 
     all_findings, elapsed = bento.orchestrator.orchestrate(
-        baseline, target_file_manager, not all_, tools
+        baseline, target_file_manager, not all_, tools, context.runner_jobs, setup=setup
     )
 
     n_found = 0
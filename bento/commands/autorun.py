@@ -43,15 +43,85 @@ def _notify_install(context: Context, block: bool) -> None:
         )
 
 
+RECORD_HEAD_HOOKS = ["post-commit", "post-checkout"]
+"""Hooks that record findings in HEAD (see `bento record-head`)"""
+
+
+def _hook_path(repo: bento.git.Repo, name: str) -> Path:
+    return Path(repo.git_dir) / "hooks" / name
+
+
+def _check_hook_installable(hook_path: Path) -> None:
+    """
+        Raises ExistingGitHookException if Bento's hook can't be installed at
+        hook_path, because both it and the place its existing hook would be moved to
+        are taken
+    """
+    legacy_hook_path = Path(f"{hook_path}.pre-bento")
+    if (
+        hook_path.exists()
+        and not _is_bento_precommit(hook_path)
+        and legacy_hook_path.exists()
+    ):
+        raise ExistingGitHookException(str(hook_path))
+
+
+def _install_hook(hook_path: Path, template: str) -> None:
+    """
+        Installs a git hook from a template in bento/configs, unless Bento's hook is
+        already installed
+
+        An existing hook is moved aside, to HOOK.pre-bento; Bento's hook runs it.
+    """
+    if _is_bento_precommit(hook_path):
+        return
+
+    _check_hook_installable(hook_path)
+    legacy_hook_path = Path(f"{hook_path}.pre-bento")
+    if hook_path.exists():
+        # If hook already exists move it over
+        shutil.move(str(hook_path), str(legacy_hook_path))
+
+    # Ensure .git/hooks directory exists
+    # note that we can (and should) assume .git dir exists since
+    # project must be a git project at this point in the code
+    hook_path.parent.mkdir(exist_ok=True)
+
+    # Copy script template to hook_path
+    template_location = os.path.join(os.path.dirname(__file__), "../configs", template)
+    shutil.copyfile(template_location, hook_path)
+
+    # Make file executable
+    original_mode = hook_path.stat().st_mode
+    os.chmod(hook_path, original_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def _uninstall_hook(hook_path: Path) -> None:
+    """
+        Removes Bento's git hook, putting back any hook it replaced
+    """
+    legacy_hook_path = Path(f"{hook_path}.pre-bento")
+    if legacy_hook_path.exists():
+        shutil.move(str(legacy_hook_path), str(hook_path))
+    else:
+        hook_path.unlink()
+
+
 @click.command(name="autorun")
 @click.option(
     "--block/--no-block",
     default=True,
     help="If --block, commits will fail if Bento finds an issue.",
 )
+@click.option(
+    "--record-head",
+    is_flag=True,
+    default=False,
+    help="Also record findings after each commit and checkout, so that autorun need not analyze the previous commit.",
+)
 @click.pass_obj
 @with_metrics
-def install_autorun(context: Context, block: bool) -> None:
+def install_autorun(context: Context, block: bool, record_head: bool) -> None:
     """
     Configures Bento to automatically run on commits.
 
@@ -66,47 +136,32 @@ def install_autorun(context: Context, block: bool) -> None:
 
         $ bento enable autorun --no-block
 
-    """
-    import git  # import inside def for performance
+    To find which findings are new, autorun also analyzes changed files as of the
+    previous commit. To record findings in the background after each commit and
+    checkout instead, run:
+
+        $ bento enable autorun --record-head
 
+    """
     # Get hook path
     repo = bento.git.repo(context.base_path)
     if repo is None:
         raise NotAGitRepoException()
 
-    _configure_block(context, block)
-
-    hook_path = Path(git.index.fun.hook_path("pre-commit", repo.git_dir))
-
-    if _is_bento_precommit(hook_path):
-        _notify_install(context, block)
+    hooks = {_hook_path(repo, "pre-commit"): "pre-commit.template"}
+    if record_head:
+        for name in RECORD_HEAD_HOOKS:
+            hooks[_hook_path(repo, name)] = "record-head.template"
+    # Checks every hook first, so that a conflict leaves no hook half-installed
+    for hook_path in hooks:
+        _check_hook_installable(hook_path)
 
-    else:
-        legacy_hook_path = Path(f"{hook_path}.pre-bento")
-        if hook_path.exists():
-            # If pre-commit hook already exists move it over
-            if legacy_hook_path.exists():
-                raise ExistingGitHookException(str(hook_path))
-            else:
-                # Check that
-                shutil.move(str(hook_path), str(legacy_hook_path))
-
-        # Ensure .git/hooks directory exists
-        # note that we can (and should) assume .git dir exists since
-        # project must be a git project at this point in the code
-        hook_path.parent.mkdir(exist_ok=True)
-
-        # Copy pre-commit script template to hook_path
-        template_location = os.path.join(
-            os.path.dirname(__file__), "../configs/pre-commit.template"
-        )
-        shutil.copyfile(template_location, hook_path)
+    _configure_block(context, block)
 
-        # Make file executable
-        original_mode = hook_path.stat().st_mode
-        os.chmod(hook_path, original_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    for hook_path, template in hooks.items():
+        _install_hook(hook_path, template)
 
-        _notify_install(context, block)
+    _notify_install(context, block)
 
 
 @click.command(name="autorun")
@@ -119,14 +174,12 @@ def uninstall_autorun(context: Context) -> None:
     Autorun is only removed for the project from which this
     command is run.
     """
-    import git  # import inside def for performance
-
     # Get hook path
     repo = bento.git.repo(context.base_path)
     if repo is None:
         raise NotAGitRepoException()
 
-    hook_path = Path(git.index.fun.hook_path("pre-commit", repo.git_dir))
+    hook_path = _hook_path(repo, "pre-commit")
 
     if not _is_bento_precommit(hook_path):
         echo_warning(
@@ -134,12 +187,11 @@ def uninstall_autorun(context: Context) -> None:
         )
         sys.exit(1)
     else:
-        # Put back legacy hook if exits
-        legacy_hook_path = Path(f"{hook_path}.pre-bento")
-        if legacy_hook_path.exists():
-            shutil.move(str(legacy_hook_path), str(hook_path))
-        else:
-            hook_path.unlink()
+        _uninstall_hook(hook_path)
+        for name in RECORD_HEAD_HOOKS:
+            record_hook_path = _hook_path(repo, name)
+            if _is_bento_precommit(record_hook_path):
+                _uninstall_hook(record_hook_path)
 
         echo_success("Uninstalled Bento autorun.")
         echo_next_step("To enable autorun", "bento enable autorun")
@@ -3,7 +3,7 @@ import subprocess
 import sys
 import threading
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import click
 
@@ -28,6 +28,7 @@ from bento.paths import list_paths
 from bento.result import Baseline
 from bento.target_file_manager import TargetFileManager
 from bento.tool import Tool
+from bento.tool_runner import RunResults
 from bento.util import echo_error, echo_next_step, echo_success, echo_warning
 from bento.violation import Violation
 
@@ -67,6 +68,13 @@ def __get_ignores_for_tool(tool: str, config: Dict[str, Any]) -> List[str]:
     metavar="TOOL",
     autocompletion=get_valid_tools,
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    help="Run tools in this many worker processes (defaults to the runner.jobs setting in .bento/config.yml).",
+    metavar="N",
+)
 @click.option("--staged-only", is_flag=True, default=False, hidden=True)
 @click.argument("paths", nargs=-1, type=Path, autocompletion=list_paths)
 @click.pass_obj
@@ -77,6 +85,7 @@ def check(
     formatter: Tuple[str, ...] = (),
     pager: bool = True,
     tool: Optional[str] = None,
+    jobs: Optional[int] = None,
     staged_only: bool = False,  # Should not be used. Legacy support for old pre-commit hooks
     paths: Tuple[Path, ...] = (),
 ) -> None:
@@ -133,20 +142,57 @@ def check(
     if tool:
         tools = [context.configured_tools[tool]]
 
+    # Staged checks skip tool setup; otherwise set up tools while finding files
+    setup = bento.orchestrator.start_setup(tools) if all_ else None
+
     baseline: Baseline = {}
     if context.baseline_file_path.exists():
         with context.baseline_file_path.open() as json_file:
             baseline = bento.result.json_to_violation_hashes(json_file)
 
     target_file_manager = TargetFileManager(
-        context.base_path, path_list, not all_, context.ignore_file_path
+        context.base_path,
+        path_list,
+        not all_,
+        context.ignore_file_path,
+        walk_threads=context.runner_walk_threads,
+        file_source=context.runner_file_source,
+        untracked=context.runner_untracked,
+        walk_index_path=context.walk_index_path,
+        staged_mode=context.runner_staged_mode,
     )
 
+    fmts = context.formatters
+    # Unless output is paged, findings are printed as soon as each tool completes
+    stream = not pager or not sys.stdout.isatty()
+    streamed: Set[int] = set()  # Indices of formatters that printed partial output
+
+    def print_partial(result: RunResults) -> None:
+        tool_id, findings = result
+        if not isinstance(findings, list):
+            return
+        filtered = [f for f in findings if not f.filtered]
+        if not filtered:
+            return
+        for ix, fmt in enumerate(fmts):
+            lines = fmt.dump_partial(tool_id, filtered)
+            if lines is not None:
+                streamed.add(ix)
+                for line in lines:
+                    click.secho(line)
+
     all_results, elapsed = bento.orchestrator.orchestrate(
-        baseline, target_file_manager, not all_, tools
+        baseline,
+        target_file_manager,
+        not all_,
+        tools,
+        context.runner_jobs if jobs is None else jobs,
+        on_result=print_partial if stream else None,
+        setup=setup,
+        new_findings=context.runner_new_findings,
+        concurrent_baseline=context.runner_concurrent_baseline,
     )
 
-    fmts = context.formatters
     findings_to_log: List[Any] = []
     n_all = 0
     n_all_filtered = 0
@@ -198,7 +244,9 @@ def check(
     stats_thread = threading.Thread(name="stats", target=post_metrics)
     stats_thread.start()
 
-    dumped = [f.dump(filtered_findings) for f in fmts]
+    dumped = [
+        f.dump(filtered_findings) for ix, f in enumerate(fmts) if ix not in streamed
+    ]
     context.start_user_timer()
     bento.util.less(dumped, pager=pager, overrun_pages=OVERRUN_PAGES)
     context.stop_user_timer()
@@ -0,0 +1,41 @@
+import click
+
+import bento.daemon
+from bento.commands.register import needs_prompt
+from bento.context import Context
+from bento.util import echo_success
+
+
+@click.command()
+@click.option(
+    "--stop", is_flag=True, default=False, help="Stop this project's running daemon."
+)
+@click.pass_context
+def daemon(ctx: click.Context, stop: bool) -> None:
+    """
+    Serve Bento commands for this project from a long-running process.
+
+    While the daemon runs, `bento check` in this project is run by the daemon, which
+    keeps tools and caches loaded between runs. When no daemon is running,
+    `bento check` runs in its own process as usual.
+
+    The daemon runs in the foreground; stop it with Ctrl-C or `bento daemon --stop`.
+    """
+    context: Context = ctx.obj
+    if stop:
+        if bento.daemon.stop_daemon(context.base_path):
+            echo_success("Bento daemon stopped")
+        else:
+            click.echo("No Bento daemon is running", err=True)
+        return
+
+    server = bento.daemon.Daemon(
+        base_path=context.base_path,
+        cli=ctx.find_root().command,
+        needs_prompt=lambda params: needs_prompt(params["agree"], params["email"]),
+    )
+    click.echo(f"Bento daemon serving {context.base_path}", err=True)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
@@ -96,7 +96,7 @@ class InitCommand:
 
             # If we're in a git repo with a .gitignore, add it to .bentoignore
             repo = bento.git.repo()
-            if repo:
+            if repo and repo.working_tree_dir:
                 path_to_gitignore = Path(repo.working_tree_dir) / ".gitignore"
                 if path_to_gitignore.exists():
                     include_path = os.path.relpath(
@@ -0,0 +1,80 @@
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import click
+
+import bento.git
+from bento.context import Context
+from bento.target_file_manager import TargetFileManager
+from bento.tool_runner import Runner
+
+NULL_COMMIT = "0" * 40
+
+
+def _changed_files(context: Context, hook_args: Tuple[str, ...]) -> Optional[List[str]]:
+    """
+        Returns the files whose findings should be recorded, given a git hook's
+        arguments
+    """
+    if len(hook_args) == 3:
+        # post-checkout: previous HEAD, new HEAD, and whether branches were switched
+        previous, new, is_branch = hook_args
+        if is_branch != "1" or previous == NULL_COMMIT:
+            # File checkouts don't move HEAD, and fresh clones change every file
+            return None
+        return bento.git.changed_files(new, previous, context.base_path)
+    return bento.git.changed_files("HEAD", path=context.base_path)
+
+
+@click.command(name="record-head", hidden=True)
+@click.argument("hook_args", nargs=-1)
+@click.pass_obj
+def record_head(context: Context, hook_args: Tuple[str, ...]) -> None:
+    """
+    Records findings in files changed by the HEAD commit.
+
+    Run from post-commit and post-checkout hooks (see `bento enable autorun
+    --record-head`), so that checks of staged files need not run tools on HEAD.
+    Only tools that check each file independently are recorded.
+    """
+    if not (context.config_path.exists() and context.ignore_file_path.exists()):
+        return
+
+    base = os.path.join(str(context.base_path), "")
+    files = [
+        Path(f)
+        for f in _changed_files(context, hook_args) or []
+        if f.startswith(base) and os.path.isfile(f)
+    ]
+    tools = [t for t in context.tools.values() if t.can_use_file_cache()]
+    if not files or not tools:
+        return
+
+    target_file_manager = TargetFileManager(
+        context.base_path,
+        files,
+        False,
+        context.ignore_file_path,
+        walk_threads=context.runner_walk_threads,
+    )
+    blobs = target_file_manager.head_blobs()
+    with target_file_manager.snapshot("HEAD", "record") as paths:
+        runner = Runner(
+            paths=paths,
+            use_cache=True,
+            skip_setup=True,
+            show_bars=False,
+            jobs=context.runner_jobs,
+        )
+        results = runner.parallel_results(tools, {}, keep_bars=False)
+
+    by_id = {t.tool_id(): t for t in tools}
+    for tool_id, findings in results:
+        if isinstance(findings, list):
+            by_id[tool_id].record_head_findings(blobs, findings)
+        else:
+            logging.warning(f"Not recording {tool_id} findings: {findings}")
+    context.cache.head_findings.save()
+    logging.info(f"Recorded HEAD findings in {len(blobs)} files")
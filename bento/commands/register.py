@@ -288,3 +288,27 @@ class Registrar:
             content.finalize.echo()
 
         return True
+
+
+def needs_prompt(agree: bool, email: Optional[str]) -> bool:
+    """
+    Returns whether Registrar.verify would prompt the user, outside of `bento init`
+
+    :param agree: If the user has agreed to all prompts via the command line
+    :param email: The user's email, if supplied via command line
+    """
+    # import inside def for performance
+    from validate_email import validate_email
+
+    global_config = read_global_config() or {}
+    email = (
+        email or os.environ.get(constants.BENTO_EMAIL_VAR) or global_config.get("email")
+    )
+    if not email or not validate_email(email):
+        return True
+    if agree:
+        return False
+    return (
+        global_config.get(constants.TERMS_OF_SERVICE_KEY)
+        != constants.TERMS_OF_SERVICE_VERSION
+    )
@@ -0,0 +1,154 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+import click
+
+import bento.orchestrator
+import bento.result
+from bento.config import get_valid_tools
+from bento.context import Context
+from bento.decorators import with_metrics
+from bento.error import NoConfigurationException, NoIgnoreFileException
+from bento.paths import list_paths
+from bento.result import Baseline
+from bento.tool import Tool
+from bento.tool_runner import Runner
+from bento.util import echo_error, echo_success, echo_warning
+from bento.violation import Violation
+from bento.watcher import FileWatcher, FindingIndex
+
+
+def _echo_findings(context: Context, tool_id: str, findings: List[Violation]) -> None:
+    for fmt in context.formatters:
+        for line in fmt.dump({tool_id: findings}):
+            click.secho(line)
+
+
+def _check_changes(
+    context: Context,
+    tools: Iterable[Tool],
+    baseline: Baseline,
+    index: FindingIndex,
+    changed: Set[Path],
+) -> None:
+    """
+    Re-runs each tool that checks any changed file, on only those files, and prints
+    how findings changed
+    """
+    before = time.time()
+    existing = [p for p in sorted(changed) if p.exists()]
+    dropped = index.forget(p for p in changed if not p.exists())
+
+    def run(tool: Tool) -> Tuple[Tool, List[Path], Any]:
+        paths = sorted(tool.filter_paths(existing))
+        if not paths:
+            return tool, paths, []
+        try:
+            # Only the per-file cache is keyed by file; the whole-run cache entry is
+            # for all files, so must not be overwritten by a run on a few
+            results = bento.result.filtered(
+                tool.tool_id(),
+                tool.results(paths, use_cache=tool.can_use_file_cache()),
+                baseline,
+            )
+        except Exception as e:
+            logging.exception(e)
+            return tool, paths, e
+        return tool, paths, [f for f in results if not f.filtered]
+
+    context.cache.refresh()
+    tools = list(tools)
+    n_added = 0
+    n_removed = 0
+    with ThreadPoolExecutor(max(1, len(tools))) as executor:
+        for tool, paths, findings in executor.map(run, tools):
+            tool_id = tool.tool_id()
+            if isinstance(findings, Exception):
+                echo_error(f"Error while running {tool_id}: {findings}")
+                continue
+            added, removed = index.update(tool_id, paths, findings)
+            if added:
+                _echo_findings(context, tool_id, added)
+            n_added += len(added)
+            n_removed += len(removed)
+    context.cache.save()
+
+    elapsed = time.time() - before
+    summary = f"{len(changed)} changed file(s) checked in {elapsed:.2f} s"
+    if n_added:
+        echo_warning(f"{n_added} new finding(s) in {summary}")
+    if n_removed or dropped:
+        echo_success(f"{n_removed + dropped} finding(s) resolved in {summary}")
+    if not n_added and not n_removed and not dropped:
+        echo_success(f"No change in findings in {summary}")
+    click.secho(f"{len(index)} finding(s) in total\n", err=True)
+
+
+@click.command()
+@click.option(
+    "-t",
+    "--tool",
+    help="Specify a previously configured tool to run.",
+    metavar="TOOL",
+    autocompletion=get_valid_tools,
+)
+@click.argument("paths", nargs=-1, type=Path, autocompletion=list_paths)
+@click.pass_obj
+@with_metrics
+def watch(
+    context: Context, tool: Optional[str] = None, paths: Tuple[Path, ...] = ()
+) -> None:
+    """
+    Re-checks files whenever they change.
+
+    All tracked files are checked once. After that, whenever files are saved,
+    only the tools that check those files are re-run, and only on those files.
+    New and resolved findings are printed after each change.
+
+    Files excluded by `.bentoignore` are not watched. Stop watching with Ctrl-C.
+    """
+    if not context.config_path.exists():
+        raise NoConfigurationException()
+    if not context.ignore_file_path.exists():
+        raise NoIgnoreFileException(context)
+
+    tools: Iterable[Tool[Any]] = context.tools.values()
+    if tool:
+        tools = [context.configured_tools[tool]]
+    tools = list(tools)
+    setup = bento.orchestrator.start_setup(tools)
+
+    baseline: Baseline = {}
+    if context.baseline_file_path.exists():
+        with context.baseline_file_path.open() as json_file:
+            baseline = bento.result.json_to_violation_hashes(json_file)
+
+    watcher = FileWatcher(
+        base_path=context.base_path,
+        ignore_file_path=context.ignore_file_path,
+        target_paths=[p.absolute() for p in paths] or [context.base_path],
+        index_path=context.walk_index_path,
+    )
+    index = FindingIndex(context.base_path)
+
+    click.echo("Running Bento checks on all watched files...\n", err=True)
+    runner = Runner(paths=watcher.files, use_cache=True, setup=setup)
+    for tool_id, findings in runner.parallel_results(tools, baseline, keep_bars=False):
+        if isinstance(findings, Exception):
+            echo_error(f"Error while running {tool_id}: {findings}")
+        elif isinstance(findings, list):
+            index.update(tool_id, [], [f for f in findings if not f.filtered])
+    click.secho(
+        f"{len(index)} finding(s) in {len(watcher.files)} watched file(s). Waiting for changes...\n",
+        err=True,
+    )
+
+    try:
+        while True:
+            changed = watcher.wait()
+            _check_changes(context, tools, baseline, index, changed)
+    except KeyboardInterrupt:
+        click.secho("Stopped watching", err=True)
@@ -14,6 +14,8 @@ GLOBAL_VERSION_CACHE_PATH = GLOBAL_RESOURCE_PATH / "version"
 
 RESOURCE_PATH = Path(".bento")
 CACHE_PATH = Path("cache")
+WALK_INDEX_FILE = "walk-index.json"
+SNAPSHOT_PATH = Path("snapshot")
 
 ARCHIVE_FILE_NAME = "archive.json"
 CONFIG_FILE_NAME = "config.yml"
@@ -44,6 +46,26 @@ ARGS_TO_EXCLUDE_FROM_METRICS = {"check": {"paths"}}
 
 AUTORUN = "autorun"
 AUTORUN_BLOCK = "block"
+RUNNER = "runner"
+RUNNER_JOBS = "jobs"
+RUNNER_CONCURRENCY = "concurrency"
+RUNNER_MEMORY_BUDGET = "memory_budget"
+RUNNER_WALK_THREADS = "walk_threads"
+RUNNER_FILE_SOURCE = "file_source"
+RUNNER_UNTRACKED = "untracked"
+RUNNER_STAGED_MODE = "staged_mode"
+RUNNER_NEW_FINDINGS = "new_findings"
+RUNNER_CONCURRENT_BASELINE = "concurrent_baseline"
+RUNNER_SHARE_ENGINES = "share_engines"
+FILE_SOURCE_WALK = "walk"
+FILE_SOURCE_GIT = "git"
+STAGED_MODE_WORKTREE = "worktree"
+STAGED_MODE_SNAPSHOT = "snapshot"
+NEW_FINDINGS_HEAD = "head"
+NEW_FINDINGS_CHANGED_LINES = "changed_lines"
+TOOL_PRIORITY = "priority"
+TOOL_CONCURRENCY = "concurrency"
+TOOL_MEMORY = "memory"
 
 ### messages ###
 
@@ -19,11 +19,11 @@ if TYPE_CHECKING:
 @attr.s(repr=False)
 class Context(BaseContext):
     _formatters = attr.ib(type=List[Formatter], default=None, init=False)
-    _start = attr.ib(type=float, default=time.time(), init=False)
+    _start = attr.ib(type=float, factory=time.time, init=False)
     _user_start = attr.ib(type=float, default=None, init=False)
     _user_duration = attr.ib(type=float, default=0.0, init=False)
     _timestamp = attr.ib(
-        type=str, default=str(datetime.utcnow().isoformat("T")), init=False
+        type=str, factory=lambda: str(datetime.utcnow().isoformat("T")), init=False
     )
     _tool_inventory = attr.ib(type=Dict[str, Type[Tool]], init=False, default=None)
     _tools = attr.ib(type=Dict[str, Tool], init=False, default=None)
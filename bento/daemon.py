@@ -0,0 +1,259 @@
+import io
+import json
+import logging
+import os
+import socket
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import attr
+import click
+
+import bento.constants as constants
+import bento.git
+from bento import __version__ as BENTO_VERSION
+from bento.daemon_client import FORWARDED_ENV_PREFIXES, SOCKET_FILE_NAME
+from bento.error import BentoException
+from bento.run_cache import share_caches
+from bento.util import echo_error
+
+STOP_REQUEST = "stop"
+
+
+class _SocketWriter(io.TextIOBase):
+    """
+    A text stream that forwards each write to a daemon client as a JSON line
+
+    Writes after the client disconnects are dropped, so that a client going away
+    never interrupts a run.
+    """
+
+    def __init__(self, conn: socket.socket, key: str, tty: bool) -> None:
+        super().__init__()
+        self._conn = conn
+        self._key = key
+        self._tty = tty
+        self.closed_by_peer = False
+
+    @property
+    def encoding(self) -> str:  # type: ignore
+        return "utf-8"
+
+    def isatty(self) -> bool:
+        return self._tty
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if not isinstance(s, str):
+            # Click probes for binary streams by writing b""
+            raise TypeError("write() argument must be str")
+        if s and not self.closed_by_peer:
+            try:
+                self._conn.sendall(json.dumps({self._key: s}).encode() + b"\n")
+            except OSError:
+                self.closed_by_peer = True
+        return len(s)
+
+
+@contextmanager
+def _request_environment(cwd: str, env: Dict[str, str]) -> Iterator[None]:
+    """
+    Runs a block in a client's working directory, with its forwarded environment
+
+    Forwarded variables that the client did not set are unset for the block, so that
+    the daemon's own environment never changes a command's behavior.
+    """
+    old_cwd = os.getcwd()
+    unset = [k for k in os.environ if k.startswith(FORWARDED_ENV_PREFIXES)]
+    old_env = {k: os.environ.get(k) for k in [*unset, *env]}
+    os.chdir(cwd)
+    for k in unset:
+        del os.environ[k]
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        os.chdir(old_cwd)
+        for k, v in old_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+@attr.s
+class Daemon:
+    """
+    Serves Bento commands over a unix socket in the project's .bento directory
+
+    Tools, imports, and caches stay warm between commands. Requests are served one
+    at a time, since commands may stash and restore the project's git state.
+
+    Commands that would prompt the user are left to the client, since only the
+    client's terminal can answer.
+
+    :param base_path: The project root
+    :param cli: The command group that runs each request
+    :param needs_prompt: Whether a command, given the values of cli's own options,
+                         would prompt the user
+    """
+
+    base_path = attr.ib(type=Path, converter=Path)
+    cli = attr.ib(type=click.Command)
+    needs_prompt = attr.ib(
+        type=Callable[[Dict[str, Any]], bool], default=lambda params: False
+    )
+    socket_path = attr.ib(type=Path, init=False)
+
+    @socket_path.default
+    def _init_socket_path(self) -> Path:
+        return self.base_path / constants.RESOURCE_PATH / SOCKET_FILE_NAME
+
+    def serve(self) -> None:
+        """
+        Serves requests until stopped
+        """
+        share_caches()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(str(self.socket_path))
+            os.chmod(self.socket_path, 0o600)
+            server.listen()
+            logging.info(f"Bento daemon listening on {self.socket_path}")
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    if not self._handle(conn):
+                        return
+        finally:
+            server.close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+    def _handle(self, conn: socket.socket) -> bool:
+        """
+        Serves a single request
+
+        :return: False if the daemon should stop
+        """
+        with conn.makefile("r", encoding="utf-8") as stream:
+            line = stream.readline()
+        try:
+            request: Dict[str, Any] = json.loads(line)
+        except ValueError:
+            logging.warning("Bento daemon received a malformed request")
+            return True
+
+        if request.get("request") == STOP_REQUEST:
+            self._reply(conn, {"exit": 0})
+            return False
+        if request.get("version") != BENTO_VERSION:
+            # Let the client run this command itself
+            self._reply(conn, {"fallback": "version"})
+            return True
+
+        tty = request.get("tty", {})
+        stdout = _SocketWriter(conn, "stdout", tty.get("stdout", False))
+        stderr = _SocketWriter(conn, "stderr", tty.get("stderr", False))
+        with _request_environment(request["cwd"], request.get("env", {})):
+            if self._prompts(request["args"]):
+                self._reply(conn, {"fallback": "prompt"})
+                return True
+            old_streams = sys.stdin, sys.stdout, sys.stderr
+            # Any other prompt reads end-of-file, rather than the daemon's own stdin
+            sys.stdin = io.StringIO()
+            sys.stdout, sys.stderr = stdout, stderr  # type: ignore
+            try:
+                exit_code = self._run(request["args"])
+            finally:
+                sys.stdin, sys.stdout, sys.stderr = old_streams
+        self._reply(conn, {"exit": exit_code})
+        return True
+
+    def _prompts(self, args: List[str]) -> bool:
+        """
+        Returns whether a command would prompt the user
+        """
+        try:
+            ctx = self.cli.make_context(
+                "bento", list(args), resilient_parsing=True, auto_envvar_prefix="BENTO"
+            )
+        except click.ClickException:
+            # Leave the error to the run
+            return False
+        return self.needs_prompt(ctx.params)
+
+    def _run(self, args: List[str]) -> int:
+        """
+        Runs a Bento command, returning its exit code
+        """
+        logging.info(f"Bento daemon running {args}")
+        # The repository may have changed since the previous request
+        bento.git.forget()
+        try:
+            # As in __main__, so that forwarded BENTO_* variables set options
+            result = self.cli.main(
+                args=args,
+                prog_name="bento",
+                standalone_mode=False,
+                auto_envvar_prefix="BENTO",
+            )
+            return result if isinstance(result, int) else 0
+        except SystemExit as e:
+            return _exit_code(e.code)
+        except click.exceptions.Abort:
+            echo_error("Aborted!")
+            return 1
+        except click.ClickException as e:
+            e.show()
+            return e.exit_code
+        except BentoException as e:
+            if e.msg:
+                echo_error(e.msg)
+            return 3
+        except KeyboardInterrupt:
+            return 130
+        except Exception as e:
+            logging.exception(e)
+            echo_error(f"There was an exception {e}")
+            return 3
+
+    @staticmethod
+    def _reply(conn: socket.socket, message: Dict[str, Any]) -> None:
+        try:
+            conn.sendall(json.dumps(message).encode() + b"\n")
+        except OSError:
+            pass
+
+
+def _exit_code(code: Optional[Any]) -> int:
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    echo_error(str(code))
+    return 1
+
+
+def stop_daemon(base_path: Path) -> bool:
+    """
+    Asks the daemon serving base_path to stop
+
+    :return: True if a daemon was running
+    """
+    path = Path(base_path) / constants.RESOURCE_PATH / SOCKET_FILE_NAME
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+            sock.sendall(json.dumps({"request": STOP_REQUEST}).encode() + b"\n")
+            sock.recv(1024)
+        except OSError:
+            return False
+    return True
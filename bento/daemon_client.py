@@ -0,0 +1,136 @@
+"""
+Runs Bento commands in a running `bento daemon`
+
+This module is imported on every Bento invocation, before any other Bento module, so
+it must only import from the standard library.
+"""
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
+
+from bento import __version__ as BENTO_VERSION
+
+RESOURCE_DIR_NAME = ".bento"
+"""Mirrors constants.RESOURCE_PATH, which can't be imported here"""
+SOCKET_FILE_NAME = "daemon.sock"
+
+DAEMON_COMMANDS = {"check"}
+"""Commands a daemon can run"""
+
+OPTIONS_WITH_VALUES = {"--base-path", "--email"}
+"""Top-level options that consume the following argument"""
+
+FORWARDED_ENV_PREFIXES = ("BENTO_", "GIT_", "COLUMNS", "LINES", "TERM", "NO_COLOR")
+"""
+Environment variables a daemon applies while running a command
+
+GIT_* variables select the repository and index to check; e.g. hooks run by `git
+commit -a` set GIT_INDEX_FILE to a temporary index.
+"""
+
+CONNECT_TIMEOUT_SECONDS = 0.5
+
+
+def find_socket(cwd: Path) -> Optional[Path]:
+    """
+    Returns the path of the nearest daemon socket at or above cwd, if any
+    """
+    home = Path.home()
+    for directory in [cwd, *cwd.parents]:
+        if directory == home:
+            break
+        path = directory / RESOURCE_DIR_NAME / SOCKET_FILE_NAME
+        if path.exists():
+            return path
+    return None
+
+
+def command_index(args: List[str]) -> Optional[int]:
+    """
+    Returns the index of the Bento command in args, or None if args only has options
+    """
+    skip = False
+    for ix, arg in enumerate(args):
+        if skip:
+            skip = False
+        elif arg in OPTIONS_WITH_VALUES:
+            skip = True
+        elif not arg.startswith("-"):
+            return ix
+    return None
+
+
+def request_for(args: List[str], cwd: Path) -> Optional[Dict[str, Any]]:
+    """
+    Returns the daemon request that runs args, or None if args can't run in a daemon
+    """
+    if any(a in ("-h", "--help", "--version") for a in args):
+        return None
+    ix = command_index(args)
+    if ix is None or args[ix] not in DAEMON_COMMANDS:
+        return None
+    # The daemon has no terminal in which to run a pager
+    forwarded = args[: ix + 1] + ["--no-pager"] + args[ix + 1 :]
+    return {
+        "version": BENTO_VERSION,
+        "cwd": str(cwd),
+        "args": forwarded,
+        "env": {
+            k: v for k, v in os.environ.items() if k.startswith(FORWARDED_ENV_PREFIXES)
+        },
+        "tty": {"stdout": sys.stdout.isatty(), "stderr": sys.stderr.isatty()},
+    }
+
+
+def run_in_daemon(
+    args: List[str], stdout: Optional[TextIO] = None, stderr: Optional[TextIO] = None
+) -> Optional[int]:
+    """
+    Runs a Bento command in a running daemon, copying its output to stdout and stderr
+
+    :return: The command's exit code, or None if no daemon could run the command (in
+             which case nothing has been written)
+    """
+    out = stdout or sys.stdout
+    err = stderr or sys.stderr
+    cwd = Path.cwd()
+    request = request_for(args, cwd)
+    if request is None:
+        return None
+    path = find_socket(cwd)
+    if path is None:
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+        sock.connect(str(path))
+        sock.settimeout(None)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("r", encoding="utf-8") as replies:
+            wrote = False
+            for line in replies:
+                reply = json.loads(line)
+                if "stdout" in reply:
+                    out.write(reply["stdout"])
+                    out.flush()
+                    wrote = True
+                elif "stderr" in reply:
+                    err.write(reply["stderr"])
+                    err.flush()
+                    wrote = True
+                elif "exit" in reply:
+                    return int(reply["exit"])
+                else:
+                    return None
+            if not wrote:
+                return None
+            err.write("Lost connection to the Bento daemon\n")
+            return 3
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
@@ -200,7 +200,9 @@ class BanditParser(Parser[str]):
 
         if source == "" and result["line_number"] != 0:
             source = (
-                fetch_line_in_file(self.base_path / path, result["line_number"])
+                fetch_line_in_file(
+                    self.source_path(result["filename"]), result["line_number"]
+                )
                 or "<no source found>"
             )
 
@@ -249,6 +251,12 @@ class BanditTool(runner.Python, output.Str):
     def project_name(self) -> str:
         return BanditTool.PROJECT_NAME
 
+    def can_use_file_cache(self) -> bool:
+        return True
+
+    def can_shard(self) -> bool:
+        return True
+
     def run(self, paths: Iterable[str]) -> str:
         cmd = [
             "python",
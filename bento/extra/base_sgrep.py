@@ -1,15 +1,32 @@
+import hashlib
 import json
+import logging
+import os
 import re
+import threading
 from abc import abstractmethod
-from pathlib import Path
-from typing import Iterable, List, Mapping, Optional, Pattern
+from pathlib import Path, PurePath
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Pattern, Type, cast
 
+import attr
+import yaml
+
+import bento.constants as constants
+import bento.network
 from bento.parser import Parser
-from bento.tool import JsonR, output, runner
+from bento.tool import JsonR, Tool, output, runner
+from bento.tool.engine import Engine
 from bento.util import fetch_line_in_file
 from bento.violation import Violation
 
 
+SHARED_CONFIG_PATH = PurePath("sgrep-shared.yml")
+"""Where, in the resource directory, to write the configuration of shared sgrep runs"""
+
+RULES_CACHE_DIR = "sgrep-rules"
+"""Where, in the cache directory, to keep rules fetched from URLs"""
+
+
 class BaseSgrepParser(Parser[JsonR]):
     @classmethod
     @abstractmethod
@@ -26,7 +43,7 @@ class BaseSgrepParser(Parser[JsonR]):
             # Custom way to get check_name for sgrep-lint:0.1.10
             message = check.get("extra", {}).get("message")
             source = (
-                fetch_line_in_file(self.base_path / path, start_line)
+                fetch_line_in_file(self.source_path(check["path"]), start_line)
                 or "<no source found>"
             ).rstrip()
             violation = Violation(
@@ -63,6 +80,68 @@ class BaseSgrepTool(runner.Docker, output.Json):
         """
         return None
 
+    def rules(self) -> List[Dict[str, Any]]:
+        """
+        Loads the rules that sgrep would run for this tool, from its configuration
+        file or URL
+        """
+        config_str = self.config_str  # Creates the configuration file, if needed
+        config_path = self.get_config_path()
+        text = config_path.read_text() if config_path else self._fetch(config_str)
+        return (yaml.safe_load(text) or {}).get("rules") or []
+
+    def _fetch(self, url: str) -> str:
+        """
+        Returns the text at url, reusing a cached copy while the server reports the
+        same version of it (by its ETag or last-modified time)
+        """
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        cache_path = self.context.cache.cache_dir / RULES_CACHE_DIR / f"{digest}.json"
+        try:
+            cached: Optional[Dict[str, str]] = json.loads(cache_path.read_text())
+        except (OSError, ValueError):
+            cached = None
+
+        headers = {"Accept": "*/*"}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        response = bento.network.no_auth_get(url, headers=headers)
+        if cached and response.status_code == 304:
+            logging.debug(f"{self.tool_id()}: Rules at {url} are unchanged")
+            return cached["text"]
+        response.raise_for_status()
+
+        version = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if any(version.values()):
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(
+                f".{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            tmp_path.write_text(json.dumps({**version, "text": response.text}))
+            tmp_path.replace(cache_path)
+        return response.text
+
+    def rule_id_prefix(self) -> str:
+        """
+        Returns the prefix that sgrep adds to the IDs of this tool's rules
+
+        sgrep prefixes the IDs of rules from a file with the file's directory, as a
+        dotted path (e.g. rules from ".bento/sgrep.yml" start with "bento."); IDs of
+        rules from a URL are not prefixed.
+        """
+        if not self.get_config_path():
+            return ""
+        prefix = ".".join(PurePath(self.config_str).parts[:-1]).lstrip("./")
+        return f"{prefix}." if prefix else ""
+
+    def engine_type(self) -> Optional[Type[Engine]]:
+        return SgrepEngine
+
     @property
     def docker_image(self) -> str:
         return self.DOCKER_IMAGE
@@ -100,3 +179,132 @@ class BaseSgrepTool(runner.Docker, output.Json):
         stdout = output_str[-2]  # last line is blank
         output = json.loads(stdout)
         return output.get("results", [])
+
+
+@attr.s
+class SharedSgrep(BaseSgrepTool):
+    """
+    An sgrep container that runs the rules of several tools, from one configuration
+    file
+
+    :param image: The sgrep image that every tool uses
+    """
+
+    TOOL_ID = "sgrep.shared"
+
+    image = attr.ib(type=str, default=BaseSgrepTool.DOCKER_IMAGE)
+
+    @classmethod
+    def tool_id(cls) -> str:
+        return cls.TOOL_ID
+
+    @property
+    def docker_image(self) -> str:
+        return self.image
+
+    def get_config_path(self) -> Optional[Path]:
+        return self.context.resource_path / SHARED_CONFIG_PATH
+
+    @property
+    def config_str(self) -> str:
+        return str(constants.RESOURCE_PATH / SHARED_CONFIG_PATH)
+
+    @property
+    def parser_type(self) -> Type[Parser]:
+        # Output is parsed by each tool that shares this container
+        return BaseSgrepParser
+
+
+@attr.s
+class SgrepEngine(Engine[JsonR]):
+    """
+    Runs one sgrep container for several sgrep-based tools
+
+    Every tool's rules are written to one configuration file, with each rule's ID
+    tagged by the tool it came from; each tool receives the findings of its own rules,
+    with the check IDs that a run of that tool alone would report. A tool whose rules
+    can't be loaded fails without affecting the others.
+    """
+
+    _sgrep = attr.ib(type=SharedSgrep, init=False)
+    _failures = attr.ib(type=Dict[str, Exception], factory=dict, init=False)
+    _rule_count = attr.ib(type=Optional[int], default=None, init=False)
+    _config_lock = attr.ib(type=threading.Lock, factory=threading.Lock, init=False)
+
+    @_sgrep.default
+    def _init_sgrep(self) -> SharedSgrep:
+        members = self._sgrep_members()
+        return SharedSgrep(members[0].context, image=members[0].docker_image)
+
+    def _sgrep_members(self) -> List[BaseSgrepTool]:
+        return [cast(BaseSgrepTool, t) for t in self.members]
+
+    @staticmethod
+    def _tag(tool: Tool) -> str:
+        return f"{tool.tool_id()}/"
+
+    @classmethod
+    def groups(cls, tools: List[Tool]) -> List[List[Tool]]:
+        """
+        Groups tools that run the same sgrep image
+        """
+        groups: Dict[str, List[Tool]] = {}
+        for t in tools:
+            groups.setdefault(cast(BaseSgrepTool, t).docker_image, []).append(t)
+        return list(groups.values())
+
+    def installed(self) -> bool:
+        return self._sgrep.image_pulled()
+
+    def _setup(self) -> None:
+        self._sgrep.setup()
+
+    def write_config(self) -> int:
+        """
+        Writes the shared configuration file, once, with every member's rules
+
+        Returns:
+            The number of rules written
+        """
+        with self._config_lock:
+            if self._rule_count is not None:
+                return self._rule_count
+            rules: List[Dict[str, Any]] = []
+            for t in self._sgrep_members():
+                try:
+                    tag = self._tag(t)
+                    rules += [{**r, "id": f"{tag}{r['id']}"} for r in t.rules()]
+                except Exception as e:
+                    logging.debug(f"sgrep engine: Could not load {t.tool_id()} rules")
+                    self._failures[t.tool_id()] = e
+            config_path = cast(Path, self._sgrep.get_config_path())
+            config_path.parent.mkdir(parents=True, exist_ok=True)
+            with config_path.open("w") as yaml_file:
+                yaml.safe_dump({"rules": rules}, yaml_file)
+            self._rule_count = len(rules)
+            return self._rule_count
+
+    def run(self, paths: List[str]) -> Mapping[str, Any]:
+        if not self.write_config():
+            return {}
+        records: Dict[str, List[Dict[str, Any]]] = {}
+        for r in self._sgrep.run(paths):
+            path = os.path.normpath(os.path.join(self._sgrep.base_path, r["path"]))
+            records.setdefault(path, []).append(r)
+        logging.debug(f"sgrep engine: checked {len(paths)} files")
+        return records
+
+    def member_output(self, tool: Tool[JsonR], records: Mapping[str, Any]) -> JsonR:
+        if tool.tool_id() in self._failures:
+            raise self._failures[tool.tool_id()]
+        tagged = self._sgrep.rule_id_prefix() + self._tag(tool)
+        prefix = cast(BaseSgrepTool, tool).rule_id_prefix()
+        return [
+            {**r, "check_id": prefix + r["check_id"][len(tagged) :]}
+            for results in records.values()
+            for r in results
+            if r["check_id"].startswith(tagged)
+        ]
+
+    def output(self, tool: Tool[JsonR], paths: List[str]) -> JsonR:
+        return super().output(tool, [os.path.normpath(p) for p in paths])
@@ -1,10 +1,10 @@
 import json
-from typing import Iterable, List, Type
+from typing import List, Type
 
 from semantic_version import SimpleSpec
 
+from bento.extra.flake8 import Flake8Tool
 from bento.parser import Parser
-from bento.tool import output, runner
 from bento.violation import Violation
 
 """
@@ -58,10 +58,9 @@ class DlintParser(Parser[str]):
         return violations
 
 
-class DlintTool(runner.Python, output.Str):
+class DlintTool(Flake8Tool):
     TOOL_ID = "dlint"
     VENV_DIR = "dlint"
-    PROJECT_NAME = "Python"
     PACKAGES = {"dlint": SimpleSpec("~=0.10.2"), "flake8-json": SimpleSpec("~=19.8.0")}
 
     @property
@@ -69,31 +68,12 @@ class DlintTool(runner.Python, output.Str):
         return DlintParser
 
     @classmethod
-    def tool_id(self) -> str:
-        return DlintTool.TOOL_ID
+    def tool_id(cls) -> str:
+        return cls.TOOL_ID
 
     @classmethod
     def tool_desc(cls) -> str:
         return "A tool for encouraging best coding practices and helping ensure Python code is secure"
 
-    @classmethod
-    def venv_subdir_name(cls) -> str:
-        return DlintTool.VENV_DIR
-
-    @property
-    def project_name(self) -> str:
-        return DlintTool.PROJECT_NAME
-
     def select_clause(self) -> str:
         return f"--select={','.join(DLINT_TO_BENTO.keys())}"
-
-    def run(self, paths: Iterable[str]) -> str:
-        cmd = [
-            "python",
-            str(self.venv_dir() / "bin" / "flake8"),
-            self.select_clause(),
-            "--format=json",
-            "--isolated",
-            *paths,
-        ]
-        return self.venv_exec(cmd, check_output=False)
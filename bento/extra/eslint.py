@@ -185,6 +185,15 @@ class EslintTool(runner.Node, output.Json):
     def eslintrc_path(self) -> Path:
         return self.install_location / EslintTool.CONFIG_FILE_NAME
 
+    def can_use_file_cache(self) -> bool:
+        return True
+
+    def can_shard(self) -> bool:
+        return True
+
+    def extra_cache_paths(self) -> List[Path]:
+        return [self.eslintrc_path, self.install_location / "package.json"]
+
     def matches_project(self, files: Iterable[Path]) -> bool:
         return (self.context.base_path / "package.json").exists()
 
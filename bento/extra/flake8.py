@@ -1,10 +1,16 @@
 import json
-from typing import Any, Dict, Iterable, List, Mapping, Type
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Type, cast
 
+import attr
 from semantic_version import SimpleSpec
 
+import bento.constants as constants
 from bento.parser import Parser
-from bento.tool import output, runner
+from bento.tool import Tool, output, runner
+from bento.tool.engine import Engine
 from bento.violation import Violation
 
 # Input example:
@@ -25,6 +31,9 @@ from bento.violation import Violation
 # Only these prefixes will be inspected
 RULE_PREFIXES = "B,C90,E113,E74,E9,EXE,F,T100,W6"
 
+INSTALLED_FILE_NAME = "bento-installed"
+"""Written to a shared flake8 environment once it is set up, listing its packages"""
+
 FLAKE8_TO_BENTO = {
     "B001": "bare-except-bugbear",
     "B002": "unsupported-unary-increment",
@@ -183,10 +192,28 @@ class Flake8Tool(runner.Python, output.Str):
     def venv_subdir_name(self) -> str:
         return self.VENV_DIR
 
+    def can_use_file_cache(self) -> bool:
+        return True
+
+    def can_shard(self) -> bool:
+        return True
+
+    def engine_type(self) -> Optional[Type[Engine]]:
+        return Flake8Engine
+
     def select_clause(self) -> str:
         """Returns a --select argument to identify which checks flake8 should run"""
         return f"--select={RULE_PREFIXES}"
 
+    def code_prefixes(self) -> List[str]:
+        """
+        Returns prefixes of the codes of this tool's checks
+
+        Used to tell this tool's findings apart when flake8 runs with other tools'
+        plugins; by default, the prefixes in the --select argument.
+        """
+        return self.select_clause().split("=", 1)[1].split(",")
+
     def run(self, paths: Iterable[str]) -> str:
         cmd = [
             "python",
@@ -197,3 +224,113 @@ class Flake8Tool(runner.Python, output.Str):
             *paths,
         ]
         return self.venv_exec(cmd, check_output=False)
+
+
+@attr.s
+class SharedFlake8(Flake8Tool):
+    """
+    A flake8 installation, in its own environment, with every plugin of several tools
+
+    :param venv_name: The environment's directory name
+    :param packages: The packages that every tool needs
+    :param prefixes: The prefixes of every tool's checks
+    """
+
+    venv_name = attr.ib(type=str, default="")
+    packages = attr.ib(type=Dict[str, SimpleSpec], factory=dict)
+    prefixes = attr.ib(type=List[str], factory=list)
+
+    def venv_dir(self) -> Path:  # type: ignore
+        return constants.VENV_PATH / self.venv_name
+
+    def required_packages(self) -> Dict[str, SimpleSpec]:  # type: ignore
+        return self.packages
+
+    def select_clause(self) -> str:
+        return f"--select={','.join(self.prefixes)}"
+
+    def installed(self) -> bool:
+        """
+        Returns whether setup has installed this environment's packages
+        """
+        marker = self.venv_dir() / INSTALLED_FILE_NAME
+        return marker.exists() and marker.read_text() == self.cache_version()
+
+    def setup(self) -> None:
+        super().setup()
+        (self.venv_dir() / INSTALLED_FILE_NAME).write_text(self.cache_version())
+
+
+@attr.s
+class Flake8Engine(Engine[str]):
+    """
+    Runs flake8 once for several flake8-based tools
+
+    Tools whose package requirements agree share an environment with all of their
+    plugins; flake8 runs with the union of their --select arguments, and each tool
+    receives the findings whose codes match its code prefixes.
+    """
+
+    _flake8 = attr.ib(type=SharedFlake8, init=False)
+
+    @_flake8.default
+    def _init_flake8(self) -> SharedFlake8:
+        members = self._flake8_members()
+        packages: Dict[str, SimpleSpec] = {}
+        for t in members:
+            packages.update(t.required_packages())
+        names = sorted(t.venv_subdir_name() for t in members)
+        return SharedFlake8(
+            members[0].context,
+            venv_name="+".join(names),
+            packages=packages,
+            prefixes=sorted({p for t in members for p in t.code_prefixes()}),
+        )
+
+    def _flake8_members(self) -> List[Flake8Tool]:
+        return [cast(Flake8Tool, t) for t in self.members]
+
+    @classmethod
+    def groups(cls, tools: List[Tool]) -> List[List[Tool]]:
+        """
+        Groups tools greedily, adding each to the first group whose packages don't
+        conflict with its own (i.e. any package both need has the same version spec)
+        """
+        groups: List[Tuple[Dict[str, SimpleSpec], List[Tool]]] = []
+        for t in tools:
+            packages = cast(Flake8Tool, t).required_packages()
+            for merged, members in groups:
+                if all(
+                    merged[name].expression == spec.expression
+                    for name, spec in packages.items()
+                    if name in merged
+                ):
+                    merged.update(packages)
+                    members.append(t)
+                    break
+            else:
+                groups.append((dict(packages), [t]))
+        return [members for _, members in groups]
+
+    def installed(self) -> bool:
+        return self._flake8.installed()
+
+    def _setup(self) -> None:
+        self._flake8.setup()
+
+    def run(self, paths: List[str]) -> Mapping[str, Any]:
+        results: Dict[str, List[Dict[str, Any]]] = json.loads(self._flake8.run(paths))
+        logging.debug(f"flake8 engine: checked {len(paths)} files")
+        return {os.path.normpath(path): r for path, r in results.items()}
+
+    def member_output(self, tool: Tool[str], records: Mapping[str, Any]) -> str:
+        prefixes = tuple(cast(Flake8Tool, tool).code_prefixes())
+        return json.dumps(
+            {
+                path: [r for r in results if r["code"].startswith(prefixes)]
+                for path, results in records.items()
+            }
+        )
+
+    def output(self, tool: Tool[str], paths: List[str]) -> str:
+        return super().output(tool, [os.path.normpath(p) for p in paths])
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import List, Type
 
 from semantic_version import SimpleSpec
 
@@ -47,3 +47,6 @@ class FlaskTool(Flake8Tool):
 
     def select_clause(self) -> str:
         return "--select=r2c"
+
+    def code_prefixes(self) -> List[str]:
+        return [PREFIX]
@@ -1,8 +1,9 @@
 import json
+import os
 import re
 import sys
-from pathlib import PurePath
-from typing import Any, Dict, Iterable, List, Pattern, Type
+from pathlib import Path, PurePath
+from typing import Any, Dict, Iterable, List, Pattern, Set, Type
 
 from bento.parser import Parser
 from bento.tool import JsonR, output, runner
@@ -20,7 +21,8 @@ class GosecParser(Parser[JsonR]):
         column = int(result["column"])
         check_id = result["rule_id"]
         message = result["details"]
-        path = str(PurePath(result["file"]).relative_to(REMOTE_BASE_PATH))
+        analyzed = str(PurePath(result["file"]).relative_to(REMOTE_BASE_PATH))
+        path = self.trim_base(analyzed)
 
         level = result["severity"]
         severity = self.SEVERITIES.get(level, 0)
@@ -28,7 +30,8 @@ class GosecParser(Parser[JsonR]):
         link = result.get("cwe", {}).get("URL", "")
 
         line_of_code = (
-            fetch_line_in_file(self.base_path / path, start_line) or "<no source found>"
+            fetch_line_in_file(self.source_path(analyzed), start_line)
+            or "<no source found>"
         )
 
         return Violation(
@@ -51,8 +54,9 @@ class GosecTool(runner.Docker, output.Json):
     """
     Runs securego/gosec.
 
-    Note that the runtime of this tool is independent of the number of paths Bento is running on,
-    and is always linear in the size of the project, due to limitations of the wrapped gosec interface.
+    Note that this tool scans whole packages (directories), due to limitations of the wrapped gosec
+    interface, so its runtime is linear in the size of the packages that contain the paths Bento is
+    running on.
     """
 
     TOOL_ID = "gosec"
@@ -94,18 +98,23 @@ class GosecTool(runner.Docker, output.Json):
     def is_allowed_returncode(self, returncode: int) -> bool:
         return returncode == 0 or returncode == 1
 
-    # gosec only operates on modules, not individual files, so we
-    # set the max batch size to effectively unbounded, and filter the results
-    # returned by gosec
+    # gosec only operates on packages, not individual files, so we
+    # set the max batch size to effectively unbounded, scan each package that
+    # contains a queried path, and filter the results returned by gosec
     #
-    # Unfortunately this means the runtime of gosec is constant with the number
-    # of queried paths, and linear in the project size :(
+    # This means the runtime of gosec is linear in the size of those packages,
+    # not in the number of queried paths
     @classmethod
     def max_batch_size(cls) -> int:
         return sys.maxsize
 
+    def package_dirs(self, paths: Iterable[Path]) -> Set[Path]:
+        return {p.parent for p in paths if self.FILE_FILTER.match(p.name)}
+
     def assemble_full_command(self, targets: Iterable[str]) -> List[str]:
-        return self.docker_command + [self.remote_code_path]
+        # Each directory is a Go package; "./" marks a path rather than an import path
+        dirs = {os.path.dirname(t) for t in targets}
+        return self.docker_command + sorted(f"./{d}" if d else "." for d in dirs)
 
     def filter_result_paths(self, results: JsonR, files: Iterable[str]) -> JsonR:
         """Filters gosec results to only files that we care about"""
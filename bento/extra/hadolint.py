@@ -14,9 +14,7 @@ class HadolintParser(Parser[JsonR]):
         column = result["column"]
         check_id = result["code"]
         message = result["message"]
-        path = result["file"]
-
-        path = self.trim_base(path)
+        path = self.trim_base(result["file"])
 
         level = result["level"]
         severity = 0
@@ -33,7 +31,8 @@ class HadolintParser(Parser[JsonR]):
             link = ""
 
         line_of_code = (
-            fetch_line_in_file(self.base_path / path, start_line) or "<no source found>"
+            fetch_line_in_file(self.source_path(result["file"]), start_line)
+            or "<no source found>"
         )
 
         if check_id == "DL1000":
@@ -92,6 +91,9 @@ class HadolintTool(runner.Docker, output.Json):
     def remote_code_path(self) -> str:
         return "/mnt"
 
+    def can_use_file_cache(self) -> bool:
+        return True
+
     def is_allowed_returncode(self, returncode: int) -> bool:
         return returncode == 0 or returncode == 1
 
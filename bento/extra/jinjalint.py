@@ -119,6 +119,12 @@ class JinjalintTool(runner.Python, output.Str):
         has_python = any((self.PYTHON_FILE_PATTERN.match(p.name) for p in files))
         return has_jinja and has_python
 
+    def can_use_file_cache(self) -> bool:
+        return True
+
+    def can_shard(self) -> bool:
+        return True
+
     def run(self, paths: Iterable[str]) -> str:
         launchpoint: str = str(self.venv_dir() / "bin" / "jinjalint")
         exclude_rules = [
@@ -29,7 +29,7 @@ PINNED_PYRE_VERSION = "0.0.32"
 class PyreParser(Parser):
     def to_violation(self, result: Dict[str, Any]) -> Violation:
         path = self.trim_base(result["path"])
-        abspath = self.base_path / path
+        abspath = self.source_path(result["path"])
 
         check_id = str(result["code"])
         line = result["line"]
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import List, Type
 
 from semantic_version import SimpleSpec
 
@@ -6,9 +6,11 @@ from bento.extra.flake8 import Flake8Parser, Flake8Tool
 from bento.parser import Parser
 from bento.tool import output
 
+PREFIX = "r2c-requests-"
+
 
 class RequestsParser(Flake8Parser):
-    CHECK_PREFIX_LEN = len("r2c-requests-")
+    CHECK_PREFIX_LEN = len(PREFIX)
 
     @staticmethod
     def id_to_link(check_id: str) -> str:
@@ -47,3 +49,6 @@ class RequestsTool(Flake8Tool):
 
     def select_clause(self) -> str:
         return "--select=r2c"
+
+    def code_prefixes(self) -> List[str]:
+        return [PREFIX]
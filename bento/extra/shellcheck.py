@@ -26,7 +26,8 @@ class ShellcheckParser(Parser[JsonR]):
 
         link = f"https://github.com/koalaman/shellcheck/wiki/{check_id}"
         line_of_code = (
-            fetch_line_in_file(self.base_path / path, start_line) or "<no source found>"
+            fetch_line_in_file(self.source_path(result["file"]), start_line)
+            or "<no source found>"
         )
 
         return Violation(
@@ -91,6 +92,9 @@ class ShellcheckTool(runner.Docker, output.Json):
     def docker_command(self) -> List[str]:
         return ["--severity", "info", "-f", "json"]
 
+    def can_use_file_cache(self) -> bool:
+        return True
+
     def is_allowed_returncode(self, returncode: int) -> bool:
         return returncode == 0 or returncode == 1
 
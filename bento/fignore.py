@@ -1,14 +1,34 @@
 import fnmatch
+import hashlib
+import json
 import logging
 import os
 import re
+import stat
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Collection, Dict, Iterable, Iterator, List, Mapping, Set, TextIO
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+)
 
 import attr
 
 import bento.constants as constants
+from bento import __version__ as BENTO_VERSION
 from bento.util import echo_warning
 
 CONTROL_REGEX = re.compile(r"(?!<\\):")  # Matches unescaped colons
@@ -26,107 +46,542 @@ class Entry:
 
 @attr.s(auto_attribs=True)
 class WalkEntries(Collection[Entry]):
-    cache: Dict[Path, Entry]
+    cache: Dict[str, bool]
 
     def __len__(self) -> int:
         return len(self.cache)
 
     def __iter__(self) -> Iterator[Entry]:
-        return iter(self.cache.values())
+        return (Entry(Path(p), survives) for p, survives in self.cache.items())
 
     def __contains__(self, item: object) -> bool:
-        return isinstance(item, Entry) and item.path in self.cache
+        return isinstance(item, Entry) and str(item.path) in self.cache
+
+
+WILDCARD_CHARS = "*?["
+
+WALK_THREADS = 1
+"""Threads that list directories while walking; 1 walks in the calling thread"""
+
+ScanItem = Union[Tuple[str, bool], str]
+"""A listed (path, survives) pair, or a directory to walk"""
+
+LISTED_IGNORED = 0
+LISTED_FILE = 1
+LISTED_DIR = 2
+DirListing = Tuple[int, List[Tuple[str, int]]]
+"""A directory's mtime, and the (name, LISTED_*) kind of each entry it lists"""
+
+MTIME_GRANULARITY_NS = 2 * 10 ** 9
+"""The coarsest mtime resolution of common filesystems (FAT's)"""
+
+
+def _union(fnmatch_patterns: Iterable[str]) -> Optional[Pattern]:
+    """
+    Compiles fnmatch patterns into a single regex that matches if any pattern does
+    """
+    # Runs of "*" are equivalent to a single "*", but backtrack much more
+    translated = sorted(
+        fnmatch.translate(re.sub(r"\*+", "*", p)) for p in fnmatch_patterns
+    )
+    return re.compile("|".join(translated)) if translated else None
+
+
+@attr.s
+class _NameRule:
+    """
+    Matches path components against `**/name` and `**/*suffix` patterns that have no
+    other wildcards
+    """
+
+    names = attr.ib(type=Set[str], factory=set)
+    suffixes = attr.ib(type=Tuple[str, ...], default=())
+
+    def add(self, pattern: str) -> bool:
+        """
+        Adds pattern to this rule
+
+        :return: False if pattern has any other form
+        """
+        if not pattern.startswith("**/"):
+            return False
+        name = pattern[3:]
+        is_suffix = name.startswith("*")
+        if is_suffix:
+            name = name[1:]
+        if not name or "/" in name or any(c in name for c in WILDCARD_CHARS):
+            return False
+        if is_suffix:
+            self.suffixes = (*self.suffixes, name)
+        else:
+            self.names.add(name)
+        return True
+
+    def matches(self, name: str) -> bool:
+        return name in self.names or name.endswith(self.suffixes)
+
+    def __bool__(self) -> bool:
+        return bool(self.names or self.suffixes)
+
+
+@attr.s
+class IgnoreMatcher:
+    """
+    Decides which paths processed ignore patterns exclude
+
+    Patterns are compiled once, into buckets:
+      - Literal names and name suffixes (`**/name`, `**/*.ext`, and their directory
+        forms), which are checked against a path's components with set lookups and
+        string comparisons
+      - Everything else, compiled into one alternation regex per matching rule
+
+    so that each path costs a few lookups and at most three regex matches. Paths are
+    only stat-ed when a directory pattern matches and the caller did not say whether
+    the path is a directory.
+
+    Semantics match checking each pattern with fnmatch:
+      - a pattern matches the full path;
+      - a directory pattern `p/` matches a directory whose full path matches `p`;
+      - a directory pattern matches any path beneath such a directory, relative to
+        the base path (so that patterns never match the base path's own parents).
+
+    :param base_path: The path that patterns are relative to
+    :param patterns: Patterns, as output by Processor.process
+    """
+
+    base_path = attr.ib(type=Path)
+    patterns = attr.ib(type=Set[str])
+    _base = attr.ib(type=str, init=False)
+    _names = attr.ib(type=_NameRule, factory=_NameRule, init=False)
+    _dir_names = attr.ib(type=_NameRule, factory=_NameRule, init=False)
+    _path_regex = attr.ib(type=Optional[Pattern], default=None, init=False)
+    _dir_regex = attr.ib(type=Optional[Pattern], default=None, init=False)
+    _relative_regex = attr.ib(type=Optional[Pattern], default=None, init=False)
+
+    def __attrs_post_init__(self) -> None:
+        self._base = str(self.base_path)
+        path_patterns = []
+        dir_patterns = []
+        relative_patterns = []
+        for p in self.patterns:
+            if not p.endswith("/"):
+                if not self._names.add(p):
+                    path_patterns.append(p)
+            elif not self._dir_names.add(p[:-1]):
+                dir_patterns.append(p[:-1])
+                relative_patterns.append(p + "*")
+                if p.startswith(self._base):
+                    path_patterns.append(p + "*")
+        self._path_regex = _union(path_patterns)
+        self._dir_regex = _union(dir_patterns)
+        self._relative_regex = _union(relative_patterns)
+
+    def _relative(self, path: str) -> Optional[str]:
+        """
+        Returns path relative to the base path, with a leading "/"
+        """
+        if path == self._base:
+            return "/."
+        if self._base == ".":
+            return "/" + path
+        prefix = self._base if self._base.endswith("/") else self._base + "/"
+        if path.startswith(prefix):
+            return "/" + path[len(prefix) :]
+        return None
+
+    def matches(self, path: Path, is_dir: Optional[bool] = None) -> bool:
+        """
+        Returns True if any pattern excludes path
+
+        :param is_dir: Whether path is a directory; if None, and a directory pattern
+                       could apply, path is stat-ed to find out
+        """
+        return self.matches_str(str(path), path.name, is_dir)
+
+    def matches_str(
+        self,
+        path: str,
+        name: str,
+        is_dir: Optional[bool] = None,
+        parents_survive: bool = False,
+    ) -> bool:
+        """
+        As matches, for a path given as a string with its final component
+
+        :param parents_survive: True if the path's parent directory is known not to
+                                be excluded, so that literal directory names need not
+                                be checked against its parents
+        """
+        # `**/name` patterns need a "/" to match
+        has_parent = "/" in path
+        if has_parent and self._names.matches(name):
+            return True
+        if self._path_regex and self._path_regex.match(path):
+            return True
+
+        rel = self._relative(path)
+        if rel is not None:
+            if self._relative_regex and self._relative_regex.match(rel):
+                return True
+            if self._dir_names and not parents_survive:
+                parents = rel.split("/")[1:-1]
+                if any(self._dir_names.matches(p) for p in parents):
+                    return True
+
+        could_be_dir = (has_parent and self._dir_names.matches(name)) or (
+            self._dir_regex is not None and self._dir_regex.match(path) is not None
+        )
+        if could_be_dir:
+            return os.path.isdir(path) if is_dir is None else is_dir
+        return False
+
+
+@attr.s
+class DirectoryIndex:
+    """
+    A persisted record of each walked directory's listing, keyed by its mtime
+
+    Adding, removing, or renaming a directory's entries changes its mtime, so a
+    directory whose mtime is unchanged need not be listed or matched again. The
+    record is discarded whenever the ignore patterns (including any :included
+    files) change.
+
+    As with StatIndex, a directory modified within the same mtime tick as the
+    index was written is not trusted.
+    """
+
+    index_path: Path = attr.ib(converter=Path)
+    fingerprint = attr.ib(type=str)
+    _lock = attr.ib(type=threading.Lock, factory=threading.Lock, init=False)
+    _listings = attr.ib(type=Dict[str, DirListing], default=None, init=False)
+    _visited = attr.ib(type=Dict[str, DirListing], factory=dict, init=False)
+    _dirty = attr.ib(type=bool, default=False, init=False)
+
+    def _load(self) -> Dict[str, DirListing]:
+        if not self.index_path.exists():
+            return {}
+        try:
+            with self.index_path.open() as file:
+                stored = json.load(file)
+        except (OSError, ValueError):
+            logging.error(f"Failed to read directory index {self.index_path}")
+            return {}
+
+        if (
+            stored.get("version") != BENTO_VERSION
+            or stored.get("fingerprint") != self.fingerprint
+        ):
+            return {}
+        written_ns = self.index_path.stat().st_mtime_ns
+        return {
+            directory: (mtime, [(name, kind) for name, kind in items])
+            for directory, (mtime, items) in stored.get("directories", {}).items()
+            if mtime < written_ns
+        }
+
+    def scan(
+        self, directory: str, lister: Callable[[], List[ScanItem]]
+    ) -> List[ScanItem]:
+        """
+        Returns directory's listing, calling lister only if directory changed since
+        its listing was recorded
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return lister()
+        with self._lock:
+            if self._listings is None:
+                self._listings = self._load()
+            known = self._listings.get(directory)
+
+        if known is not None and known[0] == mtime:
+            listing = known
+        else:
+            listing = (mtime, _encode_listing(lister()))
+            with self._lock:
+                self._dirty = True
+        with self._lock:
+            self._visited[directory] = listing
+        return _decode_listing(directory, listing[1])
+
+    def refresh(self, walk_started_ns: int) -> None:
+        """
+        Keeps the listings of the walk that started at walk_started_ns, so that the
+        next walk need only list directories that changed since
+
+        Directories modified within MTIME_GRANULARITY_NS of the walk's start are
+        listed again next time, since a change in the same mtime tick as their
+        listing would not change their mtime.
+        """
+        trusted_before = walk_started_ns - MTIME_GRANULARITY_NS
+        with self._lock:
+            listings = self._listings or {}
+            listings.update(
+                (d, listing)
+                for d, listing in self._visited.items()
+                if listing[0] < trusted_before
+            )
+            self._listings = listings
+            self._visited = {}
+
+    def save(self, target_paths: Iterable[Path]) -> None:
+        """
+        Persists the listings of all directories walked beneath target_paths
+
+        Recorded directories beneath target_paths that were not walked no longer
+        exist (or are now ignored), so are dropped.
+        """
+        with self._lock:
+            listings = self._listings or {}
+            prefixes = tuple(str(p) for p in target_paths)
+            walked = tuple(os.path.join(p, "") for p in prefixes)
+            stale = [
+                d
+                for d in listings
+                if d not in self._visited and (d in prefixes or d.startswith(walked))
+            ]
+            if not self._dirty and not stale:
+                return
+            directories = {
+                d: [mtime, [list(i) for i in items]]
+                for d, (mtime, items) in listings.items()
+                if d not in stale
+            }
+            directories.update(
+                (d, [mtime, [list(i) for i in items]])
+                for d, (mtime, items) in self._visited.items()
+            )
+            self._dirty = False
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Each walk has its own index, and concurrent runs may walk at once
+        tmp_path = self.index_path.with_suffix(
+            f".{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with tmp_path.open("w") as file:
+            json.dump(
+                {
+                    "version": BENTO_VERSION,
+                    "fingerprint": self.fingerprint,
+                    "directories": directories,
+                },
+                file,
+            )
+        tmp_path.replace(self.index_path)
+
+
+def _encode_listing(items: List[ScanItem]) -> List[Tuple[str, int]]:
+    return [
+        (os.path.basename(i), LISTED_DIR)
+        if isinstance(i, str)
+        else (os.path.basename(i[0]), LISTED_FILE if i[1] else LISTED_IGNORED)
+        for i in items
+    ]
+
+
+def _decode_listing(directory: str, encoded: List[Tuple[str, int]]) -> List[ScanItem]:
+    return [
+        os.path.join(directory, name)
+        if kind == LISTED_DIR
+        else (os.path.join(directory, name), kind == LISTED_FILE)
+        for name, kind in encoded
+    ]
 
 
 @attr.s
 class FileIgnore(Mapping[Path, Entry]):
+    """
+    Finds the files beneath target_paths that survive the ignore patterns
+
+    :param threads: Number of threads that list directories while walking
+    :param listed_files: If defined, the absolute paths of all files beneath
+                         target_paths (for instance, as listed by git), which are
+                         filtered instead of walking target_paths
+    :param index_path: If defined, where to persist a DirectoryIndex, so that later
+                       walks only list directories that changed
+    """
+
     base_path = attr.ib(type=Path)
     patterns = attr.ib(type=Set[str])
     target_paths = attr.ib(type=List[Path])
+    threads = attr.ib(type=int, default=WALK_THREADS, kw_only=True)
+    listed_files = attr.ib(type=Optional[List[str]], default=None, kw_only=True)
+    index_path = attr.ib(type=Optional[Path], default=None, kw_only=True)
     _processed_patterns = attr.ib(type=Set[str], init=False)
-    _walk_cache: Dict[Path, Entry] = attr.ib(default=None, init=False)
+    _matcher = attr.ib(type=IgnoreMatcher, init=False)
+    # Whether each walked path survives, by path string; Entries are built on demand
+    _walk_cache: Dict[str, bool] = attr.ib(default=None, init=False)
+    _index = attr.ib(type=Optional[DirectoryIndex], default=None, init=False)
 
     def __attrs_post_init__(self) -> None:
         self._processed_patterns = Processor(self.base_path).process(self.patterns)
+        self._matcher = IgnoreMatcher(self.base_path, self._processed_patterns)
+        if self.index_path is not None:
+            self._index = DirectoryIndex(self.index_path, self._fingerprint())
         self._init_cache()
 
-    def _survives(self, path: Path) -> bool:
+    def _fingerprint(self) -> str:
         """
-        Determines if a single Path survives the ignore filter.
+        Returns a digest of everything, other than directory contents, that
+        determines which files survive
         """
-        for p in self._processed_patterns:
-            if path.is_dir() and p.endswith("/") and fnmatch.fnmatch(str(path), p[:-1]):
-                return False
-            if fnmatch.fnmatch(str(path), p):
-                return False
-
-            # Check any subpath of path satisfies a pattern
-            # i.e. a/b/c/d is ignored with rule a/b
-            # This is a hack. TargetFileManager should be pruning while searching
-            # instead of post filtering to avoid this
-            # Note: Use relative to base to avoid ignore rules firing on parent directories
-            # i.e. /private/var/.../instabot should not be ignored with var/ rule
-            # in instabot dir as base_path
-            # Note: Append "/" to path before running fnmatch so **/pattern matches with pattern/stuff
-            if p.endswith("/") and fnmatch.fnmatch(
-                "/" + str(path.relative_to(self.base_path)), p + "*"
-            ):
-                return False
-            if (
-                p.endswith("/")
-                and p.startswith(str(self.base_path))
-                and fnmatch.fnmatch(str(path), p + "*")
-            ):
-                return False
+        h = hashlib.sha256(str(self.base_path).encode())
+        for pattern in sorted(self._processed_patterns):
+            h.update(b"\0" + pattern.encode())
+        return h.hexdigest()
 
-        return True
+    def survives(self, path: Path, is_dir: Optional[bool] = None) -> bool:
+        """
+        Determines if a single Path survives the ignore filter.
 
-    def _walk(self, this_path: str, root_path: str) -> Iterator[Entry]:
+        :param is_dir: Whether path is a directory, if already known (e.g. from a
+                       directory listing); avoids a stat
         """
-        Walks path, returning an Entry iterator for each item.
+        return not self._matcher.matches(path, is_dir)
 
-        If an item is not ignored, it is traversed recursively. Traversal stops on
-        ignored items.
+    def _walk(self, top: str) -> Iterator[Tuple[str, bool]]:
+        """
+        Walks top, yielding (path, survives) for each file that survives the ignore
+        filter, and for each file or directory that does not
 
-        Recalculates on every call.
+        Directories that do not survive are not descended into. Each directory entry
+        is typed from its directory listing, so is not stat-ed again; symlinks are
+        skipped.
         """
-        # Handle non existent paths passed to cli.
-        # TODO handle further up
-        if not Path(this_path).exists():
+        try:
+            st = os.stat(top)
+        except OSError:
+            # Handle non existent paths passed to cli.
+            # TODO handle further up
             return
+        if stat.S_ISREG(st.st_mode):
+            yield top, not self._matcher.matches_str(top, os.path.basename(top))
+        elif stat.S_ISDIR(st.st_mode) and self.threads > 1:
+            yield from self._walk_dir_parallel(top)
+        elif stat.S_ISDIR(st.st_mode):
+            yield from self._walk_dir(top)
+
+    def _scan_dir(self, directory: str, survives: bool) -> List[ScanItem]:
+        """
+        Lists a single directory
 
-        if Path(this_path).is_file():
-            yield Entry(Path(this_path), self._survives(Path(this_path)))
-        else:
-            for e in os.scandir(this_path):
-                if e.is_symlink():
-                    continue
-                elif self._survives(Path(e.path)):
-                    before = time.time()
-                    for ee in self._walk(e.path, root_path):
-                        yield ee
-                    filename = Path(this_path) / e.name
-                    logging.debug(f"Scanned {filename} in {time.time() - before} s")
+        :param survives: True if directory itself survives the ignore filter
+        :return: (path, survives) for each file that survives the ignore filter,
+                 and for each file or directory that does not; and the path of each
+                 directory that should be walked; all in listing order
+        """
+        items: List[ScanItem] = []
+        with os.scandir(directory) as it:
+            entries = list(it)
+        for e in entries:
+            if e.is_symlink():
+                continue
+            is_dir = e.is_dir(follow_symlinks=False)
+            if self._matcher.matches_str(e.path, e.name, is_dir, survives):
+                # TODO I think we can remove the false ones and have existence be survival
+                items.append((e.path, False))
+            elif is_dir:
+                items.append(e.path)
+            elif e.is_file(follow_symlinks=False):
+                items.append((e.path, True))
+        return items
+
+    def _list_dir(self, directory: str, survives: bool) -> List[ScanItem]:
+        """
+        As _scan_dir, but reuses the directory's indexed listing if it is unchanged
+        """
+        if self._index is None:
+            return self._scan_dir(directory, survives)
+        return self._index.scan(directory, lambda: self._scan_dir(directory, survives))
+
+    def _walk_dir(self, directory: str) -> Iterator[Tuple[str, bool]]:
+        def expand(d: str, survives: bool) -> Iterator[Tuple[str, bool]]:
+            for item in self._list_dir(d, survives):
+                if isinstance(item, str):
+                    yield from expand(item, True)
                 else:
-                    # TODO I think we can remove the false ones and have existence be survival
-                    yield Entry(Path(e.path), False)
+                    yield item
+
+        return expand(directory, False)
+
+    def _walk_dir_parallel(self, directory: str) -> Iterator[Tuple[str, bool]]:
+        """
+        As _walk_dir, but lists directories on a pool of threads
+
+        Each listed directory immediately queues its subdirectories, so the pool
+        stays busy however the tree is shaped. Output is in the same order as
+        _walk_dir.
+        """
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="walk") as executor:
+            scans: Dict[str, "Future[List[ScanItem]]"] = {}
+
+            def scan(d: str, survives: bool) -> List[ScanItem]:
+                items = self._list_dir(d, survives)
+                for item in items:
+                    if isinstance(item, str):
+                        scans[item] = executor.submit(scan, item, True)
+                return items
+
+            def expand(d: str) -> Iterator[Tuple[str, bool]]:
+                for item in scans.pop(d).result():
+                    if isinstance(item, str):
+                        yield from expand(item)
+                    else:
+                        yield item
+
+            scans[directory] = executor.submit(scan, directory, False)
+            yield from expand(directory)
 
     def _init_cache(self) -> None:
         pretty_patterns = "\n".join(self.patterns)
         logging.info(f"Ignored patterns are:\n{pretty_patterns}")
         before = time.time()
         self._walk_cache = {}
-        for target in self.target_paths:
-            entries = self._walk(str(target), str(self.base_path))
-            self._walk_cache.update(dict((e.path, e) for e in entries))
+        if self.listed_files is not None:
+            for path_str in self.listed_files:
+                self._walk_cache[path_str] = not self._matcher.matches_str(
+                    path_str, os.path.basename(path_str), False
+                )
+        else:
+            for target in self.target_paths:
+                top = str(target)
+                walked = self._walk(top)
+                if top == os.curdir:
+                    # Keep keys equal to str() of their Paths, which drop the "./"
+                    walked = ((p[2:], survives) for p, survives in walked)
+                self._walk_cache.update(walked)
+            if self._index is not None:
+                self._index.save(self.target_paths)
         logging.info(f"Loaded file ignore cache in {time.time() - before} s.")
 
+    def walk(self, target_paths: Iterable[Path]) -> Dict[str, bool]:
+        """
+        Walks target_paths afresh, returning whether each walked path survives
+
+        With an index, only directories that changed since the previous walk are
+        listed again.
+        """
+        started_ns = int(time.time() * 10 ** 9)
+        walked: Dict[str, bool] = {}
+        for target in target_paths:
+            walked.update(self._walk(str(target)))
+        if self._index is not None:
+            self._index.refresh(started_ns)
+        return walked
+
     def entries(self) -> Collection[Entry]:
         """
         Returns all files that are not ignored, relative to the base path.
         """
         return WalkEntries(self._walk_cache)
 
+    def surviving(self) -> Iterator[str]:
+        """
+        Iterates over the paths, as strings, of all files that are not ignored
+        """
+        return (p for p, survives in self._walk_cache.items() if survives)
+
     def filter_paths(self, paths: Iterable[Path]) -> List[Path]:
         abspaths = (p.absolute() for p in paths if p.exists())
         return [
@@ -136,16 +591,16 @@ class FileIgnore(Mapping[Path, Entry]):
         ]
 
     def __getitem__(self, item: Path) -> Entry:
-        return self._walk_cache[item]
+        return Entry(item, self._walk_cache[str(item)])
 
     def __iter__(self) -> Iterator[Path]:
-        return iter(self._walk_cache)
+        return (Path(p) for p in self._walk_cache)
 
     def __len__(self) -> int:
         return len(self._walk_cache)
 
     def __contains__(self, item: object) -> bool:
-        return item in self._walk_cache
+        return isinstance(item, Path) and str(item) in self._walk_cache
 
 
 @attr.s(auto_attribs=True)
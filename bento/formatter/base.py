@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Collection, Dict, List, Mapping
+from typing import Any, Collection, Dict, List, Mapping, Optional
 
 import attr
 
@@ -26,6 +26,17 @@ class Formatter(ABC):
         """Formats the list of violations for the end user."""
         pass
 
+    def dump_partial(
+        self, tool_id: str, violations: Collection[Violation]
+    ) -> Optional[Collection[str]]:
+        """
+        Formats a single tool's violations, as soon as that tool completes
+
+        Returns None if this formatter can only format all tools' violations at once,
+        in which case `dump` is used after all tools complete.
+        """
+        return None
+
     @staticmethod
     def path_of(violation: Violation) -> str:
         return violation.path
@@ -2,7 +2,7 @@ import itertools
 import shutil
 import sys
 import textwrap
-from typing import Collection, List
+from typing import Collection, List, Optional
 
 import click
 
@@ -90,3 +90,8 @@ class Clippy(Formatter):
                 lines.append("")
 
         return lines
+
+    def dump_partial(
+        self, tool_id: str, violations: Collection[Violation]
+    ) -> Optional[Collection[str]]:
+        return self.dump({tool_id: violations})
@@ -1,7 +1,7 @@
 import itertools
 import shutil
 import textwrap
-from typing import Collection, List
+from typing import Collection, List, Optional
 
 import click
 
@@ -58,3 +58,8 @@ class Stylish(Formatter):
             lines.append("")
 
         return lines
+
+    def dump_partial(
+        self, tool_id: str, violations: Collection[Violation]
+    ) -> Optional[Collection[str]]:
+        return self.dump({tool_id: violations})
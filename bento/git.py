@@ -1,24 +1,104 @@
-import configparser
+import functools
+import os
+import subprocess
+import threading
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import attr
+from pre_commit.git import zsplit
 
 # XXX: This is hacky. This should maybe use the Context object or something to
 # determine the base directory.
 
-if TYPE_CHECKING:
-    # Only import when type checking to avoid loading module when unecessary
-    import git  # noqa
+REGULAR_MODES = ("100644 ", "100755 ")
+"""git file modes of regular files"""
+
+_memo: Dict[Tuple[str, str], Any] = {}
+_memo_lock = threading.Lock()
+
+
+def _memoized(key: Tuple[str, str], compute: Callable[[], Any]) -> Any:
+    """
+    Returns the process-wide memoized value for key, computing it on first use
+    """
+    with _memo_lock:
+        if key in _memo:
+            return _memo[key]
+    value = compute()
+    with _memo_lock:
+        return _memo.setdefault(key, value)
+
+
+def forget() -> None:
+    """
+    Forgets all memoized git state
+
+    Call this when the repository may have changed since it was last queried, e.g.
+    before each command served by a long-lived process.
+    """
+    with _memo_lock:
+        _memo.clear()
+
+
+@attr.s(frozen=True)
+class Repo:
+    """
+    A git repository
 
+    Unlike GitPython's Repo, this is located with a single git process and loads no
+    git objects; other queries each run one git process.
+    """
 
-def repo(path: Optional[Path] = None) -> Optional["git.Repo"]:
-    # import inside def for performance
-    import git.exc
+    working_tree_dir = attr.ib(type=Optional[str])
+    """The root of the working tree, or None for a bare repository"""
+    git_dir = attr.ib(type=str)
 
+    def execute(self, *args: str, check: bool = True) -> str:
+        """
+        Runs a git command in the working tree (or git directory, if bare), returning
+        its output
+
+        :param check: Whether to raise CalledProcessError if git fails; otherwise, the
+                      output of a failed command is returned
+        """
+        return subprocess.run(
+            ["git", *args],
+            cwd=self.working_tree_dir or self.git_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=check,
+            encoding="utf-8",
+            errors="surrogateescape",
+        ).stdout
+
+
+def _locate(path: str) -> Optional[Repo]:
     try:
-        r = git.Repo(str(path or Path.cwd()), search_parent_directories=True)
-        return r
-    except git.exc.InvalidGitRepositoryError:
+        # --show-toplevel fails, after printing the others, without a working tree
+        lines = subprocess.run(
+            ["git", "rev-parse", "--absolute-git-dir", "--show-toplevel"],
+            cwd=path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding="utf-8",
+            errors="surrogateescape",
+        ).stdout.splitlines()
+    except OSError:
+        return None
+    if not lines:
         return None
+    return Repo(working_tree_dir=lines[1] if len(lines) > 1 else None, git_dir=lines[0])
+
+
+def repo(path: Optional[Path] = None) -> Optional[Repo]:
+    """
+    Returns the git working tree containing path (by default, the current directory)
+
+    :return: The working tree, or None if path is not in one
+    """
+    start = str(path or Path.cwd())
+    return _memoized(("repo", start), lambda: _locate(start))
 
 
 # N.B. See https://stackoverflow.com/a/42613047
@@ -26,47 +106,266 @@ def user_email(path: Optional[Path] = None) -> Optional[str]:
     r = repo(path)
     if r is None:
         return None
-    try:
-        return r.config_reader().get_value("user", "email").strip("\"'")
-    except configparser.NoSectionError:
-        return None
-    except configparser.NoOptionError:
-        return None
+    value = r.execute("config", "--get", "user.email", check=False).strip()
+    return value.strip("\"'") or None
 
 
 def global_ignore_path(path: Optional[Path] = None) -> Optional[Path]:
     r = repo(path)
     if r is None:
         return None
-
-    try:
-        config_value = r.config_reader("global").get_value("core", "excludesfile")
-        return Path(config_value.strip()).expanduser()
-    except configparser.NoSectionError:
-        return None
-    except configparser.NoOptionError:
+    value = r.execute(
+        "config", "--global", "--get", "core.excludesfile", check=False
+    ).strip()
+    if not value:
         return None
+    return Path(value).expanduser()
+
+
+def _remote_url(r: Repo) -> Optional[str]:
+    # Each line is "remote.<name>.url <url>", in configuration order
+    output = r.execute("config", "--get-regexp", r"^remote\..*\.url$", check=False)
+    urls: Dict[str, str] = {}
+    for line in output.splitlines():
+        key, _, value = line.partition(" ")
+        urls.setdefault(key[len("remote.") : -len(".url")], value)
+    if "origin" in urls:
+        return urls["origin"]
+    return next(iter(urls.values()), None)
 
 
 def url(path: Optional[Path] = None) -> Optional[str]:
     """Get remote.origin.url for git dir at dirPath"""
     r = repo(path)
-    if r and r.remotes:
-        if any(rr.name == "origin" for rr in r.remotes):
-            return r.remotes.origin.url
-        else:
-            return r.remotes[0].url
-    else:
+    if r is None:
         return None
+    return _memoized(("url", r.git_dir), functools.partial(_remote_url, r))
+
+
+def _head_commit(r: Repo) -> Optional[str]:
+    # Fails in a repository without commits
+    output = r.execute("rev-parse", "-q", "--verify", "HEAD^{commit}", check=False)
+    return output.strip() or None
 
 
 def commit(path: Optional[Path] = None) -> Optional[str]:
     """Get head commit for git dir at dirPath"""
-    r = repo()
+    r = repo(path)
     if r is None:
         return None
-    try:
-        return str(r.head.commit)
-    except ValueError:
-        # catch case where local git repo without remote master
+    return _memoized(("commit", r.git_dir), functools.partial(_head_commit, r))
+
+
+def list_files(
+    paths: Sequence[Path], untracked: bool = False, path: Optional[Path] = None
+) -> Optional[List[str]]:
+    """
+    Lists files that git knows about beneath paths, without walking the filesystem
+
+    Symlinks, submodules, and files deleted from the working tree are omitted.
+
+    :param paths: Absolute paths to list
+    :param untracked: If True, also lists untracked files that git does not ignore
+    :return: Absolute file paths, or None if not in a git repository
+    """
+    r = repo(path)
+    if r is None or not r.working_tree_dir:
         return None
+    root = r.working_tree_dir
+    pathspecs = ["--", *(str(p) for p in paths)]
+
+    # Each line of --stage output is "<mode> <object> <stage>\t<path>"
+    staged = zsplit(r.execute("ls-files", "-z", "--stage", *pathspecs))
+    listed = {
+        line.split("\t", 1)[1] for line in staged if line.startswith(REGULAR_MODES)
+    }
+    listed -= set(zsplit(r.execute("ls-files", "-z", "--deleted", *pathspecs)))
+    files = [os.path.join(root, p) for p in sorted(listed)]
+
+    if untracked:
+        others = zsplit(
+            r.execute("ls-files", "-z", "--others", "--exclude-standard", *pathspecs)
+        )
+        files += [
+            f for f in (os.path.join(root, p) for p in others) if not os.path.islink(f)
+        ]
+    return files
+
+
+def tree_files(
+    revision: str, dirs: Iterable[str], path: Optional[Path] = None
+) -> List[str]:
+    """
+    Lists the files directly inside directories as of a revision
+
+    :param revision: A tree-ish (e.g. "HEAD"), or "" for the staged files
+    :param dirs: Directory paths relative to the repository root ("" for the root)
+    :return: File paths relative to the repository root
+    """
+    r = repo(path)
+    wanted = {os.path.normpath(d) if d else "" for d in dirs}
+    if r is None or not r.working_tree_dir or not wanted:
+        return []
+    pathspecs = ["--", *(d or "." for d in sorted(wanted))]
+    if revision:
+        cmd = ["ls-tree", "-r", "-z", "--name-only", revision, *pathspecs]
+    else:
+        cmd = ["ls-files", "-z", *pathspecs]
+    return [p for p in zsplit(r.execute(*cmd)) if os.path.dirname(p) in wanted]
+
+
+def read_blobs(
+    revision: str, paths: Iterable[str], path: Optional[Path] = None
+) -> Dict[str, bytes]:
+    """
+    Reads the contents of files as of a revision, with a single git process
+
+    :param revision: A tree-ish (e.g. "HEAD"), or "" for the files' staged contents
+    :param paths: File paths relative to the repository root
+    :return: The contents of each path that is a file at revision; other paths are
+             omitted
+    """
+    r = repo(path)
+    if r is None or not r.working_tree_dir:
+        return {}
+    # cat-file reads one object name per line
+    names = [p for p in paths if "\n" not in p]
+    batch = "".join(f"{revision}:{p}\n" for p in names).encode()
+    out = subprocess.run(
+        ["git", "cat-file", "--batch"],
+        input=batch,
+        stdout=subprocess.PIPE,
+        check=True,
+        cwd=r.working_tree_dir,
+    ).stdout
+
+    # Each object is "<oid> <type> <size>\n<contents>\n", or "<name> missing\n"
+    blobs = {}
+    pos = 0
+    for name in names:
+        eol = out.index(b"\n", pos)
+        header = out[pos:eol].split(b" ")
+        pos = eol + 1
+        if len(header) != 3 or not header[2].isdigit():
+            continue
+        size = int(header[2])
+        if header[1] == b"blob":
+            blobs[name] = out[pos : pos + size]
+        pos += size + 1
+    return blobs
+
+
+def blob_ids(
+    revision: str, paths: Iterable[str], path: Optional[Path] = None
+) -> Dict[str, str]:
+    """
+    Looks up the git object IDs of files as of a revision, with a single git process
+
+    :param revision: A tree-ish (e.g. "HEAD"), or "" for the files' staged contents
+    :param paths: File paths relative to the repository root
+    :return: The blob ID of each path that is a file at revision; other paths are
+             omitted
+    """
+    r = repo(path)
+    if r is None or not r.working_tree_dir:
+        return {}
+    names = [p for p in paths if "\n" not in p]
+    batch = "".join(f"{revision}:{p}\n" for p in names).encode()
+    out = subprocess.run(
+        ["git", "cat-file", "--batch-check"],
+        input=batch,
+        stdout=subprocess.PIPE,
+        check=True,
+        cwd=r.working_tree_dir,
+    ).stdout
+
+    # Each line is "<oid> <type> <size>", or "<name> missing"
+    ids = {}
+    for name, line in zip(names, out.decode().splitlines()):
+        header = line.split(" ")
+        if len(header) == 3 and header[1] == "blob":
+            ids[name] = header[0]
+    return ids
+
+
+def changed_files(
+    revision: str = "HEAD", since: Optional[str] = None, path: Optional[Path] = None
+) -> Optional[List[str]]:
+    """
+    Lists files that a revision adds or modifies
+
+    :param since: The revision to compare against; if not defined, revision's
+                  parent (or nothing, if revision has no parents)
+    :return: Absolute file paths, or None if not in a git repository
+    """
+    r = repo(path)
+    if r is None or not r.working_tree_dir:
+        return None
+    root = r.working_tree_dir
+    if since is None:
+        cmd = ["diff-tree", "--no-commit-id", "--root", "-r", revision]
+    else:
+        cmd = ["diff", since, revision]
+    output = r.execute(*cmd, "--name-only", "-z", "--diff-filter=d")
+    return [os.path.join(root, p) for p in zsplit(output)]
+
+
+def _unquote(name: str) -> str:
+    """
+    Decodes a path that git quoted (for containing special characters or non-ASCII)
+    """
+    if not name.startswith('"'):
+        return name
+    escaped = name[1:-1].encode("latin-1").decode("unicode_escape")
+    return escaped.encode("latin-1").decode("utf-8", "surrogateescape")
+
+
+def staged_line_ranges(path: Optional[Path] = None) -> Optional[Dict[str, List[range]]]:
+    """
+    Lists the lines that staged changes add or modify, with a single git process
+
+    :return: The ranges of staged line numbers (1-based) that differ from HEAD, by
+             absolute file path, or None if not in a git repository. Files whose
+             changes only remove lines map to no ranges; removed files are omitted.
+    """
+    r = repo(path)
+    if r is None or not r.working_tree_dir:
+        return None
+    root = r.working_tree_dir
+    # Output options are explicit, so that no user configuration changes the format
+    output = r.execute(
+        "-c",
+        "core.quotePath=true",
+        "diff",
+        "--staged",
+        "--unified=0",
+        "--no-color",
+        "--no-ext-diff",
+        "--no-prefix",
+        "--diff-filter=d",
+    )
+
+    ranges: Dict[str, List[range]] = {}
+    current: Optional[List[range]] = None
+    remaining = 0  # Lines left in the current hunk, which may look like headers
+    for line in output.splitlines():
+        if remaining:
+            if line[:1] in ("-", "+"):
+                remaining -= 1
+        elif line.startswith("+++ "):
+            # git appends a tab to names that contain spaces
+            name = line[4:].rstrip("\t")
+            if name == "/dev/null":
+                current = None
+            else:
+                current = ranges.setdefault(os.path.join(root, _unquote(name)), [])
+        elif line.startswith("@@ ") and current is not None:
+            # "@@ -OLD_START[,OLD_COUNT] +NEW_START[,NEW_COUNT] @@ ..."
+            _, old, new, _ = line.split(" ", 3)
+            old_count = old.partition(",")[2]
+            start, _, count = new[1:].partition(",")
+            n = int(count) if count else 1
+            remaining = (int(old_count) if old_count else 1) + n
+            if n:
+                current.append(range(int(start), int(start) + n))
+    return ranges
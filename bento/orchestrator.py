@@ -1,23 +1,79 @@
 import logging
 import time
-from typing import Collection, Iterable, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.pool import Pool
+from typing import (
+    Callable,
+    Collection,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import click
 
-from bento.constants import IGNORE_FILE_NAME
+import bento.result
+from bento.constants import (
+    IGNORE_FILE_NAME,
+    NEW_FINDINGS_CHANGED_LINES,
+    NEW_FINDINGS_HEAD,
+)
 from bento.result import Baseline
 from bento.target_file_manager import NoGitHeadException, TargetFileManager
 from bento.tool import Tool
-from bento.tool_runner import Runner, RunResults, RunStep
+from bento.tool.engine import plan
+from bento.tool_runner import (
+    Runner,
+    RunResults,
+    RunStep,
+    SetupFutures,
+    size_budget,
+    worker_pool,
+)
 from bento.util import echo_warning
 
 
+def start_setup(tools: Iterable[Tool]) -> SetupFutures:
+    """
+        Starts setting up tools in the background
+
+        Call this as early as possible, so that tool installation and environment
+        checks overlap with file discovery and git operations. Pass the result to
+        orchestrate.
+
+        Tools that will share an engine (see bento.tool.engine) set up that engine
+        once, instead of setting up separately.
+    """
+    tools = list(tools)
+    if not tools:
+        return {}
+    groups = [[t] for t in tools]
+    if tools[0].context.runner_share_engines:
+        groups = plan(tools)
+    executor = ThreadPoolExecutor(len(groups), thread_name_prefix="setup")
+    futures = {}
+    for group in groups:
+        engine = group[0].engine
+        future = executor.submit(engine.setup if engine else group[0].setup)
+        futures.update({t.tool_id(): future for t in group})
+    executor.shutdown(wait=False)
+    return futures
+
+
 # TODO baseline removal should not be part of tool running
 def orchestrate(
     baseline: Baseline,
     target_file_manager: TargetFileManager,
     staged: bool,
     tools: Iterable[Tool],
+    jobs: int = 0,
+    on_result: Optional[Callable[[RunResults], None]] = None,
+    setup: Optional[SetupFutures] = None,
+    new_findings: str = NEW_FINDINGS_HEAD,
+    concurrent_baseline: bool = False,
 ) -> Tuple[Collection[RunResults], float]:
     """
         Manages interactions between TargetFileManager, Runner and Tools
@@ -25,10 +81,46 @@ def orchestrate(
         Uses passed target_file_manager, staged flag, and tool list to setup
         Runner and runs tools on relevant files, returning aggregated output
         of tool running and time to run all tools in parallel
+
+        If jobs is positive, tools are run in that many worker processes
+
+        If on_result is defined, it is called with each tool's results as soon as that
+        tool completes checking (but not for the staged-mode head comparison)
+
+        If setup is defined (see start_setup), tools wait on that setup rather than
+        setting up again
+
+        When staged, new findings are those not found in HEAD (NEW_FINDINGS_HEAD),
+        or those on lines that staged changes add or modify
+        (NEW_FINDINGS_CHANGED_LINES); the latter does not analyze HEAD at all
+
+        If concurrent_baseline, HEAD is analyzed at the same time as staged files,
+        rather than before them (see _check_concurrently)
     """
-    elapsed = 0.0
+    tools = list(tools)
+    if staged and new_findings == NEW_FINDINGS_CHANGED_LINES:
+        changed_lines = target_file_manager.staged_line_ranges()
+        all_results, elapsed = _check(
+            baseline,
+            target_file_manager,
+            staged,
+            tools,
+            jobs,
+            _filtering_to_lines(changed_lines, on_result),
+            setup,
+        )
+        return [_filter_to_lines(changed_lines, r) for r in all_results], elapsed
+
+    if staged and concurrent_baseline:
+        return _check_concurrently(
+            baseline, target_file_manager, tools, jobs, on_result, setup
+        )
+
+    head_elapsed = 0.0
     if staged:
-        head_baseline, elapsed = _calculate_head_comparison(target_file_manager, tools)
+        head_baseline, head_elapsed = _calculate_head_comparison(
+            target_file_manager, tools, jobs
+        )
         for t in tools:
             tool_id = t.tool_id()
             if tool_id not in baseline:
@@ -36,53 +128,245 @@ def orchestrate(
             else:
                 baseline[tool_id].update(head_baseline.get(tool_id, set()))
 
-    with target_file_manager.run_context(staged, RunStep.CHECK) as target_paths:
+    all_results, elapsed = _check(
+        baseline, target_file_manager, staged, tools, jobs, on_result, setup
+    )
+    if not all_results:
+        # Nothing was checked
+        return all_results, elapsed
+    return all_results, head_elapsed + elapsed
+
+
+def _check(
+    baseline: Baseline,
+    target_file_manager: TargetFileManager,
+    staged: bool,
+    tools: List[Tool],
+    jobs: int,
+    on_result: Optional[Callable[[RunResults], None]],
+    setup: Optional[SetupFutures],
+    pool: Optional[Pool] = None,
+    sized_budget: bool = False,
+) -> Tuple[Collection[RunResults], float]:
+    """
+    Runs tools on the files to check (as staged, if staged)
+
+    :param pool: If defined, the worker process pool to run tools in
+    :param sized_budget: Whether the resource budget is already sized for these tools
+                         and others running at the same time
+    :return: Each tool's results (or none, if there are no files to check), and the
+             time taken to run tools
+    """
+    with target_file_manager.run_context(
+        staged, RunStep.CHECK, tools=tools
+    ) as target_paths:
         use_cache = not staged  # if --all then can use cache
         skip_setup = staged  # if check --all then include setup
-        runner = Runner(paths=target_paths, use_cache=use_cache, skip_setup=skip_setup)
+        runner = Runner(
+            paths=target_paths,
+            use_cache=use_cache,
+            skip_setup=skip_setup,
+            jobs=jobs,
+            setup=setup or {},
+            pool=pool,
+            sized_budget=sized_budget,
+        )
 
         if len(runner.paths) == 0:
             echo_warning(
                 f"Nothing to check or archive. Please confirm that changes are staged and not excluded by `{IGNORE_FILE_NAME}`. To check all Git tracked files, use `--all`."
             )
             click.secho("", err=True)
-            all_results: Collection[RunResults] = []
-            elapsed = 0.0
-        else:
-            before = time.time()
-            all_results = runner.parallel_results(tools, baseline)
-            elapsed += time.time() - before
+            return [], 0.0
+
+        before = time.time()
+        all_results = runner.parallel_results(tools, baseline, on_result=on_result)
+        return all_results, time.time() - before
+
+
+def _check_concurrently(
+    baseline: Baseline,
+    target_file_manager: TargetFileManager,
+    tools: List[Tool],
+    jobs: int,
+    on_result: Optional[Callable[[RunResults], None]],
+    setup: Optional[SetupFutures],
+) -> Tuple[Collection[RunResults], float]:
+    """
+    Checks staged files while calculating the HEAD baseline in a background thread
+
+    The HEAD baseline is calculated in a snapshot of HEAD, leaving the working tree to
+    the check step. Both steps share the process-wide resource budget, and, if jobs is
+    positive, a single pool of that many worker processes, so wall time approaches the
+    longer of the two steps rather than their sum.
+
+    Findings in HEAD are filtered once both steps complete; on_result is called with
+    each tool's results once they are filtered.
+    """
+    before = time.time()
+    # Both steps' tools share the budget, so their runners leave it as sized here
+    size_budget(tools[0].context, 2 * len(tools))
+    pool = worker_pool(jobs) if jobs > 0 else None
+    executor = ThreadPoolExecutor(1, thread_name_prefix="baseline")
+    head_pass = executor.submit(
+        _calculate_head_comparison,
+        target_file_manager,
+        tools,
+        jobs,
+        isolated=True,
+        pool=pool,
+    )
+
+    combined: Baseline = {}
+    pending: List[RunResults] = []
+
+    def combine() -> Baseline:
+        # baseline's sets may still be read by the check step, so aren't updated
+        if not combined:
+            head_baseline, _ = head_pass.result()
+            for t in tools:
+                tool_id = t.tool_id()
+                combined[tool_id] = set(baseline.get(tool_id, set()))
+                combined[tool_id].update(head_baseline.get(tool_id, set()))
+        return combined
+
+    def flush() -> None:
+        if on_result:
+            for result in pending:
+                on_result(_refiltered(combine(), result))
+        pending.clear()
+
+    def defer(result: RunResults) -> None:
+        pending.append(result)
+        if head_pass.done() and not head_pass.exception():
+            flush()
+
+    try:
+        all_results, _ = _check(
+            baseline,
+            target_file_manager,
+            True,
+            tools,
+            jobs,
+            defer if on_result else None,
+            setup,
+            pool,
+            sized_budget=True,
+        )
+        combine()
+    finally:
+        # Waits for the HEAD baseline's snapshot to be removed
+        executor.shutdown()
+        if pool:
+            pool.close()
+            pool.join()
+
+    flush()
+    if not all_results:
+        # Nothing was checked
+        return all_results, 0.0
+    return [_refiltered(combined, r) for r in all_results], time.time() - before
+
+
+def _refiltered(baseline: Baseline, result: RunResults) -> RunResults:
+    tool_id, findings = result
+    if isinstance(findings, list):
+        return tool_id, bento.result.filtered(tool_id, findings, baseline)
+    return result
 
-    return all_results, elapsed
+
+def _filter_to_lines(
+    lines: Mapping[str, Sequence[range]], result: RunResults
+) -> RunResults:
+    tool_id, findings = result
+    if isinstance(findings, list):
+        return tool_id, bento.result.filtered_to_lines(findings, lines)
+    return result
+
+
+def _filtering_to_lines(
+    lines: Mapping[str, Sequence[range]],
+    on_result: Optional[Callable[[RunResults], None]],
+) -> Optional[Callable[[RunResults], None]]:
+    """
+    Wraps an on_result callback to receive only findings on the given lines
+    """
+    if on_result is None:
+        return None
+    callback = on_result
+    return lambda result: callback(_filter_to_lines(lines, result))
 
 
 def _calculate_head_comparison(
-    target_file_manager: TargetFileManager, tools: Iterable[Tool]
+    target_file_manager: TargetFileManager,
+    tools: Iterable[Tool],
+    jobs: int = 0,
+    isolated: bool = False,
+    pool: Optional[Pool] = None,
 ) -> Tuple[Baseline, float]:
     """
     Calculates a baseline consisting of all findings from the branch head
 
+    Per-file tools' findings in files as of HEAD are looked up in the record kept by
+    `bento record-head` (run from git hooks), and by previous staged checks; tools
+    are only run on HEAD if their findings are not recorded for every file. Findings
+    of tools that were run are recorded for later checks.
+
     If no HEAD branch exists return empty baseline
 
     :param paths: Which paths are being checked
     :param tools: Which tools to check
+    :param jobs: How many worker processes to run tools in (0 to run in this process)
+    :param isolated: Whether to analyze a snapshot of HEAD, without progress bars, so
+                     that the check step can run at the same time (the caller sizes
+                     the resource budget for both steps)
+    :param pool: If defined, the worker process pool to run tools in
     :return: The branch head baseline
     """
     try:
-        with target_file_manager.run_context(True, RunStep.BASELINE) as target_paths:
-            runner = Runner(paths=target_paths, use_cache=True, skip_setup=True)
+        blobs = target_file_manager.head_blobs()
+        baseline: Baseline = {}
+        to_run = []
+        for t in tools:
+            recorded = t.recorded_head_findings(blobs)
+            if recorded is None:
+                to_run.append(t)
+            else:
+                logging.debug(f"Using recorded HEAD findings for {t.tool_id()}")
+                baseline[t.tool_id()] = recorded
+        if not to_run:
+            return baseline, 0.0
+
+        with target_file_manager.run_context(
+            True, RunStep.BASELINE, isolated=isolated, tools=to_run
+        ) as target_paths:
+            runner = Runner(
+                paths=target_paths,
+                use_cache=True,
+                skip_setup=True,
+                show_bars=not isolated,
+                jobs=jobs,
+                pool=pool,
+                sized_budget=isolated,
+            )
             if len(runner.paths) > 0:
                 before = time.time()
-                comparison_results = runner.parallel_results(tools, {}, keep_bars=False)
-                baseline = {
-                    tool_id: {f.syntactic_identifier_str() for f in findings}
-                    for tool_id, findings in comparison_results
-                    if isinstance(findings, list)
-                }
+                comparison_results = runner.parallel_results(
+                    to_run, {}, keep_bars=False
+                )
                 elapsed = time.time() - before
-                return baseline, elapsed
             else:
-                return {}, 0.0
+                comparison_results = []
+                elapsed = 0.0
+
+        by_id = {t.tool_id(): t for t in to_run}
+        for tool_id, findings in comparison_results:
+            if isinstance(findings, list):
+                baseline[tool_id] = {f.syntactic_identifier_str() for f in findings}
+                by_id[tool_id].record_head_findings(blobs, findings)
+        for t in to_run:
+            t.context.cache.head_findings.save()
+        return baseline, elapsed
     except NoGitHeadException:
         logging.debug("No git head found so defaulting to empty head baseline")
         return {}, 0.0
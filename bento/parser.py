@@ -4,10 +4,16 @@ from typing import Generic, List, TypeVar
 
 import attr
 
+import bento.constants as constants
 from bento.violation import Violation
 
 R = TypeVar("R", contravariant=True)
 
+SNAPSHOT_PREFIX = os.path.join(
+    str(constants.RESOURCE_PATH / constants.SNAPSHOT_PATH), ""
+)
+"""Prefix of paths, relative to the base path, of snapshots of git state"""
+
 
 def _absolute(path: Path) -> Path:
     return path.absolute()
@@ -17,11 +23,25 @@ def _absolute(path: Path) -> Path:
 class Parser(Generic[R]):
     base_path = attr.ib(type=Path, converter=_absolute)
 
-    def trim_base(self, path: str) -> str:
+    def source_path(self, path: str) -> Path:
+        """
+        Returns the absolute path of a file, as reported by a tool, that was analyzed
+
+        Unlike trim_base, this is the file the tool read, even in a snapshot of git
+        state; read source lines for findings from here, not from the reported path.
+        """
         wrapped = Path(path)
         if not wrapped.is_absolute():
             wrapped = self.base_path / wrapped
-        return os.path.relpath(wrapped, self.base_path)
+        return wrapped
+
+    def trim_base(self, path: str) -> str:
+        trimmed = os.path.relpath(self.source_path(path), self.base_path)
+        if trimmed.startswith(SNAPSHOT_PREFIX):
+            # Files checked in a snapshot of git state are reported at their
+            # working-tree paths
+            trimmed = trimmed[len(SNAPSHOT_PREFIX) :].split(os.sep, 1)[-1]
+        return trimmed
 
     def parse(self, result: R) -> List[Violation]:
         return []
@@ -0,0 +1,123 @@
+import queue
+import threading
+import time
+from typing import List, Optional
+
+import attr
+from tqdm import tqdm
+
+BAR_UPDATE_INTERVAL = 0.1
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class BarEvent:
+    """
+    A change in the state of a single tool's progress bar
+
+    :param ix: The bar index
+    :param lower: The bar value at which the current phase starts
+    :param upper: The bar value at which the current phase ends
+    :param text: If defined, replaces the bar's postfix text
+    :param fraction: Known progress through the current phase; if None, the bar is
+                     animated between lower and upper until the next event
+    :param done: If true, the bar is set to upper and no longer animated
+    """
+
+    ix: int
+    lower: int
+    upper: int
+    text: Optional[str] = None
+    fraction: Optional[float] = None
+    done: bool = False
+
+
+@attr.s
+class _BarState:
+    lower = attr.ib(type=int, default=0)
+    upper = attr.ib(type=int, default=0)
+    value = attr.ib(type=int, default=0)
+    animating = attr.ib(type=bool, default=False)
+
+
+@attr.s
+class ProgressRenderer:
+    """
+    Draws progress bars from a single thread, fed by a queue of bar events
+
+    Anything else that writes to the terminal while bars are shown must hold lock.
+    """
+
+    bars = attr.ib(type=List[tqdm])
+    lock = attr.ib(type=threading.Lock, factory=threading.Lock)
+    _queue = attr.ib(
+        type="queue.Queue[Optional[BarEvent]]", factory=queue.Queue, init=False
+    )
+    _states = attr.ib(type=List[_BarState], init=False)
+    _thread = attr.ib(type=Optional[threading.Thread], default=None, init=False)
+
+    @_states.default
+    def _init_states(self) -> List[_BarState]:
+        return [_BarState() for _ in self.bars]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(name="progress", target=self._render)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Draws all pending events, then stops the renderer thread
+        """
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def post(self, event: BarEvent) -> None:
+        self._queue.put(event)
+
+    def _apply(self, event: BarEvent) -> None:
+        state = self._states[event.ix]
+        bar = self.bars[event.ix]
+        state.lower = event.lower
+        state.upper = event.upper
+        if event.done:
+            state.value = event.upper
+        elif event.fraction is not None:
+            span = event.upper - event.lower
+            state.value = event.lower + int(span * min(max(event.fraction, 0.0), 1.0))
+        else:
+            state.value = event.lower
+        state.animating = not event.done and event.fraction is None
+        bar.n = state.value
+        if event.text is not None:
+            bar.set_postfix_str(event.text)
+        else:
+            bar.refresh()
+
+    def _animate(self) -> None:
+        for state, bar in zip(self._states, self.bars):
+            if state.animating:
+                if state.value < state.upper - 1:
+                    state.value += 1
+                else:
+                    state.value = state.lower
+                bar.n = state.value
+                bar.refresh()
+
+    def _render(self) -> None:
+        next_frame = time.monotonic() + BAR_UPDATE_INTERVAL
+        while True:
+            try:
+                timeout = max(0.0, next_frame - time.monotonic())
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                event = None
+            else:
+                if event is None:
+                    return
+            with self.lock:
+                if event:
+                    self._apply(event)
+                if time.monotonic() >= next_frame:
+                    self._animate()
+                    next_frame = time.monotonic() + BAR_UPDATE_INTERVAL
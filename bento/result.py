@@ -1,12 +1,24 @@
 import json
 from collections import OrderedDict
-from typing import Any, Dict, List, Mapping, Set, TextIO, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+)
 
 import attr
 
 from bento.violation import Violation
 
 VIOLATIONS_KEY = "violations"
+VIOLATION_FIELDS = [a.name for a in attr.fields(Violation)]
 
 Hash = str
 ToolId = str
@@ -23,6 +35,28 @@ def filtered(
     ]
 
 
+def filtered_to_lines(
+    output: List[Violation], lines: Mapping[str, Sequence[range]]
+) -> List[Violation]:
+    """
+    Filters findings that are not on the given lines
+
+    :param lines: Ranges of line numbers, by path; findings that don't have a line
+                  number are kept if their file has any lines
+    """
+
+    def on_lines(v: Violation) -> bool:
+        ranges = lines.get(v.path, ())
+        if v.line < 1:
+            return bool(ranges)
+        return any(v.line in r for r in ranges)
+
+    return [
+        v if v.filtered or on_lines(v) else attr.evolve(v, filtered=True)
+        for v in output
+    ]
+
+
 def dump_results(results: List[Violation]) -> Dict[str, Dict[Hash, Dict[str, Any]]]:
     with_hashes: Dict[str, Dict[str, Any]] = OrderedDict(
         sorted(
@@ -52,11 +86,26 @@ def json_to_violation_hashes(text: Union[str, TextIO]) -> Baseline:
     return out
 
 
+def to_cache_dicts(findings: Iterable[Violation]) -> List[Dict[str, Any]]:
+    return [attr.asdict(f) for f in findings]
+
+
+def from_cache_dicts(parsed: Iterable[Mapping[str, Any]]) -> List[Violation]:
+    return [Violation(**kwargs) for kwargs in parsed]
+
+
+def to_payload(findings: Iterable[Violation]) -> List[Tuple[Any, ...]]:
+    """Compactly represents findings, e.g. for transfer between processes"""
+    return [attr.astuple(f, recurse=False) for f in findings]
+
+
+def from_payload(payload: Iterable[Tuple[Any, ...]]) -> List[Violation]:
+    return [Violation(**dict(zip(VIOLATION_FIELDS, t))) for t in payload]
+
+
 def to_cache_repr(findings: List[Violation]) -> str:
-    as_dict = [attr.asdict(f) for f in findings]
-    return json.dumps(as_dict)
+    return json.dumps(to_cache_dicts(findings))
 
 
 def from_cache_repr(text: str) -> List[Violation]:
-    parsed = json.loads(text)
-    return [Violation(**kwargs) for kwargs in parsed]
+    return from_cache_dicts(json.loads(text))
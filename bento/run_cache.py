@@ -1,12 +1,320 @@
+import fcntl
+import hashlib
 import json
 import logging
+import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import attr
-import pymmh3 as mmh3
 
 from bento import __version__ as BENTO_VERSION
+from bento.scheduler import DurationHistory
+from bento.target_set import path_strs
+
+FileFindings = List[Dict[str, Any]]
+"""Cached findings for a single file, as a list of serialized violations"""
+
+StatKey = Tuple[int, int, int, int]
+"""A file's (inode, size, mtime_ns, ctime_ns)"""
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """
+    Holds an exclusive lock on path, shared by every thread and process, while a block
+    runs
+
+    The lock is taken on a separate lock file, so that path itself may be replaced.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.with_suffix(".lock").open("a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+DIGEST_MODULUS = 1 << 256
+
+
+def _hash_file(path: Path) -> str:
+    """
+    Returns a digest of a file's contents
+    """
+    h = hashlib.sha256()
+    with path.open("rb") as stream:
+        for chunk in iter(lambda: stream.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@attr.s
+class StatIndex:
+    """
+        A git-index-style record of file stat information
+
+        Each path is stat-ed at most once between calls to `refresh`, no matter how
+        many tools ask about it. Content hashes are persisted alongside each path's stat
+        information, and are only recomputed for files whose stat information changed.
+
+        As in git, a file modified within the same mtime tick as the index was written
+        is "racily clean", so its stored content hash is not trusted.
+    """
+
+    index_path: Path = attr.ib(converter=Path)
+    _lock = attr.ib(type=threading.Lock, factory=threading.Lock, init=False)
+    _stats = attr.ib(type=Dict[str, Optional[StatKey]], factory=dict, init=False)
+    _digests = attr.ib(type=Dict[str, int], factory=dict, init=False)
+    _hashes = attr.ib(type=Dict[str, Tuple[StatKey, str]], default=None, init=False)
+    _dirty = attr.ib(type=bool, default=False, init=False)
+
+    def _load(self) -> Dict[str, Tuple[StatKey, str]]:
+        """
+            Loads persisted content hashes, dropping any that are racily clean
+        """
+        if not self.index_path.exists():
+            return {}
+        try:
+            with self.index_path.open() as file:
+                stored = json.load(file)
+        except json.JSONDecodeError:
+            logging.error(f"Failed to parse stat index {self.index_path} as json")
+            return {}
+
+        if stored.get("version") != BENTO_VERSION:
+            return {}
+        # As in git, compare against the index file's own mtime so both use the same clock
+        written_ns = self.index_path.stat().st_mtime_ns
+        return {
+            path: ((stat[0], stat[1], stat[2], stat[3]), hsh)
+            for path, (stat, hsh) in stored.get("entries", {}).items()
+            if stat[2] < written_ns
+        }
+
+    def refresh(self) -> None:
+        """
+            Forgets all stat information gathered so far
+
+            Call this whenever files may have been changed on disk (e.g. when git
+            state changes between tool runs).
+        """
+        with self._lock:
+            self._stats = {}
+            self._digests = {}
+
+    def stat(self, path: Union[str, Path]) -> Optional[StatKey]:
+        """
+            Returns stat information for a path, or None if the path does not exist
+        """
+        key = str(path)
+        with self._lock:
+            if key in self._stats:
+                return self._stats[key]
+        try:
+            st = os.stat(key)
+            value: Optional[StatKey] = (
+                st.st_ino,
+                st.st_size,
+                st.st_mtime_ns,
+                st.st_ctime_ns,
+            )
+        except OSError:
+            value = None
+        with self._lock:
+            self._stats[key] = value
+        return value
+
+    def content_hash(self, path: Path) -> str:
+        """
+            Returns a digest of a file's contents, re-reading the file only if its
+            stat information changed since the digest was last computed
+        """
+        key = str(path)
+        stat = self.stat(path)
+        with self._lock:
+            if self._hashes is None:
+                self._hashes = self._load()
+            known = self._hashes.get(key)
+        if stat is not None and known is not None and known[0] == stat:
+            return known[1]
+
+        hsh = _hash_file(path)
+        if stat is not None:
+            with self._lock:
+                self._hashes[key] = (stat, hsh)
+                self._dirty = True
+        return hsh
+
+    def digest(self, paths: Iterable[Union[str, Path]]) -> str:
+        """
+            Returns an order-independent digest of the stat information of paths
+
+            Paths that do not exist are excluded. Per-path digests are combined by
+            modular addition, so that (unlike XOR) identical changes cannot cancel out.
+        """
+        total = 0
+        for p in paths:
+            key = str(p)
+            with self._lock:
+                d = self._digests.get(key)
+            if d is None:
+                stat = self.stat(p)
+                if stat is None:
+                    continue
+                entry = f"{key}:{stat[0]}:{stat[1]}:{stat[2]}:{stat[3]}"
+                d = int.from_bytes(hashlib.sha256(entry.encode()).digest(), "big")
+                with self._lock:
+                    self._digests[key] = d
+            total = (total + d) % DIGEST_MODULUS
+        return format(total, "x")
+
+    def save(self) -> None:
+        """
+            Persists content hashes, if any were computed since the last save
+        """
+        # Written under the lock, so that threads saving at once neither share a
+        # temporary file nor replace a later save with an earlier one
+        with self._lock:
+            if not self._dirty or self._hashes is None:
+                return
+            entries = {
+                path: [list(stat), hsh] for path, (stat, hsh) in self._hashes.items()
+            }
+            self._dirty = False
+
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            # Tools may run in several processes, so give each its own temporary file
+            tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp_path.open("w") as file:
+                json.dump({"version": BENTO_VERSION, "entries": entries}, file)
+            tmp_path.replace(self.index_path)
+
+
+@attr.s
+class HeadFindings:
+    """
+        A record of per-file tools' findings in files as they are in git commits
+
+        For each tool and file, stores the git blob ID of the file's recorded
+        contents, and the syntactic identifiers of the tool's findings in those
+        contents. A staged check can then learn which findings already existed in
+        HEAD without running tools on HEAD.
+
+        Entries are invalidated when a tool's fingerprint (its version and
+        configuration) changes. Only entries updated by this process are written on
+        save, so several processes may share one record.
+    """
+
+    path = attr.ib(type=Path, converter=Path)
+    _records = attr.ib(type=Dict[str, Dict[str, Any]], default=None, init=False)
+    _updated = attr.ib(type=Dict[str, Dict[str, Any]], factory=dict, init=False)
+    _lock = attr.ib(type=threading.Lock, factory=threading.Lock, init=False)
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with self.path.open() as stream:
+                parsed = json.load(stream)
+            if parsed.get("version") == BENTO_VERSION:
+                return parsed["tools"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        return {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._records is None:
+            self._records = self._read()
+        return self._records
+
+    def get(
+        self, tool_id: str, fingerprint: str, blobs: Mapping[str, str]
+    ) -> Optional[Set[str]]:
+        """
+            Returns the identifiers of a tool's findings in files
+
+            :param blobs: The blob ID of each file, by path relative to the base path
+            :return: The identifiers of all findings in these files, or None unless
+                     every file's findings are recorded for these blob IDs
+        """
+        with self._lock:
+            record = self._load().get(tool_id)
+            if record is None or record.get("fingerprint") != fingerprint:
+                return None
+            files = record.get("files", {})
+            identifiers: Set[str] = set()
+            for path, blob in blobs.items():
+                entry = files.get(path)
+                if entry is None or entry[0] != blob:
+                    return None
+                identifiers.update(entry[1])
+            return identifiers
+
+    def put(
+        self,
+        tool_id: str,
+        fingerprint: str,
+        blobs: Mapping[str, str],
+        identifiers: Mapping[str, Iterable[str]],
+    ) -> None:
+        """
+            Records the identifiers of a tool's findings in files
+
+            :param blobs: The blob ID of each file checked, by path relative to the
+                          base path
+            :param identifiers: The identifiers of findings in each file, by path;
+                                files without findings may be omitted
+        """
+        entries = {
+            path: [blob, sorted(identifiers.get(path, []))]
+            for path, blob in blobs.items()
+        }
+        with self._lock:
+            for records in (self._load(), self._updated):
+                record = records.get(tool_id)
+                if record is None or record.get("fingerprint") != fingerprint:
+                    record = records[tool_id] = {
+                        "fingerprint": fingerprint,
+                        "files": {},
+                    }
+                record["files"].update(entries)
+
+    def save(self) -> None:
+        """
+            Writes this process's updates to the record
+        """
+        with self._lock:
+            if not self._updated:
+                return
+            records = self._read()
+            for tool_id, update in self._updated.items():
+                record = records.get(tool_id)
+                if record is None or record.get("fingerprint") != update["fingerprint"]:
+                    records[tool_id] = update
+                else:
+                    record["files"].update(update["files"])
+            self._updated = {}
+            self._records = records
+
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with tmp_path.open("w") as stream:
+                    json.dump({"version": BENTO_VERSION, "tools": records}, stream)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.warning(f"Could not save HEAD findings: {e}")
 
 
 @attr.s
@@ -14,11 +322,36 @@ class RunCache:
     """
         Acts as a local cache for tool run output
 
+        Two kinds of entry are stored:
+          - Whole-run entries, which store the output of running a tool on a set of
+            paths, and are invalidated when any path in that set changes
+          - Per-file entries, which store the findings of a tool on a single file,
+            keyed by a digest of the tool's configuration and the file's contents
+
+        File stat information and content hashes are shared by all tools through a
+        single StatIndex. Tool run durations are tracked in a DurationHistory, and
+        findings in committed files in HeadFindings.
+
         Different tools can be accessed concurrently, but cache access
         is not threadsafe if multiple threads access the same tool.
     """
 
     cache_dir: Path = attr.ib(converter=Path)
+    _stat_index = attr.ib(type=StatIndex, init=False)
+    durations = attr.ib(type=DurationHistory, init=False)
+    head_findings = attr.ib(type=HeadFindings, init=False)
+
+    @_stat_index.default
+    def _init_stat_index(self) -> StatIndex:
+        return StatIndex(self.cache_dir / "stat-index.json")
+
+    @durations.default
+    def _init_durations(self) -> DurationHistory:
+        return DurationHistory(self.cache_dir / "durations.json")
+
+    @head_findings.default
+    def _init_head_findings(self) -> HeadFindings:
+        return HeadFindings(self.cache_dir / "head-findings.json")
 
     def __cache_metadata_path(self, tool_id: str) -> Path:
         """
@@ -32,21 +365,46 @@ class RunCache:
         """
         return self.cache_dir / f"{tool_id}.data"
 
-    def _modified_hash(self, paths: Iterable[Path]) -> str:
+    def __file_findings_path(self, tool_id: str) -> Path:
+        """
+            Returns name of file that contains per-file findings for a given tool
+        """
+        return self.cache_dir / f"{tool_id}-files.json"
+
+    def content_hash(self, path: Path) -> str:
+        """
+        Returns a digest of a file's contents
+        """
+        return self._stat_index.content_hash(path)
+
+    def file_size(self, path: Path) -> int:
+        """
+        Returns a file's size in bytes, or 0 if it does not exist
+        """
+        st = self._stat_index.stat(path)
+        return st[1] if st else 0
+
+    def refresh(self) -> None:
+        """
+        Forgets file stat information; call whenever files on disk may have changed
         """
-        Returns a hash of the recursive mtime of a path.
+        self._stat_index.refresh()
 
-        Any modification of a file within this tree (that does not match an ignore pattern)
-        will change the hash.
+    def save(self) -> None:
         """
+        Persists state shared by all tools; call once at the end of each run
+        """
+        self._stat_index.save()
+        self.durations.save()
+        self.head_findings.save()
 
-        # No matter settings of .bentoignore, these are always excluded
-        files_and_times = ((str(p), p.stat().st_mtime_ns) for p in paths if p.exists())
-        h = 0
-        for f, m in files_and_times:
-            h ^= mmh3.hash128(f"{f}:{m}")
+    def _modified_hash(self, paths: Iterable[Union[str, Path]]) -> str:
+        """
+        Returns a digest of the stat information of paths.
 
-        return format(h, "x")
+        Any modification of any of these files will change the digest.
+        """
+        return self._stat_index.digest(paths)
 
     def __cleanup(self, tool_id: str) -> None:
         """
@@ -68,13 +426,33 @@ class RunCache:
         except OSError:
             pass
 
+    def __load_file_findings(self, tool_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+            Loads the per-file findings store for tool_id, returning an empty store
+            if none exists or if it was written by another Bento version
+        """
+        file_findings_path = self.__file_findings_path(tool_id)
+        if not file_findings_path.exists():
+            return {}
+
+        with file_findings_path.open() as file:
+            try:
+                stored = json.load(file)
+            except json.JSONDecodeError:
+                logging.error(f"Failed to parse tool {tool_id} per-file cache as json")
+                return {}
+
+        if stored.get("version") != BENTO_VERSION:
+            return {}
+        return stored.get("files", {})
+
     def wipe(self) -> None:
         try:
             self.cache_dir.unlink()
         except OSError:
             pass
 
-    def get(self, tool_id: str, paths: Iterable[Path]) -> Optional[str]:
+    def get(self, tool_id: str, paths: Collection[Union[str, Path]]) -> Optional[str]:
         """
             Returns stored run output if it exists in local run cache and the
             cache entry is still valid (files have not been modified since caching)
@@ -98,11 +476,11 @@ class RunCache:
                 return None
 
         cache_hash = metadata.get("hash")
-        cache_paths = {Path(p) for p in metadata.get("paths")}
+        cache_paths = set(metadata.get("paths"))
         cache_bento_version = metadata.get("version")
 
         if (
-            cache_paths != set(paths)
+            cache_paths != set(path_strs(paths))
             or cache_bento_version != BENTO_VERSION
             or cache_hash != self._modified_hash(paths)
         ):
@@ -112,7 +490,9 @@ class RunCache:
 
         return cache_data_path.read_text()
 
-    def put(self, tool_id: str, paths: Iterable[Path], raw_results: str) -> None:
+    def put(
+        self, tool_id: str, paths: Collection[Union[str, Path]], raw_results: str
+    ) -> None:
         """
             Caches raw_results as the output of running TOOL_ID on PATHS
 
@@ -130,10 +510,87 @@ class RunCache:
         hsh = self._modified_hash(paths)
 
         metadata = {
-            "paths": [str(p) for p in paths],
+            "paths": list(path_strs(paths)),
             "hash": hsh,
             "version": BENTO_VERSION,
         }
 
         with cache_metadata_path.open("w") as file:
             json.dump(metadata, file)
+
+    def get_files(
+        self, tool_id: str, keys: Mapping[str, str]
+    ) -> Dict[str, FileFindings]:
+        """
+            Returns stored findings for every file whose cache key matches
+
+            Parameters:
+                tool_id: The tool's ID
+                keys: A mapping from each file's path (relative to the base path) to
+                      its current cache key
+
+            Returns:
+                A mapping from path to cached findings, for every path with a
+                valid cache entry
+        """
+        stored = self.__load_file_findings(tool_id)
+        hits = {}
+        for path, key in keys.items():
+            entry = stored.get(path)
+            if entry is not None and entry.get("key") == key:
+                hits[path] = entry.get("findings", [])
+        logging.debug(f"{tool_id}: {len(hits)} of {len(keys)} files found in cache")
+        return hits
+
+    def put_files(
+        self,
+        tool_id: str,
+        keys: Mapping[str, str],
+        findings: Mapping[str, FileFindings],
+    ) -> None:
+        """
+            Caches per-file FINDINGS of TOOL_ID
+
+            Every path in KEYS is stored, with an empty finding list if the path is
+            absent from FINDINGS. Only the most recent entry for each path is kept.
+        """
+        file_findings_path = self.__file_findings_path(tool_id)
+        # Other runs (e.g. background HEAD recording) may be updating the same store
+        with _locked(file_findings_path):
+            stored = self.__load_file_findings(tool_id)
+            for path, key in keys.items():
+                stored[path] = {"key": key, "findings": findings.get(path, [])}
+
+            tmp_path = file_findings_path.with_suffix(
+                f".{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            with tmp_path.open("w") as file:
+                json.dump({"version": BENTO_VERSION, "files": stored}, file)
+            tmp_path.replace(file_findings_path)
+
+
+_SHARED_CACHES: Optional[Dict[Path, RunCache]] = None
+
+
+def share_caches() -> None:
+    """
+    Makes open_cache return one RunCache per cache directory for the life of this process
+
+    Long-running processes (such as `bento daemon`) use this to keep stat information,
+    content hashes, and tool durations in memory between runs.
+    """
+    global _SHARED_CACHES
+    if _SHARED_CACHES is None:
+        _SHARED_CACHES = {}
+
+
+def open_cache(cache_dir: Path) -> RunCache:
+    """
+    Returns the RunCache for cache_dir
+    """
+    if _SHARED_CACHES is None:
+        return RunCache(cache_dir=cache_dir)
+    key = Path(cache_dir).resolve()
+    if key not in _SHARED_CACHES:
+        _SHARED_CACHES[key] = RunCache(cache_dir=cache_dir)
+    return _SHARED_CACHES[key]
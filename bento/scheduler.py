@@ -0,0 +1,236 @@
+import itertools
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar
+
+import attr
+
+_T = TypeVar("_T")
+
+Rank = Tuple[float, ...]
+"""Orders waiting work; higher ranks are granted slots first"""
+
+DURATION_HISTORY_VERSION = 1
+
+DURATION_DECAY = 0.5
+"""Weight given to each new duration observation"""
+
+
+def cpu_count() -> int:
+    """
+    Returns the number of CPUs on this machine
+    """
+    return os.cpu_count() or 1
+
+
+@attr.s
+class ResourceBudget:
+    """
+    CPU slots and memory shared by everything Bento runs concurrently
+
+    The runner reserves one slot for each tool it is running. Reservations are granted
+    highest rank first, so that expensive tools start before cheap ones. Tools may
+    borrow idle slots (slots no reservation is waiting on) in order to shard their work.
+
+    Memory is in megabytes; a memory limit of 0 is unlimited. A reservation that
+    exceeds the memory limit by itself is still granted once nothing else is running.
+    """
+
+    slots = attr.ib(type=int, factory=cpu_count)
+    memory = attr.ib(type=int, default=0)
+    _used = attr.ib(type=int, default=0, init=False)
+    _memory_used = attr.ib(type=int, default=0, init=False)
+    _waiting = attr.ib(type=List[Tuple[Rank, int]], factory=list, init=False)
+    _tickets = attr.ib(type=Iterator[int], factory=itertools.count, init=False)
+    _cond = attr.ib(type=threading.Condition, factory=threading.Condition, init=False)
+
+    def resize(self, slots: int, memory: int = 0) -> None:
+        """
+        Changes the total slots and memory in this budget
+        """
+        with self._cond:
+            self.slots = max(1, slots)
+            self.memory = max(0, memory)
+            self._cond.notify_all()
+
+    def _fits(self, n: int, memory: int) -> bool:
+        if self._used + n > self.slots:
+            return False
+        if not self.memory or not self._used:
+            return True
+        return self._memory_used + memory <= self.memory
+
+    @contextmanager
+    def reserve(self, rank: Rank = (), memory: int = 0) -> Iterator[None]:
+        """
+        Runs a block while holding a single slot, waiting until one is free
+
+        :param rank: Waiting reservations are granted in descending rank order, then
+                     in order of arrival
+        :param memory: Memory, in megabytes, needed while running the block
+        """
+        with self._cond:
+            waiter = (tuple(-r for r in rank), next(self._tickets))
+            self._waiting.append(waiter)
+            while min(self._waiting) != waiter or not self._fits(1, memory):
+                self._cond.wait()
+            self._waiting.remove(waiter)
+            self._used += 1
+            self._memory_used += memory
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            self.release(1, memory)
+
+    def borrow(self, wanted: int, memory: int = 0) -> int:
+        """
+        Takes up to wanted idle slots, without waiting
+
+        :param memory: Memory, in megabytes, needed by each slot
+        :return: The number of slots taken; these must be returned with release()
+        """
+        with self._cond:
+            granted = 0
+            while granted < wanted and self._can_borrow(memory):
+                self._used += 1
+                self._memory_used += memory
+                granted += 1
+        return granted
+
+    def _can_borrow(self, memory: int) -> bool:
+        return not self._waiting and self._fits(1, memory)
+
+    def release(self, n: int, memory: int = 0) -> None:
+        """
+        Returns n slots, each with the given memory, to this budget
+        """
+        if n <= 0:
+            return
+        with self._cond:
+            self._used -= n
+            self._memory_used -= n * memory
+            self._cond.notify_all()
+
+
+BUDGET = ResourceBudget()
+"""The process-wide resource budget"""
+
+
+@attr.s
+class DurationHistory:
+    """
+    Tracks how long each tool took to run, across Bento invocations
+
+    For each tool, records a moving average of the wall time of a whole run, and of
+    the wall time per file analyzed. Only tools updated by this process are written
+    on save, so several processes may share one history file.
+    """
+
+    path = attr.ib(type=Path, converter=Path)
+    _records = attr.ib(type=Dict[str, Dict[str, float]], default=None, init=False)
+    _updated = attr.ib(type=Set[Tuple[str, str]], factory=set, init=False)
+    _lock = attr.ib(type=threading.Lock, factory=threading.Lock, init=False)
+
+    def _read(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with self.path.open() as stream:
+                parsed = json.load(stream)
+            if parsed.get("version") == DURATION_HISTORY_VERSION:
+                return parsed["tools"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        return {}
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        if self._records is None:
+            self._records = self._read()
+        return self._records
+
+    def _record(self, tool_id: str, key: str, value: float) -> None:
+        with self._lock:
+            record = self._load().setdefault(tool_id, {})
+            previous = record.get(key)
+            if previous is not None:
+                value = DURATION_DECAY * value + (1 - DURATION_DECAY) * previous
+            record[key] = value
+            self._updated.add((tool_id, key))
+
+    def record_run(self, tool_id: str, seconds: float) -> None:
+        """
+        Records the wall time of a whole tool run
+        """
+        self._record(tool_id, "run", seconds)
+
+    def record_files(self, tool_id: str, n_files: int, seconds: float) -> None:
+        """
+        Records the wall time taken to analyze n_files files
+        """
+        if n_files > 0:
+            self._record(tool_id, "per_file", seconds / n_files)
+
+    def run_seconds(self, tool_id: str) -> Optional[float]:
+        """
+        Returns the expected wall time of a whole tool run, or None if never recorded
+        """
+        with self._lock:
+            return self._load().get(tool_id, {}).get("run")
+
+    def file_seconds(self, tool_id: str) -> Optional[float]:
+        """
+        Returns the expected wall time per analyzed file, or None if never recorded
+        """
+        with self._lock:
+            return self._load().get(tool_id, {}).get("per_file")
+
+    def save(self) -> None:
+        """
+        Writes this process's updates to the history file
+        """
+        with self._lock:
+            if not self._updated:
+                return
+            records = self._read()
+            for tool_id, key in self._updated:
+                records.setdefault(tool_id, {})[key] = self._load()[tool_id][key]
+            self._updated.clear()
+            data: Dict[str, Any] = {
+                "version": DURATION_HISTORY_VERSION,
+                "tools": records,
+            }
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with tmp_path.open("w") as stream:
+                    json.dump(data, stream)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.warning(f"Could not save tool durations: {e}")
+
+
+def shard(items: Sequence[_T], sizes: Sequence[int], n_shards: int) -> List[List[_T]]:
+    """
+    Splits items into at most n_shards shards of roughly equal total size
+
+    Items are assigned largest-first to the currently smallest shard. Assignment is
+    deterministic for fixed inputs, and each shard preserves the input order of its
+    items.
+
+    :param items: Items to shard
+    :param sizes: The size of each item
+    :param n_shards: Maximum number of shards
+    :return: Non-empty shards
+    """
+    n_shards = max(1, min(n_shards, len(items)))
+    totals: List[Tuple[int, int]] = [(0, ix) for ix in range(n_shards)]
+    members: List[List[int]] = [[] for _ in range(n_shards)]
+    by_size = sorted(range(len(items)), key=lambda ix: (-sizes[ix], ix))
+    for item_ix in by_size:
+        total, shard_ix = min(totals)
+        members[shard_ix].append(item_ix)
+        totals[shard_ix] = (total + sizes[item_ix], shard_ix)
+    return [[items[ix] for ix in sorted(m)] for m in members if m]
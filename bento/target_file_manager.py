@@ -1,34 +1,27 @@
 import logging
-from collections import namedtuple
+import os
+import shutil
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator, List
+from typing import Dict, Iterable, Iterator, List, Optional
 
 import attr
 import click
 from pre_commit.git import zsplit
 from pre_commit.staged_files_only import staged_files_only
-from pre_commit.util import CalledProcessError, cmd_output, noop_context
+from pre_commit.util import cmd_output, noop_context
 
+import bento.constants as constants
 import bento.git
 from bento.error import UnsupportedGitStateException
 from bento.fignore import FileIgnore, Parser
+from bento.target_set import TargetSet
+from bento.tool import Tool
 from bento.tool_runner import RunStep
-from bento.util import Colors, echo_error, echo_newline
+from bento.util import echo_error
 
 PATCH_CACHE = str(Path.home() / ".cache" / "bento" / "patches")
 
-GitStatus = namedtuple("GitStatus", ["added", "removed", "unmerged"])
-
-
-class StatusCode:
-    Added = "A"
-    Deleted = "D"
-    Renamed = "R"
-    Unmerged = "U"
-    Untracked = "?"
-    Ignored = "!"
-
 
 class NoGitHeadException(Exception):
     """
@@ -57,25 +50,40 @@ class TargetFileManager:
                     we want to traverse
             staged: whether we want to scan just staged files
             ignore_rules_file_path: Path to .bentoignore file
+            walk_threads: Number of threads that list directories while walking
+            file_source: How to find files: by walking directories (FILE_SOURCE_WALK)
+                    or by listing them from git (FILE_SOURCE_GIT)
+            untracked: If listing files from git, whether to include untracked
+                    files that git does not ignore
+            walk_index_path: If defined, where to persist directory listings, so
+                    that later walks only list directories that changed
+            staged_mode: How to check staged files: by changing the working tree
+                    (STAGED_MODE_WORKTREE), or by writing snapshots of the files to
+                    check, as staged or as of HEAD, to a scratch directory
+                    (STAGED_MODE_SNAPSHOT)
     """
 
     _base_path = attr.ib(type=Path)
     _paths = attr.ib(type=List[Path])
     _staged = attr.ib(type=bool)
     _ignore_rules_file_path = attr.ib(type=Path)
-    _target_paths = attr.ib(type=List[Path], init=False)
+    _walk_threads = attr.ib(type=int, default=1)
+    _file_source = attr.ib(type=str, default=constants.FILE_SOURCE_WALK)
+    _untracked = attr.ib(type=bool, default=False)
+    _walk_index_path = attr.ib(type=Optional[Path], default=None)
+    _staged_mode = attr.ib(type=str, default=constants.STAGED_MODE_WORKTREE)
+    _target_paths = attr.ib(type=TargetSet, init=False)
 
     def _staged_paths(self) -> List[Path]:
         """
             Returns Absolute Paths to all files that are staged
         """
         repo = bento.git.repo()
-        if not repo:
+        if not repo or not repo.working_tree_dir:
             return []
 
         # Output of git command will be relative to git project root
-        cmd = [
-            "git",
+        result = repo.execute(
             "diff",
             "--name-only",
             "--no-ext-diff",
@@ -83,17 +91,16 @@ class TargetFileManager:
             # Everything except for D
             "--diff-filter=ACMRTUXB",
             "--staged",
-        ]
-        result = repo.git.execute(cmd)
+        )
         str_paths = zsplit(result)
 
         # Resolve paths relative to git project root
         return [(Path(repo.working_tree_dir) / p).resolve() for p in str_paths]
 
     @_target_paths.default
-    def _get_target_files(self) -> List[Path]:
+    def _get_target_files(self) -> TargetSet:
         """
-            Return list of all absolute paths to analyze
+            Return set of all absolute paths to analyze
         """
         # resolve given paths relative to current working directory
         paths = [p.resolve() for p in self._paths]
@@ -117,180 +124,227 @@ class TargetFileManager:
                 ignore_lines
             )
 
+        listed_files = None
+        if self._file_source == constants.FILE_SOURCE_GIT and not self._staged:
+            listed_files = bento.git.list_files(paths, self._untracked, self._base_path)
+            if listed_files is None:
+                logging.info("Not in a git repository; walking files instead")
+
         file_ignore = FileIgnore(
-            base_path=self._base_path, patterns=patterns, target_paths=paths
+            base_path=self._base_path,
+            patterns=patterns,
+            target_paths=paths,
+            threads=self._walk_threads,
+            listed_files=listed_files,
+            index_path=self._walk_index_path,
         )
 
-        filtered: List[Path] = []
-        for elem in file_ignore.entries():
-            if elem.survives:
-                filtered.append(elem.path)
-
-        return filtered
+        return TargetSet.from_paths(self._base_path, file_ignore.surviving())
 
-    def _git_status(self) -> GitStatus:
+    def _unmerged_paths(self) -> List[str]:
         """
-            Gets added, removed, and unmerged paths from the git index
+            Returns paths, relative to the git project root, with unresolved merge
+            conflicts in the git index
         """
-        status_output = (
-            cmd_output("git", "status", "--porcelain", "-z")[1].rstrip().split("\0")
-        )
-        next_is_file = False
-        added = []
-        removed = []
-        unmerged = []
-        for s in status_output:
-            if not s.strip():
-                continue
-            if next_is_file:
-                # We are in source line of rename
-                next_is_file = False
-                removed.append(s)
-                continue
-            if s[0] == StatusCode.Untracked or s[0] == StatusCode.Ignored:
-                continue
-
-            fname = s[3:]
-            # The following detection for unmerged codes comes from `man git-status`
-            if (
-                s[0] == StatusCode.Added
-                and s[1] == StatusCode.Added
-                or s[0] == StatusCode.Deleted
-                and s[1] == StatusCode.Deleted
-                or s[0] == StatusCode.Unmerged
-                or s[1] == StatusCode.Unmerged
-            ):
-                unmerged.append(fname)
-            if s[0] == StatusCode.Renamed:
-                added.append(fname)
-                next_is_file = True
-            if s[0] == StatusCode.Added:
-                added.append(fname)
-            if s[0] == StatusCode.Deleted:
-                removed.append(fname)
-        logging.info(
-            f"Git status:\nadded: {added}\nremoved: {removed}\nunmerged: {unmerged}"
-        )
-        return GitStatus(added, removed, unmerged)
+        # Each unmerged path has an index entry for each of its conflicting stages
+        output = cmd_output("git", "ls-files", "--unmerged", "-z")[1]
+        unmerged = [line.split("\t", 1)[1] for line in zsplit(output)]
+        logging.info(f"Unmerged: {unmerged}")
+        return list(dict.fromkeys(unmerged))
 
-    def _abort_if_untracked_and_removed(self, removed: List[str]) -> None:
+    def _abort_if_unmerged(self, unmerged: List[str]) -> None:
         """
-            Raises UnsupportedGitStateException if any path is removed from
-            the git index but also appears in the filesystem.
+            Raises UnsupportedGitStateException if any paths are unmerged
 
-            :param removed (list): Removed paths
-            :raises UnsupportedGitStateException: If any removed paths are present on Filesystem
+            :raises UnsupportedGitStateException: If unmerged files are detected
         """
-        untracked_removed = [r.replace(" ", r"\ ") for r in removed if Path(r).exists()]
-        if untracked_removed:
-            joined = " ".join(untracked_removed)
-
-            def echo_cmd(cmd: str) -> None:
-                click.echo(f"    $ {click.style(cmd, bold=True)}\n", err=True)
-
+        if unmerged:
             echo_error(
-                "One or more files deleted from git exist on the filesystem. Aborting to prevent data loss. To "
-                "continue, please stash by running the following two commands:"
-            )
-            echo_newline()
-            echo_cmd(f"git stash -u -- {joined}")
-            echo_cmd(f"git rm {joined}")
-            click.secho(
-                "Stashed changes can later be recovered by running:\n",
-                err=True,
-                fg=Colors.ERROR,
+                "Please resolve merge conflicts in these files before continuing:"
             )
-            echo_cmd(f"git stash pop")
+            for f in unmerged:
+                click.secho(f, err=True)
             raise UnsupportedGitStateException()
 
-    @contextmanager
-    def _head_context(self) -> Iterator[None]:
+    def _repo_relpaths(self, root: str) -> Dict[str, str]:
+        """
+            Returns the paths, relative to root, of files to analyze inside the base
+            path, mapped to their paths relative to the base path
+        """
+        relpaths = {}
+        for p in self._target_paths.strs():
+            rel = os.path.relpath(p, self._base_path)
+            if not rel.startswith(os.pardir):
+                relpaths[os.path.relpath(p, root)] = rel
+        return relpaths
+
+    def head_blobs(self) -> Dict[str, str]:
         """
-        Runs a block of code on files from the current branch HEAD.
+            Returns the git blob ID, as of HEAD, of each file to analyze that is in
+            HEAD
 
-        :raises subprocess.CalledProcessError: If git encounters an exception
-        :raises NoGitHeadException: If git cannot detect a HEAD commit
-        :raises UnsupportedGitStateException: If unmerged files are detected
+            :return: Blob IDs, by path relative to the base path
+            :raises NoGitHeadException: If git cannot detect a HEAD commit
         """
         repo = bento.git.repo()
+        if not repo or not repo.working_tree_dir:
+            return {}
+        if bento.git.commit() is None:
+            raise NoGitHeadException()
+
+        relpaths = self._repo_relpaths(str(Path(repo.working_tree_dir).resolve()))
+        ids = bento.git.blob_ids("HEAD", relpaths, self._base_path)
+        return {relpaths[repo_path]: blob for repo_path, blob in ids.items()}
+
+    def staged_line_ranges(self) -> Dict[str, List[range]]:
+        """
+            Returns the ranges of lines that staged changes add or modify
 
-        if not repo:
-            yield
+            :return: Ranges of staged line numbers (1-based), by path relative to the
+                     base path
+        """
+        ranges = bento.git.staged_line_ranges(self._base_path) or {}
+        return {
+            os.path.relpath(path, self._base_path): file_ranges
+            for path, file_ranges in ranges.items()
+        }
+
+    @contextmanager
+    def snapshot(
+        self, revision: str, name: str, tools: Iterable[Tool] = ()
+    ) -> Iterator[TargetSet]:
+        """
+        Writes the files to analyze, as of a git revision, beneath a scratch directory
+        in the resource directory
+
+        Only the files to analyze, and the other files in any of their directories
+        that tools read as a whole (see Tool.package_dirs), are written; the working
+        tree and index are never changed. Parsers report findings in the snapshot at
+        working-tree paths, with source lines from the snapshot.
+
+        :param revision: A tree-ish (e.g. "HEAD"), or "" for the staged contents
+        :param name: The name of the scratch directory; concurrent snapshots must
+                     use distinct names
+        :param tools: The tools that will analyze the snapshot
+        :return: A Python with-expression, yielding the snapshotted files to analyze
+        """
+        repo = bento.git.repo()
+        if not repo or not repo.working_tree_dir:
+            yield self._target_paths
             return
 
-        commit = bento.git.commit()
-        if commit is None:
-            raise NoGitHeadException()
+        # Targets outside the base path can't be placed in its snapshot
+        root = str(Path(repo.working_tree_dir).resolve())
+        relpaths = self._repo_relpaths(root)
+        targets = set(relpaths)
+        packages = {
+            os.path.relpath(d, root)
+            for t in tools
+            for d in t.package_dirs(self._target_paths)
+        }
+        for repo_path in bento.git.tree_files(revision, packages, self._base_path):
+            rel = os.path.relpath(os.path.join(root, repo_path), self._base_path)
+            if not rel.startswith(os.pardir):
+                relpaths.setdefault(repo_path, rel)
+        blobs = bento.git.read_blobs(revision, relpaths, self._base_path)
+
+        snapshot = (
+            self._base_path / constants.RESOURCE_PATH / constants.SNAPSHOT_PATH / name
+        )
+        shutil.rmtree(snapshot, ignore_errors=True)
+        try:
+            written = []
+            for repo_path, contents in blobs.items():
+                dest = snapshot / relpaths[repo_path]
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                dest.write_bytes(contents)
+                if repo_path in targets:
+                    written.append(dest)
+            logging.info(f"Wrote {len(blobs)} files to {snapshot}")
+            yield TargetSet.from_paths(self._base_path, written)
+        finally:
+            shutil.rmtree(snapshot, ignore_errors=True)
+            try:
+                snapshot.parent.rmdir()
+            except OSError:
+                # Another snapshot is still in use
+                pass
 
+    @contextmanager
+    def _snapshot_context(
+        self, run_step: RunStep, tools: Iterable[Tool]
+    ) -> Iterator[TargetSet]:
+        """
+        Snapshots the files to analyze as of HEAD (for the baseline step) or as staged
+        (for the check step); see snapshot
+
+        :return: A Python with-expression, yielding the snapshotted paths
+        :raises NoGitHeadException: If git cannot detect a HEAD commit
+        :raises UnsupportedGitStateException: If unmerged files are detected
+        """
+        if not bento.git.repo():
+            yield self._target_paths
+            return
+
+        if run_step == RunStep.BASELINE:
+            if bento.git.commit() is None:
+                raise NoGitHeadException()
+            revision = "HEAD"
         else:
-            added, removed, unmerged = self._git_status()
+            revision = ""
+        self._abort_if_unmerged(self._unmerged_paths())
 
-            # Need to look for unmerged files first, otherwise staged_files_only will eat them
-            if unmerged:
-                echo_error(
-                    "Please resolve merge conflicts in these files before continuing:"
-                )
-                for f in unmerged:
-                    click.secho(f, err=True)
-                raise UnsupportedGitStateException()
-
-            with staged_files_only(PATCH_CACHE):
-                tree = cmd_output("git", "write-tree")[1].strip()
-                self._abort_if_untracked_and_removed(removed)
-                try:
-                    for a in added:
-                        (repo.working_tree_dir / Path(a)).unlink()
-                    cmd_output("git", "checkout", "HEAD", "--", ".")
-                    yield
-                finally:
-                    # git checkout will fail if the checked-out index deletes all files in the repo
-                    # In this case, we still want to continue without error.
-                    # Note that we have no good way of detecting this issue without inspecting the checkout output
-                    # message, which means we are fragile with respect to git version here.
-                    try:
-                        cmd_output("git", "checkout", tree.strip(), "--", ".")
-                    except CalledProcessError as ex:
-                        if (
-                            ex.output
-                            and len(ex.output) >= 2
-                            and "pathspec '.' did not match any file(s) known to git"
-                            in ex.output[1].strip()
-                        ):
-                            logging.warning(
-                                "Restoring git index failed due to total repository deletion; skipping checkout"
-                            )
-                        else:
-                            raise ex
-                    if removed:
-                        cmd_output("git", "rm", *removed)
+        with self.snapshot(revision, run_step.name.lower(), tools) as snapshot_paths:
+            yield snapshot_paths
 
     @contextmanager
-    def run_context(self, staged: bool, run_step: RunStep) -> Iterator[List[Path]]:
+    def run_context(
+        self,
+        staged: bool,
+        run_step: RunStep,
+        isolated: bool = False,
+        tools: Iterable[Tool] = (),
+    ) -> Iterator[TargetSet]:
         """
         Provides a context within which to run tools and returns list of paths
         that should be analyzed.
 
         Possible contexts include:
 
-            Head Context: all files in current branch HEAD
             Staged Files Context: all files in current branch HEAD plus staged changes
                                   (hides all untracked files)
+            Snapshot Context: the files to analyze, as in HEAD (for the baseline
+                              step) or as staged (with STAGED_MODE_SNAPSHOT), copied
+                              to a scratch directory
             Noop: all files as currently available on filesystem
 
-        Returned list of paths are all abolute paths and include all files that are
+        Returned set of paths are all abolute paths and include all files that are
             - not ignored based on .bentoignore rules and
             - exist in any path filters specified.
 
         :param staged: Whether to use remove file diffs
         :param run_step: Which run step is in use (baseline if tool is determining baseline, check if tool is finding new results)
+        :param isolated: If staged, whether to always use a snapshot context, which
+                         leaves the working tree alone and so may be used while
+                         another step runs (the baseline step always does)
+        :param tools: The tools that will analyze the files (see snapshot)
         :return: A Python with-expression
         :raises subprocess.CalledProcessError: If git encounters an exception
         :raises NoGitHeadException: If git cannot detect a HEAD commit
         :raises UnsupportedGitStateException: If unmerged files are detected
         """
-        if staged and run_step == RunStep.BASELINE:
-            stash_context = self._head_context()
-        elif staged:
+        # The working tree is never changed to analyze HEAD, so that unstaged changes
+        # are never at risk if Bento is killed mid-run
+        if staged and (
+            isolated
+            or run_step == RunStep.BASELINE
+            or self._staged_mode == constants.STAGED_MODE_SNAPSHOT
+        ):
+            with self._snapshot_context(run_step, tools) as snapshot_paths:
+                yield snapshot_paths
+            return
+
+        if staged:
             stash_context = staged_files_only(PATCH_CACHE)
         else:
             # staged is False
@@ -0,0 +1,105 @@
+import bisect
+import os
+from pathlib import Path
+from typing import (
+    AbstractSet,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+
+class TargetSet(AbstractSet[Path]):
+    """
+    An immutable, sorted set of target files
+
+    Files are stored as strings relative to base_path (or absolute, for files outside
+    base_path), rather than as Path objects, so large projects' targets stay small in
+    memory and cheap to pass to worker processes. Paths are only built while
+    iterating; membership is tested by binary search.
+
+    Subsets made with `select` share their strings with this set.
+    """
+
+    __slots__ = ("base_path", "_base", "_relpaths")
+
+    def __init__(self, base_path: Path, relpaths: Sequence[str]) -> None:
+        """
+        :param relpaths: Sorted, distinct paths relative to base_path
+        """
+        self.base_path = base_path
+        self._base = os.path.join(str(base_path), "")
+        self._relpaths: Tuple[str, ...] = tuple(relpaths)
+
+    @classmethod
+    def from_paths(
+        cls, base_path: Path, paths: Iterable[Union[str, Path]]
+    ) -> "TargetSet":
+        """
+        Builds a TargetSet from absolute paths
+        """
+        base = os.path.join(str(base_path), "")
+        n = len(base)
+        relpaths = {s[n:] if s.startswith(base) else s for s in (str(p) for p in paths)}
+        return cls(base_path, sorted(relpaths))
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[Path]) -> Set[Path]:
+        # Results of set operators (&, |, -) are ordinary sets
+        return set(it)
+
+    def _relative(self, path: str) -> str:
+        return path[len(self._base) :] if path.startswith(self._base) else path
+
+    def strs(self) -> Iterator[str]:
+        """
+        Iterates over absolute paths, as strings, in sorted order
+        """
+        base = self._base
+        return (os.path.join(base, r) for r in self._relpaths)
+
+    def select(self, predicate: Callable[[str], bool]) -> "TargetSet":
+        """
+        Returns the subset of files whose absolute path (as a string) satisfies predicate
+        """
+        base = self._base
+        return TargetSet(
+            self.base_path,
+            [r for r in self._relpaths if predicate(os.path.join(base, r))],
+        )
+
+    def __iter__(self) -> Iterator[Path]:
+        return (Path(s) for s in self.strs())
+
+    def __len__(self) -> int:
+        return len(self._relpaths)
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, (str, Path)):
+            return False
+        rel = self._relative(str(item))
+        ix = bisect.bisect_left(self._relpaths, rel)
+        return ix < len(self._relpaths) and self._relpaths[ix] == rel
+
+    def __getstate__(self) -> Tuple[Path, Tuple[str, ...]]:
+        return self.base_path, self._relpaths
+
+    def __setstate__(self, state: Tuple[Path, Tuple[str, ...]]) -> None:
+        base_path, relpaths = state
+        TargetSet.__init__(self, base_path, relpaths)
+
+    def __repr__(self) -> str:
+        return f"TargetSet({self.base_path!r}, {len(self)} files)"
+
+
+def path_strs(paths: Iterable[Union[str, Path]]) -> Iterator[str]:
+    """
+    Iterates over paths as strings, without building Path objects for a TargetSet
+    """
+    if isinstance(paths, TargetSet):
+        return paths.strs()
+    return (str(p) for p in paths)
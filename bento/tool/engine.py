@@ -0,0 +1,146 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Generic, Iterable, List, Mapping, Set, Type
+
+import attr
+
+from bento.tool.tool import R, Tool
+
+"""
+Engines run the analysis program behind several tools once, for all of those tools
+"""
+
+
+@attr.s
+class Engine(ABC, Generic[R]):
+    """
+    Serves the runs of several tools that are front ends to the same analysis program
+
+    The program analyzes each file once, with every member's checks; each member then
+    receives only its own findings, in the form its run method would have returned
+    them, and parses them with its own parser. Members are otherwise run as usual:
+    each keeps its own cache, configuration and results.
+
+    :param members: The tools that share this engine
+    """
+
+    members = attr.ib(type=List[Tool])
+    _records = attr.ib(type=Dict[str, Any], factory=dict, init=False)
+    _done = attr.ib(type=Set[str], factory=set, init=False)
+    _lock = attr.ib(type=threading.Lock, factory=threading.Lock, init=False)
+    _setup_lock = attr.ib(type=threading.Lock, factory=threading.Lock, init=False)
+    _is_set_up = attr.ib(type=bool, default=False, init=False)
+
+    @classmethod
+    @abstractmethod
+    def groups(cls, tools: List[Tool]) -> List[List[Tool]]:
+        """
+        Partitions tools that run on this engine into groups that can share runs
+        """
+        pass
+
+    @abstractmethod
+    def installed(self) -> bool:
+        """
+        Returns whether the program is installed with everything every member needs,
+        without installing anything
+        """
+        pass
+
+    @abstractmethod
+    def _setup(self) -> None:
+        """
+        Installs the program, with everything every member needs
+
+        Raises:
+            CalledProcessError: If setup fails
+        """
+        pass
+
+    @abstractmethod
+    def run(self, paths: List[str]) -> Mapping[str, Any]:
+        """
+        Runs the program on paths, with every member's checks
+
+        Returns:
+            The program's output for each path that it reported on, by path as passed
+        """
+        pass
+
+    @abstractmethod
+    def member_output(self, tool: Tool[R], records: Mapping[str, Any]) -> R:
+        """
+        Returns what tool's run method would return for the files in records
+
+        Parameters:
+            records (mapping): The program's output for each file that it reported on
+        """
+        pass
+
+    def setup(self) -> None:
+        """
+        Installs the program, once for all members
+        """
+        with self._setup_lock:
+            if not self._is_set_up:
+                self._setup()
+                self._is_set_up = True
+
+    def output(self, tool: Tool[R], paths: List[str]) -> R:
+        """
+        Returns tool's output for paths, running the program only on paths that no
+        member has requested before
+        """
+        with self._lock:
+            missing = [p for p in paths if p not in self._done]
+        if missing:
+            records = self.run(missing)
+            with self._lock:
+                self._records.update(records)
+                self._done.update(missing)
+        with self._lock:
+            found = {p: self._records[p] for p in paths if p in self._records}
+        return self.member_output(tool, found)
+
+
+def plan(tools: Iterable[Tool], installed_only: bool = False) -> List[List[Tool]]:
+    """
+    Groups tools that can share engine runs
+
+    Parameters:
+        tools (iterable): Tools to run
+        installed_only (bool): If true, tools only share engines that are already
+                               installed (for runs that skip setup)
+
+    Returns:
+        Groups of tools, in order of each group's first tool. The tools in a group of
+        more than one share an engine, and are copies bound to it (see Tool.on_engine);
+        every other tool is returned unchanged, in a group of its own.
+    """
+    tools = list(tools)
+    candidates: Dict[Type[Engine], List[Tool]] = {}
+    for t in tools:
+        engine_type = t.engine_type()
+        if engine_type:
+            candidates.setdefault(engine_type, []).append(t)
+
+    bound: Dict[str, List[Tool]] = {}
+    for engine_type, members in candidates.items():
+        for group in engine_type.groups(members):
+            if len(group) < 2:
+                continue
+            engine = engine_type(group)
+            if installed_only and not engine.installed():
+                continue
+            logging.debug(
+                f"Sharing {engine_type.__name__} between {[t.tool_id() for t in group]}"
+            )
+            bound[group[0].tool_id()] = [t.on_engine(engine) for t in group]
+
+    grouped = {t.tool_id() for group in bound.values() for t in group}
+    return [
+        bound[t.tool_id()] if t.tool_id() in bound else [t]
+        for t in tools
+        if t.tool_id() in bound or t.tool_id() not in grouped
+    ]
@@ -119,6 +119,9 @@ class DockerTool(Generic[R], Tool[R]):
         """The volumes to bind when Docker is running locally"""
         return {str(self.base_path): {"bind": self.remote_code_path, "mode": "ro"}}
 
+    def cache_version(self) -> str:
+        return self.docker_image
+
     def is_allowed_returncode(self, returncode: int) -> bool:
         """Returns true iff the Docker container's return code indicates no error"""
         return returncode == 0
@@ -127,14 +130,24 @@ class DockerTool(Generic[R], Tool[R]):
         """Creates the full command to send to the docker container from file targets"""
         return self.docker_command + list(targets)
 
+    def image_pulled(self) -> bool:
+        """
+        Returns whether the docker image is available locally, without pulling it
+        """
+        if not DOCKER_INSTALLED.value:
+            return False
+        try:
+            client = get_docker_client()
+        except DockerFailureException:
+            return False
+        return any(i for i in client.images.list() if self.docker_image in i.tags)
+
     def _prepull_image(self) -> None:
         """
         Pulls the docker image from Docker hub
         """
-        client = get_docker_client()
-
-        if not any(i for i in client.images.list() if self.docker_image in i.tags):
-            client.images.pull(self.docker_image)
+        if not self.image_pulled():
+            get_docker_client().images.pull(self.docker_image)
             logging.info(f"Pre-pulled {self.tool_id()} image")
 
     def _create_container(self, targets: Iterable[str]) -> "Container":
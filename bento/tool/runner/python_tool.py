@@ -45,6 +45,11 @@ class PythonTool(Generic[R], Tool[R]):
     def required_packages(cls) -> Dict[str, SimpleSpec]:
         return cls.PACKAGES
 
+    def cache_version(self) -> str:
+        return ",".join(
+            f"{p}{s.expression}" for p, s in sorted(self.required_packages().items())
+        )
+
     @classmethod
     def venv_dir(cls) -> Path:
         return constants.VENV_PATH / cls.venv_subdir_name()
@@ -1,15 +1,26 @@
+import copy
+import hashlib
+import json
 import logging
+import os
 import resource
 import subprocess
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from time import time
 from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
     Any,
+    Callable,
+    Collection,
     Dict,
     Generic,
     Iterable,
     List,
+    Mapping,
     Optional,
     Pattern,
     Set,
@@ -19,22 +30,50 @@ from typing import (
 
 import attr
 
+import bento.constants as constants
+from bento import __version__ as BENTO_VERSION
 from bento.base_context import BaseContext
 from bento.parser import Parser
-from bento.result import from_cache_repr, to_cache_repr
+from bento.result import (
+    from_cache_dicts,
+    from_cache_repr,
+    to_cache_dicts,
+    to_cache_repr,
+)
+from bento.scheduler import BUDGET, shard
+from bento.target_set import TargetSet, path_strs
 from bento.util import batched
 from bento.violation import Violation
 
+if TYPE_CHECKING:
+    from bento.tool.engine import Engine  # noqa
+
 R = TypeVar("R")
 """Generic return type"""
 
 JsonR = List[Dict[str, Any]]
 """Return type for tools with a JSON representation"""
 
+Progress = Callable[[int, int], None]
+"""Called with the number of files checked so far, and the total number of files to check"""
+
 
 MIN_RESERVED_ARGS = 128
 """Number of argument positions reserved for non-file command arguments (e.g. rule ignores)"""
 
+MIN_SHARD_FILES = 16
+"""Minimum number of files worth starting a separate tool process for"""
+
+MIN_SHARD_SECONDS = 1.0
+"""Minimum expected run time worth starting a separate tool process for"""
+
+SCHEDULING_KEYS = {
+    constants.TOOL_PRIORITY,
+    constants.TOOL_CONCURRENCY,
+    constants.TOOL_MEMORY,
+}
+"""Tool configuration keys that affect when, but not how, a tool runs"""
+
 
 # Note: for now, every tool *HAS* to directly inherit from this, even if it
 # also inherits from JsTool or PythonTool. This is so we can list all tools by
@@ -44,6 +83,7 @@ class Tool(ABC, Generic[R]):
     """The base class for all tool plugins"""
 
     context = attr.ib(type=BaseContext)
+    _engine = attr.ib(type=Optional["Engine"], default=None, init=False)
 
     @property
     def base_path(self) -> Path:
@@ -147,6 +187,171 @@ class Tool(ABC, Generic[R]):
         """
         return []
 
+    def can_use_file_cache(self) -> bool:
+        """
+        Returns true if this tool's findings on a file depend only on that file's contents
+
+        Tools that return true have their findings cached per file, so that only changed
+        files need to be re-analyzed.
+        """
+        return False
+
+    def package_dirs(self, paths: Iterable[Path]) -> Set[Path]:
+        """
+        Returns directories whose every file this tool reads when checking any of paths
+
+        For example, a tool that analyzes whole packages returns the directories that
+        contain paths. Snapshots of git state include these directories' files, so that
+        the tool sees the same packages as it would in the working tree.
+        """
+        return set()
+
+    def can_shard(self) -> bool:
+        """
+        Returns true if this tool can be run as several concurrent processes, each on a
+        subset of files, with the same combined findings as a single run
+        """
+        return False
+
+    def engine_type(self) -> Optional[Type["Engine"]]:
+        """
+        Returns the engine (see bento.tool.engine) that can run this tool together with
+        other tools that are front ends to the same analysis program, if any
+        """
+        return None
+
+    @property
+    def engine(self) -> Optional["Engine"]:
+        """Returns the engine that serves this tool's runs, if any"""
+        return self._engine
+
+    def on_engine(self, engine: "Engine") -> "Tool[R]":
+        """
+        Returns a copy of this tool whose runs are served by engine
+        """
+        bound = copy.copy(self)
+        bound._engine = engine
+        return bound
+
+    def priority(self) -> int:
+        """
+        Returns this tool's configured priority; higher-priority tools are started first
+        """
+        return int(self.config.get(constants.TOOL_PRIORITY, 0))
+
+    def max_concurrency(self) -> int:
+        """
+        Returns the configured maximum number of concurrent shards (0 for no limit)
+        """
+        return int(self.config.get(constants.TOOL_CONCURRENCY, 0))
+
+    def memory(self) -> int:
+        """
+        Returns the configured memory, in megabytes, used by each process of this tool
+        """
+        return int(self.config.get(constants.TOOL_MEMORY, 0))
+
+    def cache_version(self) -> str:
+        """
+        Returns a string that changes whenever this tool's installed version changes
+
+        Used to invalidate per-file cache entries.
+        """
+        return ""
+
+    def _file_cache_fingerprint(self) -> str:
+        """
+        Returns a digest of everything, other than file contents, that affects this tool's findings
+        """
+        h = hashlib.sha256()
+        for part in (
+            self.tool_id(),
+            BENTO_VERSION,
+            self.cache_version(),
+            json.dumps(
+                {k: v for k, v in self.config.items() if k not in SCHEDULING_KEYS},
+                sort_keys=True,
+                default=str,
+            ),
+        ):
+            h.update(part.encode())
+            h.update(b"\0")
+        for p in self.extra_cache_paths():
+            h.update(str(p).encode())
+            h.update(self.context.cache.content_hash(p).encode() if p.exists() else b"")
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _file_cache_keys(self, paths: Iterable[Path]) -> Dict[str, str]:
+        """
+        Returns a per-file cache key for each path, indexed by path relative to the base path
+        """
+        fingerprint = self._file_cache_fingerprint()
+        keys = {}
+        for p in paths:
+            rel = os.path.relpath(p, self.base_path)
+            content = self.context.cache.content_hash(p)
+            keys[rel] = hashlib.sha256(
+                f"{fingerprint}:{rel}:{content}".encode()
+            ).hexdigest()
+        return keys
+
+    def _checked_blobs(self, blobs: Mapping[str, str]) -> Dict[str, str]:
+        """
+        Returns the blob IDs, by path relative to the base path, of those files that this tool checks
+        """
+        base = os.path.join(str(self.base_path), "")
+        checked = self.filter_paths(
+            TargetSet.from_paths(self.base_path, (base + r for r in blobs))
+        )
+        return {r: blobs[r] for r in (p[len(base) :] for p in path_strs(checked))}
+
+    def recorded_head_findings(self, blobs: Mapping[str, str]) -> Optional[Set[str]]:
+        """
+        Returns the syntactic identifiers of this tool's recorded findings in files as of HEAD
+
+        Parameters:
+            blobs (mapping): The HEAD blob ID of each file to check, by path relative to the base path
+
+        Returns:
+            The identifiers, or None if this tool's findings in any of these files' blobs
+            have not been recorded (always None for tools that can't use the per-file cache)
+        """
+        if not (self.can_use_cache() and self.can_use_file_cache()):
+            return None
+        checked = self._checked_blobs(blobs)
+        if not checked:
+            return set()
+        return self.context.cache.head_findings.get(
+            self.tool_id(), self._file_cache_fingerprint(), checked
+        )
+
+    def record_head_findings(
+        self, blobs: Mapping[str, str], violations: Iterable[Violation]
+    ) -> None:
+        """
+        Records this tool's findings in files as of HEAD, for recorded_head_findings
+
+        Parameters:
+            blobs (mapping): The HEAD blob ID of each file checked, by path relative to the base path
+            violations (iterable): This tool's findings in those files
+        """
+        if not (self.can_use_cache() and self.can_use_file_cache()):
+            return
+        checked = self._checked_blobs(blobs)
+        identifiers: Dict[str, Set[str]] = {}
+        for v in violations:
+            path = os.path.normpath(v.path)
+            if path not in checked:
+                logging.debug(
+                    f"Not recording {self.tool_id()} findings: {path} was not checked"
+                )
+                return
+            identifiers.setdefault(path, set()).add(v.syntactic_identifier_str())
+        self.context.cache.head_findings.put(
+            self.tool_id(), self._file_cache_fingerprint(), checked, identifiers
+        )
+
     def project_has_file_paths(self, files: Iterable[Path]) -> bool:
         """
         Returns true iff any unignored files matches at least one extension
@@ -176,7 +381,7 @@ class Tool(ABC, Generic[R]):
 
         return self.shebang_pattern.match(line) is not None
 
-    def filter_paths(self, paths: Iterable[Path]) -> Set[Path]:
+    def filter_paths(self, paths: Iterable[Path]) -> AbstractSet[Path]:
         """
         Filters a list of paths to those that should be analyzed by this tool
 
@@ -190,8 +395,18 @@ class Tool(ABC, Generic[R]):
             paths (list): List of candidate paths
 
         Returns:
-            A set of valid paths
+            A set of valid paths (a TargetSet, if paths is a TargetSet)
         """
+        if isinstance(paths, TargetSet):
+            # Already absolute and resolved; filtered without building Paths
+            return paths.select(
+                lambda s: bool(self.file_name_filter.match(os.path.basename(s)))
+                or bool(
+                    self.shebang_pattern
+                    and self._file_contains_shebang_pattern(Path(s))
+                )
+            )
+
         abspaths = [p.resolve() for p in paths]
         to_run = {
             p
@@ -224,43 +439,200 @@ class Tool(ABC, Generic[R]):
         # On UNIX, max argc is stack size / 4
         return int(resource.RLIMIT_STACK / 4) - MIN_RESERVED_ARGS
 
-    def _get_findings_from_run(self, paths: Iterable[Path]) -> List[Violation]:
+    def _get_findings_from_run(
+        self,
+        paths: Iterable[Path],
+        use_cache: bool = False,
+        progress: Optional[Progress] = None,
+    ) -> List[Violation]:
         """
         Returns findings by calling tool "run" method
 
+        If use_cache is true, and this tool can use the per-file cache, the tool is
+        only run on files whose per-file cache entries are missing or stale.
+
         :param paths: Paths to run on
+        :param use_cache: Whether to use the per-file cache
+        :param progress: If defined, called as batches of files are checked
         :return:
         """
         paths_to_run = self.filter_paths(paths)
         if not paths_to_run:
             return []
 
+        if not (use_cache and self.can_use_file_cache()):
+            return self._run_and_parse(paths_to_run, progress)
+
+        keys = self._file_cache_keys(paths_to_run)
+        hits = self.context.cache.get_files(self.tool_id(), keys)
+        cached = from_cache_dicts(v for path in sorted(hits) for v in hits[path])
+
+        misses = {
+            p for p in paths_to_run if os.path.relpath(p, self.base_path) not in hits
+        }
+        if not misses:
+            return cached
+        violations = self._run_and_parse(misses, progress)
+
+        miss_keys = {path: key for path, key in keys.items() if path not in hits}
+        by_path: Dict[str, List[Violation]] = {}
+        for v in violations:
+            # As in record_head_findings, so that e.g. "./a.py" is cached as "a.py"
+            by_path.setdefault(os.path.normpath(v.path), []).append(v)
+        if all(path in miss_keys for path in by_path):
+            self.context.cache.put_files(
+                self.tool_id(),
+                miss_keys,
+                {path: to_cache_dicts(vv) for path, vv in by_path.items()},
+            )
+        else:
+            # Findings can't be attributed to the files that were run, so are not cacheable
+            logging.debug(f"{self.tool_id()}: Skipping per-file cache update")
+
+        return cached + violations
+
+    def _run_and_parse(
+        self, paths_to_run: Iterable[Path], progress: Optional[Progress] = None
+    ) -> List[Violation]:
+        """
+        Runs this tool on paths and parses its output
+
+        If this tool can shard, paths are split into shards of similar total size. Shards
+        are run concurrently as idle CPU slots become available, and findings are
+        returned in shard order.
+        """
+        paths = sorted(paths_to_run)
+        lock = threading.Lock()
+        n_done = 0
+
+        def on_batch(n_files: int) -> None:
+            nonlocal n_done
+            with lock:
+                n_done += n_files
+                if progress:
+                    progress(n_done, len(paths))
+
+        n_shards = self._shard_count(paths)
+        if n_shards <= 1:
+            return self._run_and_parse_shard(paths, on_batch)
+        return self._run_and_parse_sharded(paths, n_shards, on_batch)
+
+    def _shard_count(self, paths: List[Path]) -> int:
+        """
+        Returns the number of shards worth splitting paths into
+        """
+        if not self.can_shard():
+            return 1
+        n_shards = -(-len(paths) // MIN_SHARD_FILES)
+        file_seconds = self.context.cache.durations.file_seconds(self.tool_id())
+        if file_seconds is not None:
+            n_shards = min(n_shards, int(file_seconds * len(paths) / MIN_SHARD_SECONDS))
+        return min(n_shards, BUDGET.slots)
+
+    def _run_and_parse_sharded(
+        self, paths: List[Path], n_shards: int, on_batch: Callable[[int], None]
+    ) -> List[Violation]:
+        """
+        Runs this tool on shards of paths
+
+        The calling thread runs shards one after another. Before starting each shard, a
+        worker borrows any idle slots from the resource budget, and starts a helper
+        worker for each, up to this tool's concurrency limit.
+        """
+        sizes = [self.context.cache.file_size(p) for p in paths]
+        shards = shard(paths, sizes, n_shards)
+        logging.debug(f"{self.tool_id()}: Running {len(shards)} shards")
+
+        per_shard: List[List[Violation]] = [[] for _ in shards]
+        pending = list(range(len(shards)))
+        limit = min(self.max_concurrency() or len(shards), len(shards))
+        memory = self.memory()
+        lock = threading.Lock()
+        n_workers = 1
+        helpers: List[Future] = []
+
+        with ThreadPoolExecutor(max(1, limit - 1)) as executor:
+
+            def run_helper() -> None:
+                nonlocal n_workers
+                try:
+                    work()
+                finally:
+                    with lock:
+                        n_workers -= 1
+                    BUDGET.release(1, memory)
+
+            def work() -> None:
+                nonlocal n_workers
+                while True:
+                    with lock:
+                        if not pending:
+                            return
+                        ix = pending.pop(0)
+                        extra = BUDGET.borrow(
+                            min(len(pending), limit - n_workers), memory
+                        )
+                        n_workers += extra
+                        for _ in range(extra):
+                            helpers.append(executor.submit(run_helper))
+                    per_shard[ix] = self._run_and_parse_shard(shards[ix], on_batch)
+
+            work()
+
+        for h in helpers:
+            h.result()
+
+        return [v for violations in per_shard for v in violations]
+
+    def _run_and_parse_shard(
+        self, paths: List[Path], on_batch: Callable[[int], None]
+    ) -> List[Violation]:
+        """
+        Runs this tool on paths, in batches, and parses its output
+
+        :param on_batch: Called with the number of files in each batch, once checked
+        """
         violations: List[Violation] = []
+        before = time()
 
-        for batch in batched(paths_to_run, self.max_batch_size()):
+        for batch in batched(paths, self.max_batch_size()):
             path_list = [str(p) for p in batch]
-            raw = self.run(path_list)
+            if self._engine:
+                raw = self._engine.output(self, path_list)
+            else:
+                raw = self.run(path_list)
             try:
                 violations += self.parser().parse(raw)
             except Exception as e:
                 raise Exception(
                     f"Could not parse output of '{self.tool_id()}':\n{raw}", e
                 )
+            on_batch(len(path_list))
 
+        self.context.cache.durations.record_files(
+            self.tool_id(), len(paths), time() - before
+        )
         return violations
 
-    def results(self, paths: List[Path], use_cache: bool = True) -> List[Violation]:
+    def results(
+        self,
+        paths: Collection[Path],
+        use_cache: bool = True,
+        progress: Optional[Progress] = None,
+    ) -> List[Violation]:
         """
         Runs this tool, returning all identified violations
 
         Code runs inside virtual environment.
 
         Before running tool, checks local RunCache for cached tool output and skips
-        if said output is still usable
+        if said output is still usable. Tools that can use the per-file cache are only
+        run on files whose contents have changed.
 
         Parameters:
-            paths (list or None): If defined, an explicit list of paths to run on
+            paths (collection or None): If defined, an explicit set of paths to run on
             use_cache (bool): If True, checks for cached results
+            progress (callable): If defined, called as batches of files are checked
 
         Raises:
             CalledProcessError: If execution fails
@@ -270,22 +642,28 @@ class Tool(ABC, Generic[R]):
 
         use_cache = use_cache and self.can_use_cache()
 
+        if use_cache and self.can_use_file_cache():
+            violations = self._get_findings_from_run(paths, True, progress)
+            return self._remove_ignored(violations)
+
         logging.debug(f"Checking for local cache for {self.tool_id()}")
-        cache_repr = self.context.cache.get(
-            self.tool_id(), paths + self.extra_cache_paths()
-        )
+        cache_paths = [*path_strs(paths), *path_strs(self.extra_cache_paths())]
+        cache_repr = self.context.cache.get(self.tool_id(), cache_paths)
         if not use_cache or cache_repr is None:
             logging.debug(f"Cache entry invalid for {self.tool_id()}. Running Tool.")
-            violations = self._get_findings_from_run(paths)
+            violations = self._get_findings_from_run(paths, progress=progress)
             if use_cache:
                 self.context.cache.put(
-                    self.tool_id(),
-                    paths + self.extra_cache_paths(),
-                    to_cache_repr(violations),
+                    self.tool_id(), cache_paths, to_cache_repr(violations)
                 )
         else:
             violations = from_cache_repr(cache_repr)
 
+        return self._remove_ignored(violations)
+
+    def _remove_ignored(self, violations: List[Violation]) -> List[Violation]:
+        """
+        Removes violations whose checks are ignored in this tool's configuration
+        """
         ignore_set = set(self.config.get("ignore", []))
-        filtered = [v for v in violations if v.check_id not in ignore_set]
-        return filtered
+        return [v for v in violations if v.check_id not in ignore_set]
@@ -1,16 +1,31 @@
 import logging
-import multiprocessing.synchronize
+import math
+import multiprocessing
 import sys
 import threading
 import time
 import traceback
+from concurrent.futures import Future
 from contextlib import contextmanager
 from enum import Enum
 from functools import partial
-from multiprocessing import Lock
-from multiprocessing.pool import ThreadPool
+from multiprocessing.pool import IMapIterator, Pool, ThreadPool
 from pathlib import Path
-from typing import Collection, Iterable, Iterator, List, Optional, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 import attr
 import click
@@ -18,18 +33,24 @@ from tqdm import tqdm
 
 import bento.result
 import bento.util
+from bento.base_context import BaseContext
 from bento.error import NoToolsConfiguredException
+from bento.progress import BAR_UPDATE_INTERVAL, BarEvent, ProgressRenderer
 from bento.result import Baseline
+from bento.scheduler import BUDGET, cpu_count
 from bento.tool import Tool
+from bento.tool.engine import plan
+from bento.tool.tool import Progress
 from bento.violation import Violation
 
 DONE_BAR_VALUE = 30
-BAR_UPDATE_INTERVAL = 0.1
 
 SLOW_RUN_SECONDS = 60  # Number of seconds before which a "slow run" warning is printed
 
 ToolResults = Union[List[Violation], Exception]
 RunResults = Tuple[str, ToolResults]
+SetupFutures = Mapping[str, "Future[None]"]
+"""Tool setup that has already been started, indexed by tool ID"""
 
 START_RUN_BAR_VALUE = int(DONE_BAR_VALUE / 5)
 
@@ -39,41 +60,113 @@ class RunStep(Enum):
     CHECK = 2
 
 
+@attr.s(auto_attribs=True, frozen=True)
+class ProcessRunSpec:
+    """
+    Everything a worker process needs to run a single tool
+
+    Tools hold (unpicklable) references to their context, so workers rebuild the tool
+    from its type and the relevant parts of its context.
+    """
+
+    tool_type: Type[Tool]
+    base_path: Path
+    config: Dict[str, Any]
+    resource_path: Path
+    cache_path: Path
+    paths: Collection[Path]
+    use_cache: bool
+    baseline: Set[str]
+
+    @classmethod
+    def for_tool(
+        cls, tool: Tool, paths: Collection[Path], use_cache: bool, baseline: Baseline
+    ) -> "ProcessRunSpec":
+        context = tool.context
+        return cls(
+            tool_type=type(tool),
+            base_path=context.base_path,
+            config=context.config,
+            resource_path=context.resource_path,
+            cache_path=context.cache.cache_dir,
+            paths=paths,
+            use_cache=use_cache,
+            baseline=set(baseline.get(tool.tool_id(), set())),
+        )
+
+
+def _init_process(slots: int, memory: int) -> None:
+    """
+    Gives a worker process its share of the resource budget
+    """
+    BUDGET.resize(slots, memory)
+
+
+def _results_in_process(spec: ProcessRunSpec) -> List[Tuple[Any, ...]]:
+    """
+    Runs, parses and filters a single tool's results, in a worker process
+
+    :return: The tool's findings, as a compact payload (see bento.result.to_payload)
+    """
+    context = BaseContext(
+        base_path=spec.base_path,
+        config=spec.config,
+        resource_path=spec.resource_path,
+        cache_path=spec.cache_path,
+    )
+    tool = spec.tool_type(context)
+    tool_id = tool.tool_id()
+    with BUDGET.reserve():
+        results = bento.result.filtered(
+            tool_id, tool.results(spec.paths, spec.use_cache), {tool_id: spec.baseline}
+        )
+    context.cache.save()
+    return bento.result.to_payload(results)
+
+
+def size_budget(context: BaseContext, n_tools: int) -> None:
+    """
+    Sizes the process-wide resource budget as configured for a project
+
+    Unless `runner.concurrency` is set, there is a slot for each CPU, and at least
+    one for each of the n_tools tools to run at once, since most tools wait on I/O,
+    subprocesses or Docker rather than use a whole CPU.
+    """
+    slots = context.runner_concurrency or max(cpu_count(), n_tools)
+    BUDGET.resize(slots, context.runner_memory_budget)
+
+
+def worker_pool(processes: int) -> Pool:
+    """
+    Starts a pool of worker processes, each given an equal share of the process-wide
+    resource budget
+    """
+    share = (BUDGET.slots // processes, BUDGET.memory // processes)
+    # Setup may already be running in other threads, so worker processes are
+    # started from a clean server process, rather than forked from this one
+    mp_context = multiprocessing.get_context("forkserver")
+    return mp_context.Pool(processes, _init_process, share)
+
+
 @attr.s
 class Runner:
-    paths = attr.ib(type=List[Path])
+    paths = attr.ib(type=Collection[Path])
     use_cache = attr.ib(type=bool)
     skip_setup = attr.ib(type=bool, default=False)
     show_bars = attr.ib(type=bool, default=True)
     install_only = attr.ib(type=bool, default=False)
-    _lock = attr.ib(type=multiprocessing.synchronize.Lock, factory=Lock, init=False)
+    jobs = attr.ib(type=int, default=0)
+    setup = attr.ib(type=SetupFutures, factory=dict)
+    pool = attr.ib(type=Optional[Pool], default=None)
+    sized_budget = attr.ib(type=bool, default=False)
+    _pool = attr.ib(type=Optional[Pool], default=None, init=False)
+    _lock = attr.ib(type=threading.Lock, factory=threading.Lock, init=False)
     _bars = attr.ib(type=List[tqdm], factory=list, init=False)
-    _run = attr.ib(type=List[bool], factory=list, init=False)
-    _done = attr.ib(type=bool, default=False, init=False)
+    _renderer = attr.ib(type=Optional[ProgressRenderer], default=None, init=False)
 
     def __attrs_post_init__(self) -> None:
         self.show_bars = self.show_bars and sys.stderr.isatty()
 
-    def _update_bars(self, ix: int, lower: int, upper: int) -> None:
-        """
-        Increments a progress bar
-        """
-        bar_value = lower
-        keep_going = True
-        bar = self._bars[ix]
-        while keep_going:
-            with self._lock:
-                keep_going = self._run[ix]
-                if bar_value < upper - 1:
-                    bar_value += 1
-                    bar.update(1)
-                else:
-                    bar_value = lower
-                    bar.update(lower - upper + 1)
-            time.sleep(BAR_UPDATE_INTERVAL)
-        with self._lock:
-            bar.update(upper - bar_value)
-
     def _setup_bars(self, indices_and_tools: List[Tuple[int, Tool]]) -> None:
         """
         Constructs progress bars for all tools
@@ -96,118 +189,101 @@ class Runner:
 
     @contextmanager
     def _updating_bar(
-        self,
-        bar: Optional[tqdm],
-        ix: int,
-        min_value: int,
-        max_value: int,
-        start_text: str,
-        done_text: str,
+        self, ix: int, min_value: int, max_value: int, start_text: str, done_text: str
     ) -> Iterator[None]:
         """
-        Runs a block with an updating progress bar
+        Runs a block with an updating progress bar (if progress bars are displayed)
 
-        :param bar: The progress bar (or None if no progress bar is displayed for this item)
         :param ix: The progress bar index
         :param min_value: Min value to display
         :param max_value: Max value to display
         """
-        th: Optional[threading.Thread] = None
-        self._run[ix] = True
-        if bar:
-            with self._lock:
-                bar.set_postfix_str(start_text)
-            th = threading.Thread(
-                name=f"update_{ix}",
-                target=partial(self._update_bars, ix, min_value, max_value),
-            )
-            th.start()
+        renderer = self._renderer
+        if renderer:
+            renderer.post(BarEvent(ix, min_value, max_value, text=start_text))
         try:
             yield
         finally:
-            self._run[ix] = False
-            if th:
-                th.join()
-            if bar:
-                with self._lock:
-                    bar.n = max_value
-                    bar.update(0)
-                    bar.set_postfix_str(done_text)
+            if renderer:
+                renderer.post(
+                    BarEvent(ix, min_value, max_value, text=done_text, done=True)
+                )
+
+    def _progress(self, ix: int) -> Optional[Progress]:
+        """
+        Returns a callback that advances a tool's progress bar as it checks files
+        """
+        if not self._renderer:
+            return None
+        post = self._renderer.post
+
+        def on_progress(done: int, total: int) -> None:
+            post(
+                BarEvent(ix, START_RUN_BAR_VALUE, DONE_BAR_VALUE, fraction=done / total)
+            )
+
+        return on_progress
+
+    @contextmanager
+    def _writing_output(self) -> Iterator[None]:
+        """
+        Runs a block that writes to the terminal, hiding any progress bars while it runs
+        """
+        with self._lock:
+            if self.show_bars:
+                with tqdm.external_write_mode():
+                    yield
+            else:
+                yield
 
     def _echo_slow_run(self) -> None:
         """
         Echoes a warning to the screen that Bento is taking longer than expected.
-
-        Wipes and resets any progress bars.
         """
-        before = time.monotonic()
-
-        while not self._done and time.monotonic() - before < SLOW_RUN_SECONDS:
-            time.sleep(BAR_UPDATE_INTERVAL)
-
-        if not self._done:
-            with self._lock:
-                if self.show_bars:
-                    wipe_line = "".ljust(bento.util.PRINT_WIDTH, " ")
-
-                    click.echo(
-                        "\x1b[0G", nl=False, err=True
-                    )  # Reset cursor to beginning of line
-                    click.echo("\x1b[s", nl=False, err=True)  # Save cursor state
-                    for _ in range(len(self._bars) - 1):
-                        click.echo(wipe_line, err=True)
-                    # Handling last line separately prevents screen roll
-                    click.echo(wipe_line, nl=False, err=True)
-                    click.echo("\x1b[u", nl=False, err=True)  # Retrieve cursor state
-
-                click.secho(
-                    bento.util.wrap(
-                        f"Bento is taking longer than expected, which may mean it’s checking build or dependency "
-                        f"code. This is often unintentional or unexpected.",
-                        extra=-4,
-                    )
-                    + "\n\n"
-                    + bento.util.wrap(
-                        "Please make sure all build and dependency "
-                        f"files are included in your `.bentoignore`, or try running Bento on specific files via `bento "
-                        f"check [PATH]`",
-                        extra=-4,
-                    ),
-                    err=True,
-                    fg=bento.util.Colors.WARNING,
-                    bold=False,
+        with self._writing_output():
+            click.secho(
+                bento.util.wrap(
+                    f"Bento is taking longer than expected, which may mean it’s checking build or dependency "
+                    f"code. This is often unintentional or unexpected.",
+                    extra=-4,
                 )
-                bento.util.echo_newline()
-        else:
-            logging.debug(f"Bento run completed in less than {SLOW_RUN_SECONDS} s.")
+                + "\n\n"
+                + bento.util.wrap(
+                    "Please make sure all build and dependency "
+                    f"files are included in your `.bentoignore`, or try running Bento on specific files via `bento "
+                    f"check [PATH]`",
+                    extra=-4,
+                ),
+                err=True,
+                fg=bento.util.Colors.WARNING,
+                bold=False,
+            )
+            bento.util.echo_newline()
 
     def _setup_tool(
-        self,
-        bar: Optional[tqdm],
-        ix: int,
-        tool: Tool,
-        max_bar_value: int,
-        end_text: str,
+        self, ix: int, tool: Tool, max_bar_value: int, end_text: str
     ) -> None:
         """
         Ensures that a tool is installed.
 
-        :param bar: Any associated progress bar
+        If this tool's setup was already started, waits for it to complete.
+
         :param ix: The bar index
         :param tool: The tool
         """
-        with self._updating_bar(
-            bar, ix, 0, max_bar_value, bento.util.SETUP_TEXT, end_text
-        ):
-            tool.setup()
-
-    def _run_single_tool(
-        self, bar: Optional[tqdm], ix: int, tool: Tool, baseline: Baseline
-    ) -> ToolResults:
+        with self._updating_bar(ix, 0, max_bar_value, bento.util.SETUP_TEXT, end_text):
+            started = self.setup.get(tool.tool_id())
+            if started:
+                started.result()
+            elif tool.engine:
+                tool.engine.setup()
+            else:
+                tool.setup()
+
+    def _run_single_tool(self, ix: int, tool: Tool, baseline: Baseline) -> ToolResults:
         """
         Returns results for running a previously installed tool.
 
-        :param bar: The progress bar associated with this tool
         :param ix: The current tool index
         :param tool: The tool itself
         :param paths: Paths to pass to the tool
@@ -215,15 +291,41 @@ class Runner:
         :return: Tool results
         """
         with self._updating_bar(
-            bar,
             ix,
             START_RUN_BAR_VALUE,
             DONE_BAR_VALUE,
             bento.util.PROGRESS_TEXT,
             bento.util.DONE_TEXT,
         ):
+            durations = tool.context.cache.durations
+            expected = durations.run_seconds(tool.tool_id())
+            # Longest-first; tools without history are assumed slow until measured
+            rank = (tool.priority(), math.inf if expected is None else expected)
+            with BUDGET.reserve(rank, tool.memory()):
+                before = time.time()
+                results = self._results(tool, baseline, self._progress(ix))
+                durations.record_run(tool.tool_id(), time.time() - before)
+
+        return results
+
+    def _results(
+        self, tool: Tool, baseline: Baseline, progress: Optional[Progress]
+    ) -> ToolResults:
+        """
+        Runs a tool and filters its results, in a worker process if this runner has any
+
+        Tools that share an engine always run in this process, where their engine is.
+        Progress is only reported for tools run in this process.
+        """
+        if self._pool and not tool.engine:
+            spec = ProcessRunSpec.for_tool(tool, self.paths, self.use_cache, baseline)
+            payload = self._pool.apply(_results_in_process, (spec,))
+            results = bento.result.from_payload(payload)
+        else:
             results = bento.result.filtered(
-                tool.tool_id(), tool.results(self.paths, self.use_cache), baseline
+                tool.tool_id(),
+                tool.results(self.paths, self.use_cache, progress),
+                baseline,
             )
 
         return results
@@ -240,21 +342,18 @@ class Runner:
         end_of_setup_text = (
             bento.util.DONE_TEXT if self.install_only else bento.util.PROGRESS_TEXT
         )
-        bar = self._bars[ix] if self.show_bars else None
 
         try:
             before = time.time()
             logging.debug(f"{tool.tool_id()} start")
 
             if not self.skip_setup:
-                self._setup_tool(
-                    bar, ix, tool, end_of_setup_bar_value, end_of_setup_text
-                )
+                self._setup_tool(ix, tool, end_of_setup_bar_value, end_of_setup_text)
             after_setup = time.time()
 
             results: ToolResults = []
             if not self.install_only:
-                results = self._run_single_tool(bar, ix, tool, baseline)
+                results = self._run_single_tool(ix, tool, baseline)
 
             after = time.time()
             logging.debug(
@@ -266,14 +365,93 @@ class Runner:
             logging.error(traceback.format_exc())
             return tool.tool_id(), e
 
+    def _setup_and_run_tools(
+        self, baseline: Baseline, indices_and_tools: List[Tuple[int, Tool]]
+    ) -> List[RunResults]:
+        """
+        Runs a group of tools (see bento.tool.engine.plan) one after another
+
+        Tools in a group share an engine, which analyzes each file once for all of them.
+        """
+        return [
+            self._setup_and_run_single_tool(baseline, index_and_tool)
+            for index_and_tool in indices_and_tools
+        ]
+
+    def _warning_if_slow(self, it: IMapIterator) -> Iterator[RunResults]:
+        """
+        Yields each group's results from a pool, warning if they take longer than
+        SLOW_RUN_SECONDS
+        """
+        deadline: Optional[float] = time.monotonic() + SLOW_RUN_SECONDS
+        while True:
+            try:
+                if deadline is None:
+                    yield from it.next()
+                else:
+                    yield from it.next(max(0.0, deadline - time.monotonic()))
+            except StopIteration:
+                break
+            except multiprocessing.TimeoutError:
+                self._echo_slow_run()
+                deadline = None
+        if deadline is not None:
+            logging.debug(f"Bento run completed in less than {SLOW_RUN_SECONDS} s.")
+
     def parallel_results(
-        self, tools: Iterable[Tool], baseline: Baseline, keep_bars: bool = True
+        self,
+        tools: Iterable[Tool],
+        baseline: Baseline,
+        keep_bars: bool = True,
+        on_result: Optional[Callable[[RunResults], None]] = None,
     ) -> Collection[RunResults]:
         """Runs all tools in parallel.
 
+        See `iter_results` for details.
+
+        Parameters:
+            tools: (iterable): Tools to run
+            baseline (set): The set of whitelisted finding hashes
+            keep_bars (bool): If true, progress bars are preserved after run (default True)
+            on_result (callable): If defined, called with each tool's `RunResult` as soon as that
+                                  tool completes; any progress bars are hidden while it runs
+
+        Returns:
+            (collection): For each tool, in order, a `RunResult`, which is a tuple of (`tool_id`, `findings`)
+        """
+        tools = list(tools)
+        order = {tool.tool_id(): ix for ix, tool in enumerate(tools)}
+        all_results = []
+        for result in self.iter_results(tools, baseline, keep_bars):
+            if on_result:
+                with self._writing_output():
+                    on_result(result)
+            all_results.append(result)
+
+        return sorted(all_results, key=lambda r: order[r[0]])
+
+    def iter_results(
+        self, tools: Iterable[Tool], baseline: Baseline, keep_bars: bool = True
+    ) -> Iterator[RunResults]:
+        """Runs all tools in parallel, yielding each tool's results as soon as it completes.
+
         Each tool is optionally run against a list of files. For each tool, it's results are
         filtered to those results not appearing in the whitelist.
 
+        Tools are run as CPU slots and memory (see `runner.concurrency` and
+        `runner.memory_budget`) become available, highest priority, then longest
+        expected run time, first.
+
+        If this runner has jobs, each tool's run, parse, and filter steps execute in a pool
+        of that many worker processes (or in this runner's pool, if it was given one, which
+        is left running); tool setup always runs in this process. Unless sized_budget is
+        true (i.e. the caller sized it for several runners), the resource budget is sized
+        for this run's tools.
+
+        Unless `runner.share_engines` is false, tools that are front ends to the same
+        analysis program (e.g. flake8 and its plugins) share a single run of it (see
+        bento.tool.engine); runs that skip setup only share installed engines.
+
         A progress bar is emitted to stderr for each tool.
 
         Parameters:
@@ -282,7 +460,8 @@ class Runner:
             keep_bars (bool): If true, progress bars are preserved after run (default True)
 
         Returns:
-            (collection): For each tool, a `RunResult`, which is a tuple of (`tool_id`, `findings`)
+            (iterator): For each tool, in completion order, a `RunResult`, which is a tuple of
+                        (`tool_id`, `findings`)
         """
         indices_and_tools = list(enumerate(tools))
         n_tools = len(indices_and_tools)
@@ -290,32 +469,55 @@ class Runner:
         if n_tools == 0:
             raise NoToolsConfiguredException()
 
-        if self.show_bars:
-            self._setup_bars(indices_and_tools)
-        self._run = [True for _, _ in indices_and_tools]
-        self._done = False
-
-        slow_run_thread = threading.Thread(
-            name="slow_run_timer", target=self._echo_slow_run
-        )
-        slow_run_thread.start()
+        # Files may have changed since any previous run (e.g. due to git stashing)
+        caches = {id(t.context.cache): t.context.cache for _, t in indices_and_tools}
+        for cache in caches.values():
+            cache.refresh()
 
-        with ThreadPool(n_tools) as pool:
-            # using partial to pass in multiple arguments to __tool_filter
-            func = partial(Runner._setup_and_run_single_tool, self, baseline)
-            all_results = pool.map(func, indices_and_tools)
+        context = indices_and_tools[0][1].context
+        if not self.sized_budget:
+            size_budget(context, n_tools)
+        groups = [[t] for _, t in indices_and_tools]
+        if context.runner_share_engines:
+            groups = plan((t for _, t in indices_and_tools), self.skip_setup)
+        index = {t.tool_id(): ix for ix, t in indices_and_tools}
+        indexed_groups = [[(index[t.tool_id()], t) for t in g] for g in groups]
 
-        self._done = True
-        slow_run_thread.join()
+        if self.jobs > 0 and not self.install_only:
+            self._pool = self.pool or worker_pool(min(self.jobs, n_tools))
 
         if self.show_bars:
-            if keep_bars:
-                for _ in self._bars:
-                    click.echo("", err=True)
-            for b in self._bars:
-                b.close()
-            if keep_bars:
-                # Progress bars terminate on whitespace
-                bento.util.echo_newline()
-
-        return all_results
+            self._setup_bars(indices_and_tools)
+            self._renderer = ProgressRenderer(self._bars, self._lock)
+            self._renderer.start()
+
+        try:
+            with ThreadPool(len(indexed_groups)) as pool:
+                # using partial to pass in multiple arguments to __tool_filter
+                func = partial(Runner._setup_and_run_tools, self, baseline)
+                yield from self._warning_if_slow(
+                    pool.imap_unordered(func, indexed_groups)
+                )
+        finally:
+            if self._renderer:
+                self._renderer.stop()
+                self._renderer = None
+
+            if self._pool:
+                if self._pool is not self.pool:
+                    self._pool.close()
+                    self._pool.join()
+                self._pool = None
+
+            for cache in caches.values():
+                cache.save()
+
+            if self.show_bars:
+                if keep_bars:
+                    for _ in self._bars:
+                        click.echo("", err=True)
+                for b in self._bars:
+                    b.close()
+                if keep_bars:
+                    # Progress bars terminate on whitespace
+                    bento.util.echo_newline()
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import attr
+
+from bento.fignore import FileIgnore, Parser
+from bento.violation import Violation
+
+POLL_INTERVAL_SECONDS = 0.2
+
+MAX_POLL_INTERVAL_SECONDS = 2.0
+"""While the tree is idle, the poll interval doubles up to this"""
+
+DEBOUNCE_SECONDS = 0.1
+"""Changes are reported once the tree has been quiet for this long"""
+
+FileState = Tuple[int, int, int]
+"""A file's (inode, size, mtime_ns)"""
+
+
+@attr.s
+class FileWatcher:
+    """
+    Detects changes to files that survive the project's ignore rules
+
+    Changes are found by comparing stat snapshots of the watched tree, so no
+    platform-specific notification mechanism is needed. As in `bento check`'s walk,
+    directories are only listed (and their entries matched against the ignore
+    patterns) again when their mtimes change; files are only stat-ed. Polls slow
+    down while nothing changes.
+
+    :param base_path: The project root
+    :param ignore_file_path: The project's .bentoignore
+    :param target_paths: Files and directories to watch
+    :param index_path: Where `bento check` persists its directory listings, which
+                       the first poll reuses (the watcher never writes it)
+    """
+
+    base_path = attr.ib(type=Path)
+    ignore_file_path = attr.ib(type=Path)
+    target_paths = attr.ib(type=List[Path])
+    index_path = attr.ib(type=Path)
+    _ignore_state: Optional[FileState] = attr.ib(default=None, init=False)
+    _ignore = attr.ib(type=FileIgnore, init=False)
+    _states = attr.ib(type=Dict[Path, FileState], init=False)
+
+    @_ignore.default
+    def _init_ignore(self) -> FileIgnore:
+        return self._load_ignore()
+
+    @_states.default
+    def _init_states(self) -> Dict[Path, FileState]:
+        return self._snapshot()
+
+    def _load_ignore(self) -> FileIgnore:
+        self._ignore_state = _file_state(self.ignore_file_path)
+        with self.ignore_file_path.open() as ignore_lines:
+            patterns = Parser(self.base_path, self.ignore_file_path).parse(ignore_lines)
+        # No targets: the walk is done here, as the tree changes
+        return FileIgnore(
+            base_path=self.base_path,
+            patterns=patterns,
+            target_paths=[],
+            index_path=self.index_path,
+        )
+
+    def _snapshot(self) -> Dict[Path, FileState]:
+        states: Dict[Path, FileState] = {}
+        for path, survives in self._ignore.walk(self.target_paths).items():
+            if survives:
+                state = _file_state(Path(path))
+                if state:
+                    states[Path(path)] = state
+        return states
+
+    @property
+    def files(self) -> List[Path]:
+        """
+        All watched files, as of the last poll
+        """
+        return sorted(self._states)
+
+    def poll(self) -> Set[Path]:
+        """
+        Returns every file created, modified, or removed since the last poll
+        """
+        if _file_state(self.ignore_file_path) != self._ignore_state:
+            self._ignore = self._load_ignore()
+        states = self._snapshot()
+        changed = {
+            path
+            for path in set(states) | set(self._states)
+            if states.get(path) != self._states.get(path)
+        }
+        self._states = states
+        return changed
+
+    def wait(self, stop: Optional[threading.Event] = None) -> Set[Path]:
+        """
+        Waits for files to change, then returns all files changed until the tree is
+        quiet again
+
+        :param stop: If set while waiting, returns immediately
+        """
+        changed: Set[Path] = set()
+        interval = POLL_INTERVAL_SECONDS
+        while not (stop and stop.is_set()):
+            latest = self.poll()
+            if latest:
+                changed |= latest
+                time.sleep(DEBOUNCE_SECONDS)
+            elif changed:
+                break
+            else:
+                if stop:
+                    stop.wait(interval)
+                else:
+                    time.sleep(interval)
+                interval = min(2 * interval, MAX_POLL_INTERVAL_SECONDS)
+        return changed
+
+
+def _file_state(path: Path) -> Optional[FileState]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+@attr.s
+class FindingIndex:
+    """
+    The current findings of each tool, by file
+
+    :param base_path: The path that finding paths are relative to
+    """
+
+    base_path = attr.ib(type=Path)
+    _findings = attr.ib(
+        type=Dict[str, Dict[Path, Dict[str, Violation]]], factory=dict, init=False
+    )
+
+    def __len__(self) -> int:
+        return sum(
+            len(by_id)
+            for by_path in self._findings.values()
+            for by_id in by_path.values()
+        )
+
+    def update(
+        self, tool_id: str, checked: Iterable[Path], findings: Iterable[Violation]
+    ) -> Tuple[List[Violation], List[Violation]]:
+        """
+        Replaces a tool's findings in the checked files
+
+        Findings in files that were not checked are left as they are.
+
+        :return: The findings that were added, and the findings that were removed
+        """
+        by_path = self._findings.setdefault(tool_id, {})
+        updated: Dict[Path, Dict[str, Violation]] = {p: {} for p in checked}
+        for v in findings:
+            path = Path(os.path.normpath(self.base_path / v.path))
+            updated.setdefault(path, {})[v.syntactic_identifier_str()] = v
+
+        added: List[Violation] = []
+        removed: List[Violation] = []
+        for path, current in updated.items():
+            previous = by_path.pop(path, {})
+            added += [v for h, v in current.items() if h not in previous]
+            removed += [v for h, v in previous.items() if h not in current]
+            if current:
+                by_path[path] = current
+        return added, removed
+
+    def forget(self, paths: Iterable[Path]) -> int:
+        """
+        Drops all findings in paths
+
+        :return: The number of findings dropped
+        """
+        dropped = 0
+        for by_path in self._findings.values():
+            for p in paths:
+                dropped += len(by_path.pop(p, {}))
+        return dropped
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmarks finding files by walking directories against listing them from git
+
+Usage:
+
+    poetry run python scripts/bench_file_source.py PATH [--repeat N]
+
+PATH must be inside a git repository. PATH's .bentoignore is used if it exists,
+otherwise Bento's default ignore file.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+
+import bento.git
+from bento.fignore import FileIgnore
+
+sys.path.insert(0, str(Path(__file__).parent))
+from bench_walk import load_patterns  # noqa: E402 isort:skip
+
+
+def find(base_path: Path, patterns: Set[str], listed: Optional[List[str]]) -> int:
+    fi = FileIgnore(base_path, patterns, [base_path], listed_files=listed)
+    return sum(1 for e in fi.entries() if e.survives)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base_path = args.path.resolve()
+    patterns = load_patterns(base_path)
+    if bento.git.repo(base_path) is None:
+        sys.exit(f"{base_path} is not in a git repository")
+
+    sources: List[Callable[[], Optional[List[str]]]] = [
+        lambda: None,
+        lambda: bento.git.list_files([base_path], path=base_path),
+        lambda: bento.git.list_files([base_path], untracked=True, path=base_path),
+    ]
+    names = ["walk", "git", "git + untracked"]
+
+    print(f"{'source':>16}  {'files':>8}  {'median s':>8}")
+    for name, source in zip(names, sources):
+        times = []
+        for _ in range(args.repeat):
+            before = time.perf_counter()
+            n_files = find(base_path, patterns, source())
+            times.append(time.perf_counter() - before)
+        print(f"{name:>16}  {n_files:>8}  {statistics.median(times):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmarks CLI startup, and the git queries every command makes, with and without
+GitPython
+
+Usage:
+
+    poetry run python scripts/bench_startup.py PATH [--repeat N]
+
+PATH must be inside a git repository. Each measurement runs in a fresh interpreter,
+as a command does. Git queries locate the repository and read its remote URL and
+HEAD commit (as Context construction and metrics reporting do); they are timed,
+including imports, after the bento package itself is imported.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+GITPYTHON = """
+import git
+r = git.Repo(PATH, search_parent_directories=True)
+r.working_tree_dir
+r.remotes.origin.url if any(rr.name == "origin" for rr in r.remotes) else None
+try:
+    str(r.head.commit)
+except ValueError:
+    pass
+"""
+
+FACADE = """
+import bento.git
+bento.git.repo(PATH).working_tree_dir
+bento.git.url(PATH)
+bento.git.commit(PATH)
+"""
+
+
+def timed(queries: str, path: Path) -> str:
+    """
+    Returns a script that prints how long queries take, once bento is imported
+    """
+    return (
+        "import time, bento\n"
+        f"PATH = {str(path)!r}\n"
+        "before = time.perf_counter()\n"
+        f"{queries}\n"
+        "print(time.perf_counter() - before)\n"
+    )
+
+
+def median_seconds(cmd: List[str], cwd: Path, repeat: int, reported: bool) -> float:
+    """
+    :param reported: Whether to use the time that cmd prints, rather than its
+                     wall time
+    """
+    times = []
+    for _ in range(repeat):
+        before = time.perf_counter()
+        out = subprocess.run(
+            cmd, cwd=cwd, check=True, stdout=subprocess.PIPE, encoding="utf-8"
+        ).stdout
+        elapsed = time.perf_counter() - before
+        times.append(float(out.splitlines()[-1]) if reported else elapsed)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    base_path = args.path.resolve()
+    python = sys.executable
+    scenarios = [
+        ("interpreter", [python, "-c", "pass"], False),
+        ("bento --version", [python, "-m", "bento", "--version"], False),
+        ("GitPython queries", [python, "-c", timed(GITPYTHON, base_path)], True),
+        ("bento.git queries", [python, "-c", timed(FACADE, base_path)], True),
+    ]
+
+    print(f"{'scenario':>18}  {'median s':>8}")
+    for name, cmd, reported in scenarios:
+        median = median_seconds(cmd, base_path, args.repeat, reported)
+        print(f"{name:>18}  {median:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
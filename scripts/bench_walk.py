@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmarks FileIgnore's directory walk at several thread counts
+
+Usage:
+
+    poetry run python scripts/bench_walk.py PATH [--threads 1,2,4,8] [--latency-ms N]
+        [--index]
+
+PATH's .bentoignore is used if it exists, otherwise Bento's default ignore file.
+--latency-ms adds a delay to every directory listing, to approximate a network
+filesystem. --index persists a directory index in a temporary directory, and times
+only walks that reuse it (after a first, untimed walk writes it).
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Set
+
+import bento.fignore
+from bento.fignore import FileIgnore, Parser
+
+DEFAULT_IGNORE = Path(bento.fignore.__file__).parent / "configs" / ".bentoignore"
+
+
+def load_patterns(base_path: Path) -> Set[str]:
+    ignore_path = base_path / ".bentoignore"
+    if not ignore_path.exists():
+        ignore_path = DEFAULT_IGNORE
+    with ignore_path.open() as lines:
+        try:
+            return Parser(base_path, ignore_path).parse(lines)
+        except OSError:
+            # e.g. an :include of a file the benchmarked tree doesn't have
+            return set()
+
+
+def add_latency(seconds: float) -> None:
+    scandir: Callable[..., Any] = os.scandir
+
+    def slow_scandir(path: str) -> Iterator[os.DirEntry]:
+        time.sleep(seconds)
+        return scandir(path)
+
+    bento.fignore.os.scandir = slow_scandir  # type: ignore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--threads", default="1,2,4,8,16")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--index", action="store_true")
+    args = parser.parse_args()
+
+    base_path = args.path.resolve()
+    patterns = load_patterns(base_path)
+    if args.latency_ms:
+        add_latency(args.latency_ms / 1000)
+
+    index_dir = tempfile.TemporaryDirectory()
+    print(f"{'threads':>7}  {'entries':>8}  {'median s':>8}  {'speedup':>7}")
+    baseline = None
+    for threads in (int(t) for t in args.threads.split(",")):
+        times: List[float] = []
+        index_path = Path(index_dir.name) / f"{threads}.json" if args.index else None
+        if index_path:
+            FileIgnore(base_path, patterns, [base_path], index_path=index_path)
+        for _ in range(args.repeat):
+            before = time.perf_counter()
+            fi = FileIgnore(
+                base_path, patterns, [base_path], threads=threads, index_path=index_path
+            )
+            times.append(time.perf_counter() - before)
+        median = statistics.median(times)
+        baseline = baseline or median
+        print(f"{threads:>7}  {len(fi):>8}  {median:>8.3f}  {baseline / median:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 # !/usr/bin/env python3
 import sys
 
-import git
+import git  # type: ignore  # GitPython has no type stubs
 
 
 def get_current_commit() -> str:
@@ -1,4 +1,4 @@
-from typing import Any, Iterable, Optional
+from typing import Any, ContextManager, Iterable, Optional, TextIO
 
 class tqdm:
     def __init__(
@@ -7,7 +7,7 @@ class tqdm:
         desc: Optional[str]=None,
         total: Optional[float]=None,
         leave: bool =True,
-        file: Optional[str]=None,
+        file: Optional[TextIO]=None,
         ncols: Optional[int]=None,
         mininterval: float=0.1,
         maxinterval: float=10.0,
@@ -28,4 +28,9 @@ class tqdm:
         ...
     def update(self, n: int = 1) -> None: ...
     def close(self) -> None: ...
+    def refresh(self) -> None: ...
     def set_postfix_str(self, text: str) -> None: ...
+    @classmethod
+    def external_write_mode(
+        cls, file: Optional[TextIO] = None, nolock: bool = False
+    ) -> ContextManager[None]: ...
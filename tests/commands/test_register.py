@@ -12,7 +12,7 @@ import pytest
 from _pytest.capture import CaptureFixture
 from _pytest.monkeypatch import MonkeyPatch
 from bento.cli import cli
-from bento.commands.register import Registrar
+from bento.commands.register import Registrar, needs_prompt
 from bento.constants import QA_TEST_EMAIL_ADDRESS, TERMS_OF_SERVICE_VERSION
 from bento.context import Context
 from bento.error import NonInteractiveTerminalException
@@ -218,3 +218,21 @@ continue. Please reach out to us at support@r2c.dev with questions or concerns."
     output = capsys.readouterr()
     assert expectation in output.err
     assert not output.out
+
+
+def test_needs_prompt(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.delenv("BENTO_EMAIL", raising=False)
+    with tmp_config(tmp_path):
+        assert needs_prompt(False, None)
+        assert needs_prompt(True, None)
+        assert needs_prompt(True, "not an email")
+        assert not needs_prompt(True, QA_TEST_EMAIL_ADDRESS)
+        assert needs_prompt(False, QA_TEST_EMAIL_ADDRESS)
+
+        persist_global_config(
+            {
+                "email": QA_TEST_EMAIL_ADDRESS,
+                "terms_of_service": TERMS_OF_SERVICE_VERSION,
+            }
+        )
+        assert not needs_prompt(False, None)
@@ -1,7 +1,15 @@
+import json
 import os
 from pathlib import Path
 
-from bento.extra.flake8 import Flake8Parser, Flake8Tool
+from bento.base_context import BaseContext
+from bento.extra.boto3 import Boto3Tool
+from bento.extra.click import ClickTool
+from bento.extra.dlint import DlintTool
+from bento.extra.flake8 import Flake8Engine, Flake8Parser, Flake8Tool
+from bento.extra.flask import FlaskTool
+from bento.extra.requests import RequestsTool
+from bento.tool.engine import plan
 from bento.violation import Violation
 from tests.test_tool import context_for
 
@@ -82,3 +90,43 @@ def test_file_match(tmp_path: Path) -> None:
     assert f.match("py") is None
     assert f.match("foo.py") is not None
     assert f.match("foo.pyi") is None
+
+
+def test_engine(tmp_path: Path) -> None:
+    tool_types = [Flake8Tool, Boto3Tool, ClickTool, DlintTool, FlaskTool, RequestsTool]
+    context = BaseContext(
+        base_path=SIMPLE_INTEGRATION_PATH,
+        config={"tools": {t.TOOL_ID: {} for t in tool_types}},
+        cache_path=tmp_path / "cache",
+        resource_path=tmp_path / "resource",
+    )
+
+    ((flake8, boto3, click, dlint, flask, requests),) = plan(
+        t(context) for t in tool_types
+    )
+    engine = flake8.engine
+    assert isinstance(engine, Flake8Engine)
+    assert engine._flake8.select_clause() == (
+        "--select=B,C90,DUO138,E113,E74,E9,EXE,F,T100,W6,"
+        "r2c-boto3-,r2c-click,r2c-flask-,r2c-requests-"
+    )
+
+    records = {
+        "foo.py": [
+            {"code": code, "filename": "foo.py"}
+            for code in ["F401", "DUO138", "r2c-flask-secure-set-cookie"]
+        ]
+    }
+    codes = {
+        t.tool_id(): [
+            r["code"] for r in json.loads(engine.member_output(t, records))["foo.py"]
+        ]
+        for t in (flake8, boto3, dlint, flask, requests)
+    }
+    assert codes == {
+        "flake8": ["F401"],
+        "r2c.boto3": [],
+        "dlint": ["DUO138"],
+        "r2c.flask": ["r2c-flask-secure-set-cookie"],
+        "r2c.requests": [],
+    }
@@ -36,3 +36,10 @@ def test_file_selection(tmp_path: Path) -> None:
     tool.setup()
     violations = tool.results([base_path / "ok.go"])
     assert violations == []
+
+
+def test_scans_target_packages(tmp_path: Path) -> None:
+    base_path = BASE_PATH / "tests" / "integration" / "go"
+    tool = GosecTool(context_for(tmp_path, GosecTool.tool_id(), base_path))
+    command = tool.assemble_full_command(["bad.go", "pkg/a.go", "pkg/b.go"])
+    assert command == [*tool.docker_command, ".", "./pkg"]
@@ -2,9 +2,17 @@ import os
 import shutil
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator, cast
+from typing import Any, Dict, Iterable, Iterator, List, cast
 
+import attr
+import yaml
+
+import bento.network
+from bento.extra.base_sgrep import SgrepEngine, SharedSgrep
+from bento.extra.r2c_check_registry import R2cCheckRegistryTool
 from bento.extra.sgrep import SgrepTool
+from bento.tool import JsonR
+from bento.tool.engine import plan
 from bento.violation import Violation
 from tests.test_tool import context_for
 
@@ -158,3 +166,74 @@ def test_cache_invalidation(tmp_path: Path) -> None:
 
         violations = set(tool.results([SGREP_PATH / "flask_configs.py"]))
         assert len(violations) == 0
+
+
+def test_engine(tmp_path: Path, monkeypatch: Any) -> None:
+    context = context_for(tmp_path, SgrepTool.tool_id(), SGREP_PATH)
+    context.config["tools"][R2cCheckRegistryTool.tool_id()] = {}
+    sgrep, registry = SgrepTool(context), R2cCheckRegistryTool(context)
+    shutil.copy(SGREP_PATH / ".bento" / "sgrep.yml", context.resource_path)
+    monkeypatch.setattr(
+        R2cCheckRegistryTool, "rules", lambda self: [{"id": "registry-rule"}]
+    )
+
+    [group] = plan([sgrep, registry])
+    engine = cast(SgrepEngine, group[0].engine)
+    assert engine.write_config() == 14
+
+    config = yaml.safe_load((context.resource_path / "sgrep-shared.yml").read_text())
+    ids = [r["id"] for r in config["rules"]]
+    assert ids[0] == "sgrep/avoid_hardcoded_config_TESTING"
+    assert ids[-1] == "r2c.registry.latest/registry-rule"
+
+    # The shared configuration is in .bento, so sgrep prefixes its IDs with "bento."
+    def run(self: SharedSgrep, files: Iterable[str]) -> JsonR:
+        return [
+            {"check_id": f"bento.{i}", "path": "flask_configs.py"}
+            for i in ("sgrep/avoid_hardcoded_config_ENV", "r2c.registry.latest/x")
+        ]
+
+    monkeypatch.setattr(SharedSgrep, "run", run)
+    path = str(SGREP_PATH / "flask_configs.py")
+    assert [r["check_id"] for r in engine.output(group[0], [path])] == [
+        "bento.avoid_hardcoded_config_ENV"
+    ]
+    assert [r["check_id"] for r in engine.output(group[1], [path])] == ["x"]
+
+    monkeypatch.setattr(SharedSgrep, "image_pulled", lambda self: False)
+    assert not engine.installed()
+
+
+@attr.s(auto_attribs=True)
+class FakeResponse:
+    status_code: int
+    text: str = ""
+    headers: Dict[str, str] = attr.ib(factory=dict)
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+def test_fetch_rules(tmp_path: Path, monkeypatch: Any) -> None:
+    context = context_for(tmp_path, R2cCheckRegistryTool.tool_id(), SGREP_PATH)
+    registry = R2cCheckRegistryTool(context)
+    sent: List[Dict[str, str]] = []
+    responses = [
+        FakeResponse(200, "rules: [{id: a}]", {"ETag": '"v1"'}),
+        FakeResponse(304),
+        FakeResponse(200, "rules: [{id: b}]", {"ETag": '"v2"'}),
+    ]
+
+    def get(url: str, headers: Dict[str, str]) -> FakeResponse:
+        assert url == registry.config_str
+        sent.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(bento.network, "no_auth_get", get)
+
+    assert registry.rules() == [{"id": "a"}]
+    # The cached rules are reused while the server reports the same version
+    assert registry.rules() == [{"id": "a"}]
+    assert sent[1]["If-None-Match"] == '"v1"'
+    assert registry.rules() == [{"id": "b"}]
+    assert sent[2]["If-None-Match"] == '"v1"'
@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 
-from bento.extra.shellcheck import ShellcheckTool
+from bento.extra.shellcheck import ShellcheckParser, ShellcheckTool
 from bento.violation import Violation
 from tests.test_tool import context_for
 
@@ -98,3 +98,24 @@ def test_run(tmp_path: Path) -> None:
             link="https://github.com/koalaman/shellcheck/wiki/SC1083",
         ),
     }
+
+
+def test_parse_snapshot(tmp_path: Path) -> None:
+    snapshot = tmp_path / ".bento" / "snapshot" / "check"
+    snapshot.mkdir(parents=True)
+    (snapshot / "s.sh").write_text("#!/bin/sh\necho $@\n")
+    (tmp_path / "s.sh").write_text("#!/bin/sh\n# unstaged\necho $@\n")
+    result = {
+        "file": ".bento/snapshot/check/s.sh",
+        "line": 2,
+        "column": 6,
+        "level": "error",
+        "code": 2068,
+        "message": "Double quote array expansions to avoid re-splitting elements.",
+    }
+
+    [violation] = ShellcheckParser(tmp_path).parse([result])
+
+    # Reported at the working-tree path, with source from the staged snapshot
+    assert violation.path == "s.sh"
+    assert violation.syntactic_context == "echo $@\n"
@@ -0,0 +1,112 @@
+import io
+import os
+import threading
+import time
+from pathlib import Path
+
+import click
+from _pytest.monkeypatch import MonkeyPatch
+from bento.daemon import Daemon, _request_environment, stop_daemon
+from bento.daemon_client import request_for, run_in_daemon
+
+
+@click.group()
+def fake_cli() -> None:
+    pass
+
+
+@fake_cli.command()
+@click.option("--pager/--no-pager", default=True)
+@click.option("--tag", default="none")
+@click.argument("code", type=int)
+def check(pager: bool, tag: str, code: int) -> None:
+    click.echo(f"cwd={os.getcwd()} pager={pager} tag={tag}")
+    click.echo("problems", err=True)
+    raise SystemExit(code)
+
+
+def test_request_for(monkeypatch: MonkeyPatch) -> None:
+    cwd = Path("/repo")
+    monkeypatch.setenv("GIT_INDEX_FILE", "/repo/.git/index.lock")
+
+    request = request_for(["--email", "check", "check", "--all"], cwd)
+    assert request is not None
+    assert request["args"] == ["--email", "check", "check", "--no-pager", "--all"]
+    assert request["env"]["GIT_INDEX_FILE"] == "/repo/.git/index.lock"
+
+    assert request_for(["init"], cwd) is None
+    assert request_for(["check", "--help"], cwd) is None
+    assert request_for(["--agree"], cwd) is None
+
+
+def test_no_daemon(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    assert run_in_daemon(["check"]) is None
+
+    # A socket left behind by a dead daemon
+    (tmp_path / ".bento").mkdir()
+    (tmp_path / ".bento" / "daemon.sock").touch()
+    assert run_in_daemon(["check"]) is None
+
+
+def test_daemon_runs_commands(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    tmp_path = tmp_path.resolve()
+    subdir = tmp_path / "sub"
+    subdir.mkdir()
+    server = Daemon(base_path=tmp_path, cli=fake_cli)
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    try:
+        while not server.socket_path.exists():
+            time.sleep(0.01)
+        monkeypatch.chdir(subdir)
+        monkeypatch.setenv("BENTO_CHECK_TAG", "forwarded")
+
+        for code in [0, 2]:
+            stdout = io.StringIO()
+            stderr = io.StringIO()
+            assert run_in_daemon(["check", str(code)], stdout, stderr) == code
+            assert stdout.getvalue() == f"cwd={subdir} pager=False tag=forwarded\n"
+            assert stderr.getvalue() == "problems\n"
+    finally:
+        assert stop_daemon(tmp_path)
+        thread.join()
+
+    assert not server.socket_path.exists()
+    assert not stop_daemon(tmp_path)
+
+
+def test_request_environment(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("BENTO_DAEMON_ONLY", "daemon")
+    monkeypatch.setenv("BENTO_BOTH", "daemon")
+    monkeypatch.setenv("UNFORWARDED", "daemon")
+
+    with _request_environment(str(tmp_path), {"BENTO_BOTH": "client"}):
+        assert os.getcwd() == str(tmp_path)
+        assert "BENTO_DAEMON_ONLY" not in os.environ
+        assert os.environ["BENTO_BOTH"] == "client"
+        assert os.environ["UNFORWARDED"] == "daemon"
+
+    assert os.environ["BENTO_DAEMON_ONLY"] == "daemon"
+    assert os.environ["BENTO_BOTH"] == "daemon"
+
+
+def test_daemon_leaves_prompts_to_client(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    tmp_path = tmp_path.resolve()
+    server = Daemon(base_path=tmp_path, cli=fake_cli, needs_prompt=lambda params: True)
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    try:
+        while not server.socket_path.exists():
+            time.sleep(0.01)
+        monkeypatch.chdir(tmp_path)
+
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        assert run_in_daemon(["check", "0"], stdout, stderr) is None
+        assert stdout.getvalue() == stderr.getvalue() == ""
+    finally:
+        assert stop_daemon(tmp_path)
+        thread.join()
@@ -1,10 +1,10 @@
+import subprocess
 import tempfile
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterator
 
 import yaml
-from git import Repo
 
 import pytest
 from bento.commands import ci as uut
@@ -15,11 +15,7 @@ from bento.context import Context
 class Paths:
     """Helper class for easily finding paths of interest in the passed repo."""
 
-    repo: Repo
-
-    @property
-    def repo_path(self) -> Path:
-        return Path(self.repo.working_dir)
+    repo_path: Path
 
     @property
     def workflows_path(self) -> Path:
@@ -36,11 +32,13 @@ def _bento_step(workflow: Dict[str, Any]) -> Dict[str, Any]:
     )
 
 
-@pytest.fixture  # type: ignore
+@pytest.fixture
 def paths() -> Iterator[Paths]:
     with tempfile.TemporaryDirectory() as repo_dir:
-        repo = Repo.init(repo_dir, bare=True)
-        yield Paths(repo)
+        subprocess.run(
+            ["git", "init", "--bare", repo_dir], check=True, stdout=subprocess.DEVNULL
+        )
+        yield Paths(Path(repo_dir))
 
 
 @pytest.mark.parametrize(  # type: ignore
@@ -70,7 +68,9 @@ def test_is_ci_configured__no_github_dir(paths: Paths) -> None:
 def test_is_ci_provider_supported(
     paths: Paths, origin_url: str, expected: bool
 ) -> None:
-    paths.repo.create_remote("origin", origin_url)
+    subprocess.run(
+        ["git", "remote", "add", "origin", origin_url], cwd=paths.repo_path, check=True
+    )
     assert uut.is_ci_provider_supported(paths.repo_path) is expected
 
 
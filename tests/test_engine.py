@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Type
+
+import bento.tool_runner
+from bento.base_context import BaseContext
+from bento.tool import Tool
+from bento.tool.engine import Engine, plan
+from tests.test_tool_runner import LineParserFixture, LineToolFixture
+
+
+class EngineFixture(Engine[str]):
+    """Reports every line of every file; each member owns lines that start with its ID"""
+
+    runs: List[List[str]] = []
+    is_installed = True
+
+    @classmethod
+    def groups(cls, tools: List[Tool]) -> List[List[Tool]]:
+        return [tools]
+
+    def installed(self) -> bool:
+        return self.is_installed
+
+    def _setup(self) -> None:
+        pass
+
+    def run(self, paths: List[str]) -> Mapping[str, Any]:
+        EngineFixture.runs.append(sorted(paths))
+        return {p: Path(p).read_text().splitlines() for p in paths}
+
+    def member_output(self, tool: Tool[str], records: Mapping[str, Any]) -> str:
+        return "".join(
+            f"{path}\t{line}\n"
+            for path, lines in records.items()
+            for line in lines
+            if line.startswith(tool.tool_id())
+        )
+
+
+class EngineToolFixture(LineToolFixture):
+    TOOL_ID = ""
+
+    def __init__(self, context: BaseContext) -> None:
+        Tool.__init__(self, context)
+
+    @classmethod
+    def tool_id(cls) -> str:
+        return cls.TOOL_ID
+
+    @property
+    def parser_type(self) -> Type[LineParserFixture]:
+        return LineParserFixture
+
+    def engine_type(self) -> Optional[Type[Engine]]:
+        return EngineFixture
+
+
+class AToolFixture(EngineToolFixture):
+    TOOL_ID = "a"
+
+
+class BToolFixture(EngineToolFixture):
+    TOOL_ID = "b"
+
+
+def _context(tmp_path: Path, share_engines: bool = True) -> BaseContext:
+    config: Dict[str, Any] = {
+        "tools": {"a": {}, "b": {}},
+        "runner": {"share_engines": share_engines},
+    }
+    return BaseContext(
+        base_path=tmp_path,
+        config=config,
+        cache_path=tmp_path / "cache",
+        resource_path=tmp_path / "resource",
+    )
+
+
+def _contexts(results: Any) -> Dict[str, List[str]]:
+    return {
+        tool_id: sorted(v.syntactic_context for v in findings)
+        for tool_id, findings in results
+    }
+
+
+def test_plan(tmp_path: Path) -> None:
+    context = _context(tmp_path)
+    a, b, other = (
+        AToolFixture(context),
+        BToolFixture(context),
+        LineToolFixture(tmp_path),
+    )
+
+    groups = plan([a, other, b])
+
+    assert [[t.tool_id() for t in g] for g in groups] == [["a", "b"], ["test"]]
+    assert groups[0][0].engine is groups[0][1].engine is not None
+    assert groups[1] == [other] and a.engine is None
+
+    EngineFixture.is_installed = False
+    try:
+        assert plan([a, b], installed_only=True) == [[a], [b]]
+    finally:
+        EngineFixture.is_installed = True
+
+
+def test_shared_engine_runs_once(tmp_path: Path) -> None:
+    (tmp_path / "x.py").write_text("a1\nb1\nc1\n")
+    (tmp_path / "y.py").write_text("b2\n")
+    paths = [tmp_path / "x.py", tmp_path / "y.py"]
+    EngineFixture.runs.clear()
+
+    context = _context(tmp_path)
+    tools = [AToolFixture(context), BToolFixture(context)]
+    runner = bento.tool_runner.Runner(paths=paths, use_cache=False, show_bars=False)
+    results = runner.parallel_results(tools, {})
+
+    assert _contexts(results) == {"a": ["a1"], "b": ["b1", "b2"]}
+    assert EngineFixture.runs == [[str(p) for p in paths]]
+
+    EngineFixture.runs.clear()
+    context = _context(tmp_path, share_engines=False)
+    tools = [AToolFixture(context), BToolFixture(context)]
+    runner = bento.tool_runner.Runner(paths=paths, use_cache=False, show_bars=False)
+    # Without a shared engine, each tool runs itself, reporting every line
+    assert _contexts(runner.parallel_results(tools, {})) == {
+        "a": ["a1", "b1", "b2", "c1"],
+        "b": ["a1", "b1", "b2", "c1"],
+    }
+    assert EngineFixture.runs == []
@@ -1,11 +1,12 @@
+import fnmatch
 import io
 import os
 from pathlib import Path
-from typing import Collection, Set
+from typing import Any, Collection, Set
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
-from bento.fignore import FileIgnore, Parser, Processor, open_ignores
+from bento.fignore import FileIgnore, IgnoreMatcher, Parser, Processor, open_ignores
 
 THIS_PATH = Path(os.path.dirname(__file__))
 BASE_PATH = (THIS_PATH / "..").resolve()
@@ -78,6 +79,51 @@ def test_ignore_full_path() -> None:
     assert WALK_PATH / "dist/foo/bar.js" not in all_files
 
 
+def __fnmatch_excludes(base_path: Path, patterns: Set[str], path: Path) -> bool:
+    """The reference semantics of IgnoreMatcher, one pattern at a time"""
+    for p in patterns:
+        if path.is_dir() and p.endswith("/") and fnmatch.fnmatch(str(path), p[:-1]):
+            return True
+        if fnmatch.fnmatch(str(path), p):
+            return True
+        if p.endswith("/") and fnmatch.fnmatch(
+            "/" + str(path.relative_to(base_path)), p + "*"
+        ):
+            return True
+        if (
+            p.endswith("/")
+            and p.startswith(str(base_path))
+            and fnmatch.fnmatch(str(path), p + "*")
+        ):
+            return True
+    return False
+
+
+def test_matcher_matches_fnmatch() -> None:
+    ignores = {
+        "dist/",
+        "foo/",
+        "*.min.js",
+        "bar.js",
+        "/init.js",
+        "dist/foo/bar.js",
+        "**/*.json",
+        ".bento*",
+        "simple/",
+        "d*t/",
+        "*oo/",
+        "*.egg-info/",
+    }
+    for base_path in [WALK_PATH, BASE_PATH / WALK_PATH]:
+        patterns = Processor(base_path).process(ignores)
+        matcher = IgnoreMatcher(base_path, patterns)
+        paths = [base_path, *base_path.glob("**/*")]
+        for path in paths:
+            expected = __fnmatch_excludes(base_path, patterns, path)
+            assert matcher.matches(path) == expected, path
+            assert matcher.matches(path, path.is_dir()) == expected, path
+
+
 def __parse(text: str, base_path: Path = BASE_PATH) -> Set[str]:
     lines = io.StringIO(text)
     parser = Parser(base_path, Path("test"))
@@ -160,3 +206,70 @@ def test_ignores_from_ignore_file(monkeypatch: MonkeyPatch) -> None:
         "tests/integration/simple/dist",
         "tests/integration/simple/node_modules",
     }
+
+
+def test_walk_prunes(tmp_path: Path) -> None:
+    (tmp_path / "build" / "deep").mkdir(parents=True)
+    (tmp_path / "build" / "deep" / "out.py").touch()
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.py").touch()
+    (tmp_path / "src" / "link.py").symlink_to(tmp_path / "src" / "main.py")
+    (tmp_path / "src" / "main.pyc").touch()
+
+    fi = FileIgnore(tmp_path, {"build/", "*.pyc"}, [tmp_path])
+
+    assert {p: e.survives for p, e in fi.items()} == {
+        tmp_path / "build": False,
+        tmp_path / "src" / "main.py": True,
+        tmp_path / "src" / "main.pyc": False,
+    }
+
+
+def test_parallel_walk_matches_sequential() -> None:
+    ignores = {"dist/", "*.json"}
+    sequential = FileIgnore(WALK_PATH, ignores, [WALK_PATH], threads=1)
+    parallel = FileIgnore(WALK_PATH, ignores, [WALK_PATH], threads=4)
+
+    assert list(parallel.items()) == list(sequential.items())
+
+
+def test_index_rescans_changed_directories(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    (tmp_path / "src" / "lib").mkdir(parents=True)
+    (tmp_path / "src" / "main.py").touch()
+    (tmp_path / "src" / "lib" / "util.py").touch()
+    (tmp_path / "src" / "lib" / "util.pyc").touch()
+    index_path = tmp_path / ".bento" / "walk-index.json"
+
+    def walk(ignores: Set[str]) -> Set[Path]:
+        fi = FileIgnore(tmp_path, ignores, [tmp_path / "src"], index_path=index_path)
+        # Ensure no listing is "racily clean"
+        os.utime(index_path, ns=(2 ** 62, 2 ** 62))
+        return {p for p, e in fi.items() if e.survives}
+
+    scanned = []
+    scandir = os.scandir
+
+    def counting_scandir(path: str) -> Any:
+        scanned.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+
+    first = walk({"*.pyc"})
+    assert first == {tmp_path / "src" / "main.py", tmp_path / "src" / "lib" / "util.py"}
+    assert len(scanned) == 2
+
+    scanned.clear()
+    assert walk({"*.pyc"}) == first
+    assert scanned == []
+
+    (tmp_path / "src" / "new.py").touch()
+    scanned.clear()
+    assert walk({"*.pyc"}) == first | {tmp_path / "src" / "new.py"}
+    assert scanned == [str(tmp_path / "src")]
+
+    scanned.clear()
+    assert tmp_path / "src" / "lib" / "util.pyc" in walk(set())
+    assert len(scanned) == 2
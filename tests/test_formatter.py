@@ -108,3 +108,13 @@ def test_histo_formatter() -> None:
     output = "\n".join(histo_formatter.dump(VIOLATIONS))
 
     assert strip_ansi(output) == expectation
+
+
+def test_dump_partial() -> None:
+    tool_id, violations = next(iter(VIOLATIONS.items()))
+
+    stylish = bento.formatter.for_name("stylish", NULL_CONTEXT, {})
+    assert stylish.dump_partial(tool_id, violations) == stylish.dump(VIOLATIONS)
+
+    json_formatter = bento.formatter.for_name("json", NULL_CONTEXT, {})
+    assert json_formatter.dump_partial(tool_id, violations) is None
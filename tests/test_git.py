@@ -0,0 +1,171 @@
+import os
+import subprocess
+from pathlib import Path
+
+import bento.git
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=repo, check=True, stdout=subprocess.DEVNULL)
+
+
+def test_list_files(tmp_path: Path) -> None:
+    repo = tmp_path.resolve()
+    _git(repo, "init")
+    (repo / ".gitignore").write_text("build/\n")
+    (repo / "src").mkdir()
+    (repo / "src" / "a.py").touch()
+    (repo / "src" / "deleted.py").touch()
+    os.symlink("a.py", str(repo / "src" / "link.py"))
+    (repo / "other.py").touch()
+    _git(repo, "add", ".gitignore", "src")
+    (repo / "src" / "deleted.py").unlink()
+    (repo / "src" / "new.py").touch()
+    (repo / "build").mkdir()
+    (repo / "build" / "out.py").touch()
+
+    assert bento.git.list_files([repo / "src"], path=repo) == [
+        str(repo / "src" / "a.py")
+    ]
+    assert sorted(bento.git.list_files([repo], untracked=True, path=repo) or []) == [
+        str(repo / ".gitignore"),
+        str(repo / "other.py"),
+        str(repo / "src" / "a.py"),
+        str(repo / "src" / "new.py"),
+    ]
+
+
+def test_list_files_outside_repo(tmp_path: Path) -> None:
+    assert bento.git.list_files([tmp_path], path=tmp_path) is None
+
+
+def test_read_blobs(tmp_path: Path) -> None:
+    repo = tmp_path.resolve()
+    _git(repo, "init")
+    _git(repo, "config", "user.email", "test@returntocorp.com")
+    _git(repo, "config", "user.name", "test")
+    (repo / "a.py").write_text("committed\n")
+    (repo / "with space.py").write_bytes(b"\x00binary")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-m", "initial")
+    (repo / "a.py").write_text("staged\n")
+    (repo / "new.py").write_text("")
+    _git(repo, "add", "a.py", "new.py")
+    (repo / "a.py").write_text("unstaged\n")
+
+    paths = ["a.py", "new.py", "with space.py", "missing.py"]
+    assert bento.git.read_blobs("HEAD", paths, repo) == {
+        "a.py": b"committed\n",
+        "with space.py": b"\x00binary",
+    }
+    assert bento.git.read_blobs("", paths, repo) == {
+        "a.py": b"staged\n",
+        "new.py": b"",
+        "with space.py": b"\x00binary",
+    }
+
+
+def test_blob_ids_and_changed_files(tmp_path: Path) -> None:
+    repo = tmp_path.resolve()
+    _git(repo, "init")
+    _git(repo, "config", "user.email", "test@returntocorp.com")
+    _git(repo, "config", "user.name", "test")
+    (repo / "a.py").write_text("a\n")
+    (repo / "b.py").write_text("b\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-m", "initial")
+    (repo / "a.py").write_text("changed\n")
+    (repo / "b.py").unlink()
+    (repo / "c.py").write_text("c\n")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-m", "second")
+
+    ids = bento.git.blob_ids("HEAD", ["a.py", "b.py", "c.py"], repo)
+    assert sorted(ids) == ["a.py", "c.py"]
+    assert bento.git.blob_ids("HEAD~1", ["a.py"], repo)["a.py"] != ids["a.py"]
+
+    assert sorted(bento.git.changed_files(path=repo) or []) == [
+        str(repo / "a.py"),
+        str(repo / "c.py"),
+    ]
+    assert sorted(bento.git.changed_files("HEAD~1", path=repo) or []) == [
+        str(repo / "a.py"),
+        str(repo / "b.py"),
+    ]
+    # Checking out the first commit restores b.py and removes c.py
+    assert sorted(bento.git.changed_files("HEAD~1", "HEAD", repo) or []) == [
+        str(repo / "a.py"),
+        str(repo / "b.py"),
+    ]
+
+
+def test_staged_line_ranges(tmp_path: Path) -> None:
+    repo = tmp_path.resolve()
+    _git(repo, "init")
+    _git(repo, "config", "user.email", "test@returntocorp.com")
+    _git(repo, "config", "user.name", "test")
+    (repo / "a.py").write_text("1\n2\n3\n4\n5\n")
+    (repo / "b.py").write_text("1\n2\n")
+    (repo / "gone.py").write_text("gone\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-m", "initial")
+    # Line 3 looks like a file header in the diff
+    (repo / "a.py").write_text("1\nchanged\n++ a.py\n3\n5\n")
+    (repo / "b.py").write_text("1\n")
+    (repo / "gone.py").unlink()
+    (repo / "new é.py").write_text("1\n2\n")
+    _git(repo, "add", "-A")
+    (repo / "b.py").write_text("unstaged\n")
+
+    expected = {
+        str(repo / "a.py"): [range(2, 4)],
+        str(repo / "b.py"): [],
+        str(repo / "new é.py"): [range(1, 3)],
+    }
+    assert bento.git.staged_line_ranges(repo) == expected
+
+    # User configuration doesn't change how the diff is read
+    _git(repo, "config", "diff.noprefix", "true")
+    _git(repo, "config", "core.quotePath", "false")
+    assert bento.git.staged_line_ranges(repo) == expected
+
+
+def test_repo_queries(tmp_path: Path) -> None:
+    repo = tmp_path.resolve()
+    assert bento.git.repo(repo) is None
+    bento.git.forget()
+    _git(repo, "init")
+    _git(repo, "config", "user.email", "'test@returntocorp.com'")
+    _git(repo, "config", "user.name", "test")
+    (repo / "src").mkdir()
+
+    r = bento.git.repo(repo / "src")
+    assert r is not None
+    assert r.working_tree_dir == str(repo)
+    assert r.git_dir == str(repo / ".git")
+    assert bento.git.user_email(repo) == "test@returntocorp.com"
+    assert bento.git.url(repo) is None
+    assert bento.git.commit(repo) is None
+
+    _git(repo, "remote", "add", "upstream", "https://example.com/upstream.git")
+    _git(repo, "remote", "add", "origin", "https://example.com/origin.git")
+    (repo / "a.py").touch()
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-m", "initial")
+    # Answers are memoized until forgotten
+    assert bento.git.commit(repo) is None
+    bento.git.forget()
+    assert bento.git.url(repo) == "https://example.com/origin.git"
+    assert bento.git.commit(repo) == r.execute("rev-parse", "HEAD").strip()
+
+
+def test_bare_repo(tmp_path: Path) -> None:
+    repo = tmp_path.resolve()
+    _git(repo, "init", "--bare")
+    _git(repo, "remote", "add", "origin", "https://example.com/origin.git")
+
+    r = bento.git.repo(repo)
+    assert r is not None
+    assert r.working_tree_dir is None
+    assert bento.git.url(repo) == "https://example.com/origin.git"
+    assert bento.git.list_files([repo], path=repo) is None
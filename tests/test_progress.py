@@ -0,0 +1,18 @@
+import io
+
+from bento.progress import BarEvent, ProgressRenderer
+from tqdm import tqdm
+
+
+def test_renderer_applies_events() -> None:
+    bars = [tqdm(total=30, file=io.StringIO()) for _ in range(2)]
+    renderer = ProgressRenderer(bars)
+    renderer.start()
+
+    renderer.post(BarEvent(0, 0, 6, text="setup"))
+    renderer.post(BarEvent(0, 0, 6, text="running", done=True))
+    renderer.post(BarEvent(1, 6, 30, fraction=0.5))
+    renderer.stop()
+
+    assert bars[0].n == 6
+    assert bars[1].n == 18
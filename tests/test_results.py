@@ -1,5 +1,7 @@
 import json
 
+import attr
+
 import bento.result as result
 from bento.violation import Violation
 
@@ -76,3 +78,22 @@ def test_filter_results() -> None:
     filtered = result.filtered("r2c_eslint", VIOLATIONS, baseline)
     assert filtered[0].filtered
     assert not filtered[1].filtered
+
+
+def test_filtered_to_lines() -> None:
+    path = "bento/test/integration/init.js"
+    on_line = [attr.evolve(v, line=line) for v, line in zip(VIOLATIONS, [3, 7])]
+    filtered = result.filtered_to_lines(
+        [*on_line, *VIOLATIONS], {path: [range(2, 4), range(10, 11)]}
+    )
+
+    assert [bool(v.filtered) for v in filtered] == [False, True, False, False]
+    assert all(v.filtered for v in result.filtered_to_lines(VIOLATIONS, {path: []}))
+
+
+def test_payload_round_trip() -> None:
+    filtered = result.filtered(
+        "r2c_eslint", VIOLATIONS, {"r2c_eslint": {"ab901b8d5807dcf6074c35f9aa053ec2"}}
+    )
+
+    assert result.from_payload(result.to_payload(filtered)) == filtered
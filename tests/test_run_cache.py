@@ -1,9 +1,11 @@
 import os
 import tempfile
+import threading
 import time
 from pathlib import Path
-from typing import Tuple
+from typing import List, Tuple
 
+import bento.run_cache
 from _pytest.monkeypatch import MonkeyPatch
 from bento.run_cache import RunCache
 
@@ -97,3 +99,139 @@ def test_get(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
 
         cache = RunCache(cache_path)
         assert cache.get(TOOL_ID, paths) is None
+
+
+def test_get_files(tmp_path: Path) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_path = Path(tmpdir)
+        findings = [{"check_id": "foo"}]
+
+        cache = RunCache(cache_path)
+        assert cache.get_files(TOOL_ID, {"a.py": "key-a"}) == {}
+        cache.put_files(TOOL_ID, {"a.py": "key-a", "b.py": "key-b"}, {"a.py": findings})
+
+        cache = RunCache(cache_path)
+        assert cache.get_files(TOOL_ID, {"a.py": "key-a", "b.py": "key-b"}) == {
+            "a.py": findings,
+            "b.py": [],
+        }
+
+        # Check that a changed key invalidates only that file
+        assert cache.get_files(TOOL_ID, {"a.py": "key-a", "b.py": "key-c"}) == {
+            "a.py": findings
+        }
+
+
+def test_put_files_concurrently(tmp_path: Path) -> None:
+    def put(i: int) -> None:
+        RunCache(tmp_path).put_files(TOOL_ID, {f"{i}.py": f"key-{i}"}, {})
+
+    threads = [threading.Thread(target=put, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    keys = {f"{i}.py": f"key-{i}" for i in range(16)}
+    assert len(RunCache(tmp_path).get_files(TOOL_ID, keys)) == 16
+
+
+def test_head_findings(tmp_path: Path) -> None:
+    cache = RunCache(tmp_path)
+    blobs = {"a.py": "blob-a", "b.py": "blob-b"}
+    assert cache.head_findings.get(TOOL_ID, "fp", blobs) is None
+    cache.head_findings.put(TOOL_ID, "fp", blobs, {"a.py": ["id-1", "id-2"]})
+    cache.save()
+
+    # Another process records another file
+    other = RunCache(tmp_path)
+    other.head_findings.put(TOOL_ID, "fp", {"c.py": "blob-c"}, {"c.py": ["id-3"]})
+    other.save()
+
+    cache = RunCache(tmp_path)
+    assert cache.head_findings.get(TOOL_ID, "fp", blobs) == {"id-1", "id-2"}
+    assert cache.head_findings.get(TOOL_ID, "fp", {"b.py": "blob-b"}) == set()
+    assert cache.head_findings.get(
+        TOOL_ID, "fp", {"a.py": "blob-a", "c.py": "blob-c"}
+    ) == {"id-1", "id-2", "id-3"}
+
+    # Changed contents, unrecorded files, and changed tools are not satisfied
+    assert cache.head_findings.get(TOOL_ID, "fp", {"a.py": "blob-x"}) is None
+    assert cache.head_findings.get(TOOL_ID, "fp", {"d.py": "blob-d"}) is None
+    assert cache.head_findings.get(TOOL_ID, "fp2", {"b.py": "blob-b"}) is None
+
+
+def test_content_hash(tmp_path: Path) -> None:
+    _, file = __setup_test_dir(tmp_path)
+    hsh = RunCache(tmp_path / "cache").content_hash(file)
+
+    # Touching a file does not change its content hash
+    __ensure_ubuntu_mtime_change()
+    file.touch()
+    assert RunCache(tmp_path / "cache").content_hash(file) == hsh
+
+    file.write_text("changed")
+    assert RunCache(tmp_path / "cache").content_hash(file) != hsh
+
+
+def test_content_hash_uses_stat_index(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    """content hashes should only be recomputed for files whose stat information changed"""
+    _, file = __setup_test_dir(tmp_path)
+    # Ensure file is not "racily clean" with respect to the index
+    os.utime(file, (time.time() - 10, time.time() - 10))
+
+    cache = RunCache(tmp_path / "cache")
+    hsh = cache.content_hash(file)
+    cache.save()
+
+    hashed: List[Path] = []
+
+    def fake_hash(path: Path) -> str:
+        hashed.append(path)
+        return "rehashed"
+
+    monkeypatch.setattr(bento.run_cache, "_hash_file", fake_hash)
+
+    cache = RunCache(tmp_path / "cache")
+    assert cache.content_hash(file) == hsh
+    assert not hashed
+
+    file.write_text("changed")
+    cache.refresh()
+    assert cache.content_hash(file) == "rehashed"
+    assert hashed == [file]
+
+
+def test_save_stat_index_concurrently(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    files = [tmp_path / f"{i}.py" for i in range(16)]
+    for f in files:
+        f.write_text(f.name)
+        os.utime(f, (time.time() - 10, time.time() - 10))
+    cache = RunCache(tmp_path / "cache")
+
+    def hash_and_save(f: Path) -> None:
+        cache.content_hash(f)
+        cache.save()
+
+    threads = [threading.Thread(target=hash_and_save, args=(f,)) for f in files]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Every hash was saved, by its own thread's save or an earlier one
+    monkeypatch.setattr(bento.run_cache, "_hash_file", lambda path: "rehashed")
+    cache = RunCache(tmp_path / "cache")
+    assert all(cache.content_hash(f) != "rehashed" for f in files)
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+
+
+def test_modified_hash_order_independent(tmp_path: Path) -> None:
+    """modified_hash should not depend on path order, and duplicate changes should not cancel"""
+    _, file = __setup_test_dir(tmp_path)
+    other = file.parent / "other.txt"
+    other.touch()
+
+    cache = RunCache(tmp_path / "cache")
+    assert cache._modified_hash([file, other]) == cache._modified_hash([other, file])
+    assert cache._modified_hash([file, file]) != cache._modified_hash([])
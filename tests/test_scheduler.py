@@ -0,0 +1,86 @@
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from bento.scheduler import DurationHistory, ResourceBudget, shard
+
+
+def test_shard_balances_sizes() -> None:
+    items = ["a", "b", "c", "d", "e"]
+    sizes = [10, 1, 6, 4, 1]
+
+    shards = shard(items, sizes, 2)
+
+    assert shards == [["a", "b"], ["c", "d", "e"]]
+
+
+def test_shard_never_empty() -> None:
+    assert shard(["a", "b"], [1, 1], 4) == [["a"], ["b"]]
+    assert shard([], [], 4) == []
+
+
+def test_budget_borrow() -> None:
+    budget = ResourceBudget(slots=3)
+
+    with budget.reserve():
+        assert budget.borrow(4) == 2
+        assert budget.borrow(1) == 0
+        budget.release(2)
+        assert budget.borrow(1) == 1
+        budget.release(1)
+
+    assert budget.borrow(4) == 3
+
+
+def test_budget_reserves_by_rank() -> None:
+    budget = ResourceBudget(slots=1)
+    order: List[str] = []
+
+    def run(name: str, rank: float) -> None:
+        with budget.reserve((rank,)):
+            order.append(name)
+
+    with budget.reserve():
+        threads = [
+            threading.Thread(target=run, args=(name, rank))
+            for name, rank in [("cheap", 1.0), ("slow", 10.0), ("medium", 5.0)]
+        ]
+        for th in threads:
+            th.start()
+        while len(budget._waiting) < len(threads):
+            time.sleep(0.01)
+        # Idle slots are not lent while reservations wait
+        assert budget.borrow(1) == 0
+
+    for th in threads:
+        th.join()
+
+    assert order == ["slow", "medium", "cheap"]
+
+
+def test_budget_memory() -> None:
+    budget = ResourceBudget(slots=4, memory=1000)
+
+    with budget.reserve(memory=2000):
+        # Oversized reservations run alone
+        assert budget.borrow(1) == 0
+    with budget.reserve(memory=600):
+        assert budget.borrow(2, memory=300) == 1
+
+
+def test_duration_history(tmp_path: Path) -> None:
+    path = tmp_path / "durations.json"
+    first = DurationHistory(path)
+    second = DurationHistory(path)
+
+    first.record_run("a", 4.0)
+    first.record_run("a", 2.0)
+    second.record_files("b", 10, 5.0)
+    first.save()
+    second.save()
+
+    history = DurationHistory(path)
+    assert history.run_seconds("a") == 3.0
+    assert history.file_seconds("b") == 0.5
+    assert history.run_seconds("b") is None
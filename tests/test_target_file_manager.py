@@ -0,0 +1,147 @@
+import subprocess
+from pathlib import Path
+from typing import Iterable, Set
+
+import bento.constants as constants
+from _pytest.monkeypatch import MonkeyPatch
+from bento.parser import Parser
+from bento.target_file_manager import TargetFileManager
+from bento.tool_runner import RunStep
+from tests.test_tool import ToolFixture
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=repo, check=True, stdout=subprocess.DEVNULL)
+
+
+class PackageToolFixture(ToolFixture):
+    """Reads every file in the directories of the files it checks"""
+
+    def package_dirs(self, paths: Iterable[Path]) -> Set[Path]:
+        return {p.parent for p in paths}
+
+
+def test_snapshot_packages(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    repo = tmp_path.resolve() / "repo"
+    repo.mkdir()
+    _git(repo, "init")
+    _git(repo, "config", "user.email", "test@returntocorp.com")
+    _git(repo, "config", "user.name", "test")
+    (repo / ".bentoignore").touch()
+    (repo / "pkg" / "sub").mkdir(parents=True)
+    for name in ["pkg/a.go", "pkg/b.go", "pkg/sub/c.go", "other.go"]:
+        (repo / name).write_text("committed\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-m", "initial")
+    (repo / "pkg" / "a.go").write_text("staged\n")
+    (repo / "pkg" / "b.go").write_text("staged\n")
+    _git(repo, "add", ".")
+    (repo / "pkg" / "b.go").write_text("unstaged\n")
+    monkeypatch.chdir(repo)
+
+    tfm = TargetFileManager(repo, [repo], True, repo / ".bentoignore")
+    tool = PackageToolFixture(tmp_path, base_path=repo)
+    baseline = repo / ".bento" / "snapshot" / "baseline"
+
+    with tfm.run_context(True, RunStep.BASELINE, tools=[tool]) as paths:
+        # Only checked files are analyzed, but their whole package is written
+        assert set(paths) == {baseline / "pkg" / "a.go", baseline / "pkg" / "b.go"}
+        assert {
+            str(p.relative_to(baseline)) for p in baseline.rglob("*") if p.is_file()
+        } == {"pkg/a.go", "pkg/b.go"}
+
+    tfm = TargetFileManager(
+        repo,
+        [repo / "pkg" / "a.go"],
+        True,
+        repo / ".bentoignore",
+        staged_mode=constants.STAGED_MODE_SNAPSHOT,
+    )
+    check = repo / ".bento" / "snapshot" / "check"
+    with tfm.run_context(True, RunStep.CHECK, tools=[tool]) as paths:
+        assert set(paths) == {check / "pkg" / "a.go"}
+        # Other files in the package are as staged, and subpackages are left out
+        assert (check / "pkg" / "b.go").read_text() == "staged\n"
+        assert not (check / "pkg" / "sub").exists()
+
+
+def test_snapshot_context(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    repo = tmp_path.resolve()
+    _git(repo, "init")
+    _git(repo, "config", "user.email", "test@returntocorp.com")
+    _git(repo, "config", "user.name", "test")
+    (repo / ".bentoignore").touch()
+    (repo / "src").mkdir()
+    (repo / "src" / "a.py").write_text("committed\n")
+    (repo / "src" / "b.py").write_text("committed\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-m", "initial")
+    (repo / "src" / "a.py").write_text("staged\n")
+    (repo / "src" / "new.py").write_text("staged\n")
+    _git(repo, "add", ".")
+    (repo / "src" / "a.py").write_text("unstaged\n")
+    a_mtime = (repo / "src" / "a.py").stat().st_mtime_ns
+    monkeypatch.chdir(repo)
+
+    tfm = TargetFileManager(
+        repo,
+        [repo],
+        True,
+        repo / ".bentoignore",
+        staged_mode=constants.STAGED_MODE_SNAPSHOT,
+    )
+    snapshot = repo / ".bento" / "snapshot"
+
+    with tfm.run_context(True, RunStep.BASELINE) as paths:
+        assert {p.read_text() for p in paths} == {"committed\n"}
+        assert set(paths) == {snapshot / "baseline" / "src" / "a.py"}
+    with tfm.run_context(True, RunStep.CHECK) as paths:
+        assert {p.relative_to(snapshot / "check") for p in paths} == {
+            Path("src") / "a.py",
+            Path("src") / "new.py",
+        }
+        assert {p.read_text() for p in paths} == {"staged\n"}
+        assert {Parser(repo).trim_base(str(p)) for p in paths} == {
+            "src/a.py",
+            "src/new.py",
+        }
+
+    assert not snapshot.exists()
+    assert (repo / "src" / "a.py").read_text() == "unstaged\n"
+    assert (repo / "src" / "a.py").stat().st_mtime_ns == a_mtime
+
+
+def test_head_context(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    repo = tmp_path.resolve()
+    _git(repo, "init")
+    _git(repo, "config", "user.email", "test@returntocorp.com")
+    _git(repo, "config", "user.name", "test")
+    (repo / ".bentoignore").touch()
+    (repo / "a.py").write_text("committed\n")
+    (repo / "b.py").write_text("committed\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-m", "initial")
+    (repo / "a.py").write_text("staged\n")
+    (repo / "new.py").write_text("staged\n")
+    _git(repo, "add", ".")
+    (repo / "a.py").write_text("unstaged\n")
+    (repo / "b.py").write_text("unstaged\n")
+    before = {p: (p.read_text(), p.stat()) for p in repo.glob("*.py")}
+    index = subprocess.check_output(["git", "ls-files", "--stage"], cwd=repo)
+    monkeypatch.chdir(repo)
+
+    tfm = TargetFileManager(repo, [repo], True, repo / ".bentoignore")
+
+    with tfm.run_context(True, RunStep.BASELINE) as paths:
+        snapshot = repo / ".bento" / "snapshot" / "baseline"
+        assert set(paths) == {snapshot / "a.py"}
+        assert (snapshot / "a.py").read_text() == "committed\n"
+        # The working tree is left alone
+        for p, (text, _) in before.items():
+            assert p.read_text() == text
+
+    for p, (text, st) in before.items():
+        assert p.read_text() == text
+        assert p.stat().st_mtime_ns == st.st_mtime_ns
+        assert p.stat().st_mode == st.st_mode
+    assert subprocess.check_output(["git", "ls-files", "--stage"], cwd=repo) == index
@@ -0,0 +1,74 @@
+import pickle
+from pathlib import Path
+
+from bento.target_set import TargetSet, path_strs
+
+BASE_PATH = Path("/project")
+
+
+def _targets() -> TargetSet:
+    return TargetSet.from_paths(
+        BASE_PATH,
+        [
+            BASE_PATH / "src" / "b.py",
+            "/project/src/a.py",
+            BASE_PATH / "README.md",
+            Path("/elsewhere/c.py"),
+            BASE_PATH / "src" / "a.py",
+        ],
+    )
+
+
+def test_iterates_sorted_paths() -> None:
+    targets = _targets()
+
+    assert len(targets) == 4
+    assert list(targets) == [
+        Path("/elsewhere/c.py"),
+        BASE_PATH / "README.md",
+        BASE_PATH / "src" / "a.py",
+        BASE_PATH / "src" / "b.py",
+    ]
+    assert list(targets.strs()) == [str(p) for p in targets]
+
+
+def test_membership() -> None:
+    targets = _targets()
+
+    assert BASE_PATH / "src" / "a.py" in targets
+    assert "/project/README.md" in targets
+    assert Path("/elsewhere/c.py") in targets
+    assert BASE_PATH / "src" not in targets
+    assert BASE_PATH / "src" / "c.py" not in targets
+    assert 1 not in targets
+
+
+def test_equals_set_of_paths() -> None:
+    targets = _targets()
+
+    assert targets == set(targets)
+    assert targets.select(lambda s: s.endswith(".md")) == {BASE_PATH / "README.md"}
+    assert targets & {BASE_PATH / "README.md"} == {BASE_PATH / "README.md"}
+
+
+def test_select() -> None:
+    selected = _targets().select(lambda s: s.startswith("/project/src/"))
+
+    assert isinstance(selected, TargetSet)
+    assert list(selected) == [BASE_PATH / "src" / "a.py", BASE_PATH / "src" / "b.py"]
+
+
+def test_pickle() -> None:
+    targets = _targets()
+    unpickled = pickle.loads(pickle.dumps(targets))
+
+    assert isinstance(unpickled, TargetSet)
+    assert list(unpickled) == list(targets)
+    assert BASE_PATH / "src" / "b.py" in unpickled
+
+
+def test_path_strs() -> None:
+    targets = _targets()
+
+    assert list(path_strs(targets)) == list(targets.strs())
+    assert list(path_strs([BASE_PATH / "x.py"])) == ["/project/x.py"]
@@ -1,11 +1,15 @@
 import os
 import re
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Pattern, Type, Union
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple, Type, Union
 
+import attr
 from bento.base_context import BaseContext
 from bento.parser import Parser
+from bento.scheduler import BUDGET
+from bento.target_set import TargetSet
 from bento.tool import output
+from bento.tool.tool import MIN_SHARD_FILES
 from bento.violation import Violation
 
 THIS_PATH = Path(os.path.dirname(__file__))
@@ -82,6 +86,53 @@ class ToolFixture(output.Str):
         return ",".join(files)
 
 
+class FileCacheParserFixture(Parser):
+    def parse(self, tool_output: str) -> List[Violation]:
+        return [result_for(Path(self.trim_base(f))) for f in tool_output.split(",")]
+
+
+class FileCacheToolFixture(ToolFixture):
+    def __init__(self, tmp_path: Path) -> None:
+        super().__init__(tmp_path, base_path=tmp_path)
+        self.runs: List[List[str]] = []
+
+    @property
+    def parser_type(self) -> Type[Parser]:
+        return FileCacheParserFixture
+
+    @property
+    def file_name_filter(self) -> Pattern:
+        return re.compile(r".*\.py")
+
+    def can_use_file_cache(self) -> bool:
+        return True
+
+    def run(self, files: Iterable[str]) -> str:
+        self.runs.append(sorted(files))
+        return super().run(files)
+
+
+class DotPathParserFixture(Parser):
+    def parse(self, tool_output: str) -> List[Violation]:
+        violations = [
+            result_for(Path(self.trim_base(f))) for f in tool_output.split(",")
+        ]
+        return [attr.evolve(v, path=f"./{v.path}") for v in violations]
+
+
+class DotPathToolFixture(FileCacheToolFixture):
+    """Reports paths with a leading "./", as some tools do"""
+
+    @property
+    def parser_type(self) -> Type[Parser]:
+        return DotPathParserFixture
+
+
+class ShardingToolFixture(FileCacheToolFixture):
+    def can_shard(self) -> bool:
+        return True
+
+
 def _relpath(path: Union[str, Path]) -> Path:
     return THIS_PATH / path
 
@@ -123,3 +174,85 @@ def test_tool_run_ignores(tmp_path: Path) -> None:
     result = tool.results([_relpath("test_tool.py")])
 
     assert not result
+
+
+def test_tool_file_cache(tmp_path: Path) -> None:
+    tool = FileCacheToolFixture(tmp_path)
+    files = [tmp_path / "a.py", tmp_path / "b.py"]
+    for f in files:
+        f.write_text("print('hello')")
+
+    first = tool.results(files)
+    assert len(first) == 2
+    assert tool.runs == [[str(f) for f in files]]
+
+    # Unchanged files are not re-run
+    assert sorted(tool.results(files), key=lambda v: v.path) == sorted(
+        first, key=lambda v: v.path
+    )
+    assert len(tool.runs) == 1
+
+    # Only changed files are re-run
+    files[1].write_text("print('goodbye')")
+    tool.context.cache.refresh()
+    assert len(tool.results(files)) == 2
+    assert tool.runs[-1] == [str(files[1])]
+
+    # Cache is bypassed if not in use
+    tool.results(files, use_cache=False)
+    assert tool.runs[-1] == [str(f) for f in files]
+
+
+def test_tool_file_cache_dot_paths(tmp_path: Path) -> None:
+    tool = DotPathToolFixture(tmp_path)
+    files = [tmp_path / "a.py", tmp_path / "b.py"]
+    for f in files:
+        f.write_text("print('hello')")
+
+    assert len(tool.results(files)) == 2
+    assert len(tool.results(files)) == 2
+    assert len(tool.runs) == 1
+
+
+def test_tool_sharding(tmp_path: Path) -> None:
+    tool = ShardingToolFixture(tmp_path)
+    files = [tmp_path / f"{ix:02d}.py" for ix in range(4 * MIN_SHARD_FILES)]
+    for f in files:
+        f.write_text("print('hello')")
+
+    BUDGET.resize(4)
+    try:
+        results = tool.results(files, use_cache=False)
+    finally:
+        BUDGET.resize(os.cpu_count() or 1)
+
+    assert len(tool.runs) == 4
+    assert sorted(f for run in tool.runs for f in run) == [str(f) for f in files]
+    assert [v.path for v in results] == [
+        os.path.relpath(f, tmp_path) for run in tool.runs for f in run
+    ]
+
+
+def test_tool_progress(tmp_path: Path) -> None:
+    tool = FileCacheToolFixture(tmp_path)
+    files = [tmp_path / f"{ix}.py" for ix in range(3)]
+    for f in files:
+        f.write_text("print('hello')")
+    calls: List[Tuple[int, int]] = []
+
+    tool.results(
+        files, use_cache=False, progress=lambda done, total: calls.append((done, total))
+    )
+
+    assert calls == [(3, 3)]
+
+
+def test_file_path_filter_target_set(tmp_path: Path) -> None:
+    tool = ToolFixture(tmp_path)
+    targets = TargetSet.from_paths(
+        THIS_PATH, [_relpath("test_tool.py"), _relpath("foo.js")]
+    )
+    result = tool.filter_paths(targets)
+
+    assert isinstance(result, TargetSet)
+    assert result == {_relpath("test_tool.py")}
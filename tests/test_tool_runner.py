@@ -1,13 +1,20 @@
+import re
+import subprocess
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Set, Tuple
+from typing import Any, Dict, Iterable, List, Pattern, Set, Tuple, Type
 
 import bento.cli
 import bento.context
+import bento.orchestrator
 import bento.result
 import bento.tool_runner
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
+from bento.parser import Parser
+from bento.target_file_manager import TargetFileManager
+from bento.util import fetch_line_in_file
 from bento.violation import Violation
+from tests.test_tool import ToolFixture
 
 THIS_PATH = Path(__file__).parent
 BASE_PATH = THIS_PATH.parent
@@ -104,3 +111,206 @@ def test_tool_runner_no_yml() -> None:
     runner = bento.tool_runner.Runner(use_cache=True, paths=[Path.cwd()])
     args = [runner, [], set(), None]
     pytest.raises(Exception, bento.tool_runner.Runner.parallel_results, *args)
+
+
+def test_size_budget(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(bento.tool_runner, "cpu_count", lambda: 2)
+    budget = bento.tool_runner.BUDGET
+    before = (budget.slots, budget.memory)
+    context = bento.context.Context(base_path=tmp_path, config={"runner": {}})
+    try:
+        # Every tool runs at once, even with fewer CPUs
+        bento.tool_runner.size_budget(context, 5)
+        assert budget.slots == 5
+        bento.tool_runner.size_budget(context, 1)
+        assert budget.slots == 2
+
+        context.config["runner"]["concurrency"] = 1
+        bento.tool_runner.size_budget(context, 5)
+        assert budget.slots == 1
+    finally:
+        budget.resize(*before)
+
+
+class SetupToolFixture(ToolFixture):
+    def __init__(self, tmp_path: Path) -> None:
+        super().__init__(tmp_path)
+        self.setups = 0
+
+    def setup(self) -> None:
+        self.setups += 1
+
+
+def test_runner_waits_for_started_setup(tmp_path: Path) -> None:
+    tool = SetupToolFixture(tmp_path)
+    started = bento.orchestrator.start_setup([tool])
+    runner = bento.tool_runner.Runner(
+        paths=[THIS_PATH / "test_tool.py"],
+        use_cache=False,
+        show_bars=False,
+        setup=started,
+    )
+
+    ((tool_id, results),) = runner.parallel_results([tool], {})
+
+    assert tool_id == tool.tool_id()
+    assert isinstance(results, list) and len(results) == 1
+    assert tool.setups == 1
+
+
+class LineParserFixture(Parser):
+    def parse(self, tool_output: str) -> List[Violation]:
+        violations = []
+        for line in tool_output.splitlines():
+            path, text = line.split("\t")
+            violations.append(
+                Violation(
+                    tool_id="test",
+                    check_id="test",
+                    path=self.trim_base(path),
+                    line=0,
+                    column=0,
+                    message="test",
+                    severity=2,
+                    syntactic_context=text,
+                )
+            )
+        return violations
+
+
+class LineToolFixture(ToolFixture):
+    """Reports every line of every file"""
+
+    @property
+    def parser_type(self) -> Type[Parser]:
+        return LineParserFixture
+
+    @property
+    def file_name_filter(self) -> Pattern:
+        return re.compile(r".*\.py")
+
+    def run(self, files: Iterable[str]) -> str:
+        return "".join(
+            f"{f}\t{line}\n" for f in files for line in Path(f).read_text().splitlines()
+        )
+
+
+@pytest.mark.parametrize("concurrent_baseline", [False, True])  # type: ignore
+def test_orchestrate_staged(
+    tmp_path: Path, monkeypatch: MonkeyPatch, concurrent_baseline: bool
+) -> None:
+    repo = tmp_path.resolve() / "repo"
+    repo.mkdir()
+    for args in [
+        ["init"],
+        ["config", "user.email", "test@returntocorp.com"],
+        ["config", "user.name", "test"],
+    ]:
+        subprocess.run(["git", *args], cwd=repo, check=True, stdout=subprocess.DEVNULL)
+    (repo / ".bentoignore").touch()
+    (repo / "a.py").write_text("old\narchived\n")
+    subprocess.run(["git", "add", "."], cwd=repo, check=True)
+    subprocess.run(["git", "commit", "-qm", "initial"], cwd=repo, check=True)
+    (repo / "a.py").write_text("old\narchived\nnew\n")
+    subprocess.run(["git", "add", "."], cwd=repo, check=True)
+    monkeypatch.chdir(repo)
+
+    tool = LineToolFixture(tmp_path, base_path=repo)
+    archived = LineParserFixture(repo).parse(f"{repo / 'a.py'}\tarchived\n")[0]
+    tfm = TargetFileManager(repo, [repo], True, repo / ".bentoignore")
+    streamed: List[bento.tool_runner.RunResults] = []
+
+    results, _ = bento.orchestrator.orchestrate(
+        {"test": {archived.syntactic_identifier_str()}},
+        tfm,
+        True,
+        [tool],
+        on_result=streamed.append,
+        concurrent_baseline=concurrent_baseline,
+    )
+
+    assert streamed == list(results)
+    ((tool_id, findings),) = results
+    assert isinstance(findings, list)
+    assert {(f.syntactic_context, bool(f.filtered)) for f in findings} == {
+        ("old", True),
+        ("archived", True),
+        ("new", False),
+    }
+    assert (repo / "a.py").read_text() == "old\narchived\nnew\n"
+
+
+class LineNumberParserFixture(Parser):
+    def parse(self, tool_output: str) -> List[Violation]:
+        violations = []
+        for line in tool_output.splitlines():
+            path, lineno = line.split("\t")
+            violations.append(
+                Violation(
+                    tool_id="test",
+                    check_id="test",
+                    path=self.trim_base(path),
+                    line=int(lineno),
+                    column=0,
+                    message="test",
+                    severity=2,
+                    syntactic_context=fetch_line_in_file(
+                        self.source_path(path), int(lineno)
+                    )
+                    or "",
+                )
+            )
+        return violations
+
+
+class LineNumberToolFixture(LineToolFixture):
+    """Reports every line of every file by number, as most tools do"""
+
+    @property
+    def parser_type(self) -> Type[Parser]:
+        return LineNumberParserFixture
+
+    def run(self, files: Iterable[str]) -> str:
+        return "".join(
+            f"{f}\t{ix + 1}\n"
+            for f in files
+            for ix in range(len(Path(f).read_text().splitlines()))
+        )
+
+
+@pytest.mark.parametrize("concurrent_baseline", [False, True])  # type: ignore
+def test_orchestrate_baseline_context(
+    tmp_path: Path, monkeypatch: MonkeyPatch, concurrent_baseline: bool
+) -> None:
+    repo = tmp_path.resolve() / "repo"
+    repo.mkdir()
+    for args in [
+        ["init"],
+        ["config", "user.email", "test@returntocorp.com"],
+        ["config", "user.name", "test"],
+    ]:
+        subprocess.run(["git", *args], cwd=repo, check=True, stdout=subprocess.DEVNULL)
+    (repo / ".bentoignore").touch()
+    (repo / "a.py").write_text("old\n")
+    subprocess.run(["git", "add", "."], cwd=repo, check=True)
+    subprocess.run(["git", "commit", "-qm", "initial"], cwd=repo, check=True)
+    (repo / "a.py").write_text("new\nold\n")
+    subprocess.run(["git", "add", "."], cwd=repo, check=True)
+    (repo / "a.py").write_text("unstaged\nnew\nold\n")
+    monkeypatch.chdir(repo)
+
+    tool = LineNumberToolFixture(tmp_path, base_path=repo)
+    tfm = TargetFileManager(repo, [repo], True, repo / ".bentoignore")
+
+    results, _ = bento.orchestrator.orchestrate(
+        {}, tfm, True, [tool], concurrent_baseline=concurrent_baseline
+    )
+
+    # Baseline findings take their source lines from HEAD, not the working tree
+    ((tool_id, findings),) = results
+    assert isinstance(findings, list)
+    assert {(f.syntactic_context, bool(f.filtered)) for f in findings} == {
+        ("new\n", False),
+        ("old\n", True),
+    }
+    assert (repo / "a.py").read_text() == "unstaged\nnew\nold\n"
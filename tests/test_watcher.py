@@ -0,0 +1,102 @@
+import os
+from pathlib import Path
+from typing import Any, List
+
+from _pytest.monkeypatch import MonkeyPatch
+
+from bento.violation import Violation
+from bento.watcher import FileWatcher, FindingIndex
+
+
+def _violation(path: str, context: str) -> Violation:
+    return Violation(
+        tool_id="tool",
+        check_id="check",
+        path=path,
+        line=1,
+        column=1,
+        message="message",
+        severity=1,
+        syntactic_context=context,
+    )
+
+
+def test_watcher_detects_changes(tmp_path: Path) -> None:
+    (tmp_path / ".bentoignore").write_text("ignored/\n")
+    (tmp_path / "ignored").mkdir()
+    (tmp_path / "src").mkdir()
+    kept = tmp_path / "src" / "kept.py"
+    kept.write_text("a = 1\n")
+    removed = tmp_path / "removed.py"
+    removed.write_text("b = 1\n")
+
+    watcher = FileWatcher(
+        tmp_path, tmp_path / ".bentoignore", [tmp_path], tmp_path / "index.json"
+    )
+    assert watcher.files == [tmp_path / ".bentoignore", removed, kept]
+    assert watcher.poll() == set()
+
+    kept.write_text("a = 2\n")
+    st = kept.stat()
+    os.utime(kept, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    removed.unlink()
+    created = tmp_path / "created.py"
+    created.write_text("c = 1\n")
+    (tmp_path / "ignored" / "file.py").write_text("d = 1\n")
+
+    assert watcher.poll() == {kept, removed, created}
+    assert watcher.poll() == set()
+
+
+def test_watcher_lists_changed_directories(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    (tmp_path / ".bentoignore").write_text("")
+    (tmp_path / "src").mkdir()
+    kept = tmp_path / "src" / "kept.py"
+    kept.write_text("a = 1\n")
+    # Directories modified long ago are trusted not to have changed unseen
+    for d in [tmp_path, tmp_path / "src"]:
+        os.utime(d, (1, 1))
+
+    watcher = FileWatcher(
+        tmp_path, tmp_path / ".bentoignore", [tmp_path], tmp_path / "index.json"
+    )
+    listed: List[str] = []
+    scandir = os.scandir
+
+    def counting_scandir(path: str) -> Any:
+        listed.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+
+    # Files are still stat-ed, so changes to their contents are seen
+    kept.write_text("a = 22\n")
+    assert watcher.poll() == {kept}
+    assert listed == []
+
+    created = tmp_path / "src" / "created.py"
+    created.write_text("b = 1\n")
+    assert watcher.poll() == {created}
+    assert listed == [str(tmp_path / "src")]
+    assert not (tmp_path / "index.json").exists()
+
+
+def test_finding_index_delta(tmp_path: Path) -> None:
+    index = FindingIndex(tmp_path)
+    a = tmp_path / "a.py"
+    b = tmp_path / "b.py"
+
+    added, removed = index.update(
+        "tool", [], [_violation("a.py", "x"), _violation("b.py", "y")]
+    )
+    assert len(added) == 2 and not removed
+
+    added, removed = index.update("tool", [a], [_violation("a.py", "z")])
+    assert [v.syntactic_context for v in added] == ["z"]
+    assert [v.syntactic_context for v in removed] == ["x"]
+    assert len(index) == 2
+
+    assert index.forget([b]) == 1
+    assert len(index) == 1